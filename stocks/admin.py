@@ -7,14 +7,14 @@ from django.contrib import messages
 from django.http import HttpResponseRedirect
 from import_export.admin import ImportExportModelAdmin, ExportActionMixin
 from import_export.formats.base_formats import CSV, XLSX, JSON, HTML, DEFAULT_FORMATS
-from .models import Stock, Basket, BasketItem
+from .models import Stock, StockMetadata, Basket, BasketItem, PriceAlert
 from .resources import (
     StockResource, BasketResource, BasketItemResource,
     ChatGroupResource, ChatGroupMemberResource, ChatMessageResource,
     TinyURLResource
 )
+from .utils import fetch_stock_price, get_stock_metadata, refresh_stock_metadata
 import pandas as pd
-import yfinance as yf
 from decimal import Decimal
 from datetime import datetime
 
@@ -114,6 +114,7 @@ class StockAdmin(ImportExportModelAdmin):
                     # Use first column if no 'symbol' column found
                     symbol_column = df.columns[0]
                 
+                imported_symbols = []
                 for index, row in df.iterrows():
                     try:
                         raw_symbol = str(row[symbol_column]).strip()
@@ -141,6 +142,7 @@ class StockAdmin(ImportExportModelAdmin):
                                 }
                             )
                             
+                            imported_symbols.append(symbol)
                             if created:
                                 created_count += 1
                             else:
@@ -154,6 +156,10 @@ class StockAdmin(ImportExportModelAdmin):
                         failed_symbols.append(f"{raw_symbol} (Error: {str(e)})")
                         continue
                 
+                # Fetch metadata (in parallel) for symbols the table did not know, which
+                # also replaces their ticker placeholder names with company names
+                refresh_stock_metadata(imported_symbols)
+                
                 # Show success/error messages
                 if created_count > 0:
                     messages.success(request, f"Successfully created {created_count} new stocks.")
@@ -181,30 +187,19 @@ class StockAdmin(ImportExportModelAdmin):
         return render(request, 'admin/csv_form.html', context)
     
     def fetch_stock_info(self, symbol):
-        """Fetch stock information from yfinance (used by legacy import)"""
+        """Look up stock name (metadata table) and price (yfinance history) for legacy import"""
         try:
-            stock = yf.Ticker(symbol)
-            info = stock.info
-            
-            # Get current price
-            current_price = None
-            if 'currentPrice' in info:
-                current_price = info['currentPrice']
-            elif 'regularMarketPrice' in info:
-                current_price = info['regularMarketPrice']
-            else:
-                # Try to get from history
-                hist = stock.history(period='1d')
-                if not hist.empty:
-                    current_price = float(hist['Close'].iloc[-1])
+            # Name comes from the persistent metadata table instead of Ticker.info
+            metadata = get_stock_metadata([symbol]).get(symbol, {})
+            current_price = fetch_stock_price(symbol)
             
-            # Get company name
-            name = info.get('longName') or info.get('shortName') or symbol.split('.')[0]
+            # Ticker placeholder for unknown symbols; the view refreshes their metadata after the loop
+            name = metadata.get('long_name') or symbol.split('.')[0]
             
             if current_price:
                 return {
                     'name': name,
-                    'price': Decimal(str(current_price))
+                    'price': Decimal(str(round(current_price, 2)))
                 }
             else:
                 return None
@@ -214,6 +209,23 @@ class StockAdmin(ImportExportModelAdmin):
             return None
 
 
+@admin.register(StockMetadata)
+class StockMetadataAdmin(admin.ModelAdmin):
+    """Cached symbol metadata, populated by the refresh_stock_metadata command."""
+    list_display = ['stock', 'sector', 'industry', 'market_cap', 'isin', 'fetched_at']
+    list_filter = ['sector', 'fetched_at']
+    search_fields = ['stock__symbol', 'stock__name', 'long_name', 'industry', 'isin']
+    list_select_related = ['stock']
+    readonly_fields = ['fetched_at']
+    ordering = ['stock__symbol']
+    actions = ['refresh_metadata']
+    
+    @admin.action(description='Refresh metadata from Yahoo Finance')
+    def refresh_metadata(self, request, queryset):
+        symbols = list(queryset.values_list('stock__symbol', flat=True))
+        count = refresh_stock_metadata(symbols, force=True)
+        messages.success(request, f"Refreshed metadata for {count} stocks.")
+
 
 class BasketItemInline(admin.TabularInline):
     model = BasketItem
@@ -252,6 +264,17 @@ class BasketItemAdmin(ImportExportModelAdmin):
     search_fields = ['basket__name', 'stock__symbol']
 
 
+@admin.register(PriceAlert)
+class PriceAlertAdmin(admin.ModelAdmin):
+    """Price alerts; triggered alerts are deactivated by the alert engine."""
+    list_display = ['user', 'alert_type', 'stock', 'basket', 'direction', 'threshold', 'is_active', 'triggered_at']
+    list_filter = ['alert_type', 'direction', 'is_active', 'triggered_at']
+    search_fields = ['user__email', 'stock__symbol', 'basket__name']
+    list_select_related = ['user', 'stock', 'basket']
+    readonly_fields = ['created_at', 'triggered_at', 'triggered_value']
+    ordering = ['-created_at']
+
+
 # ==========================================
 # Chat Admin Configuration
 # ==========================================
@@ -287,6 +310,8 @@ class ChatGroupAdmin(ImportExportModelAdmin):
     ordering = ['-created_at']
     inlines = [ChatGroupMemberInline]
     autocomplete_fields = ['created_by']
+    # Maintained by signal receivers on messages and members
+    readonly_fields = ['last_message', 'last_message_at', 'member_count']
     date_hierarchy = 'created_at'
     
     def get_members_count(self, obj):
@@ -51,6 +51,12 @@ Total Portfolio Summary:
 - Total Current Value: ₹{context['total_value']:,.2f}
 - Total Profit/Loss: ₹{context['total_profit_loss']:,.2f} ({context['total_profit_loss_percent']:.2f}%)
 """
+            
+            if context.get('sector_exposure'):
+                total_info += "\nSector Exposure:\n" + "\n".join(
+                    f"- {sector['name']}: {sector['weight_pct']:.2f}% (₹{sector['value']:,.2f}, {sector['holdings']} stocks)"
+                    for sector in context['sector_exposure']
+                ) + "\n"
         
         # Different prompts based on user type and basket status
         if is_admin:
@@ -209,6 +215,7 @@ class AIService:
             'total_value': 0,
             'total_profit_loss': 0,
             'total_profit_loss_percent': 0,
+            'sector_exposure': [],
         }
         
         if user and user.is_authenticated:
@@ -260,6 +267,10 @@ class AIService:
                         traceback.print_exc()
                         continue
                 
+                # Sector concentration across all baskets (one grouped query)
+                from .analytics import portfolio_exposure
+                context['sector_exposure'] = portfolio_exposure(user)['groups']
+                
                 context['total_profit_loss'] = context['total_value'] - context['total_investment']
                 if context['total_investment'] > 0:
                     context['total_profit_loss_percent'] = (context['total_profit_loss'] / context['total_investment']) * 100
@@ -0,0 +1,234 @@
+# stocks/alerts.py
+"""
+Price alert engine evaluated after every price refresh.
+Active thresholds are kept per symbol (and per basket) in sorted arrays, so a
+refresh only bisects between the old and new value to find crossed alerts
+instead of checking every alert. Triggered alerts are pushed over Channels.
+"""
+
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+from django.core.cache import cache
+
+# Bumped whenever alerts are created, deleted or triggered
+ALERT_BOOK_VERSION_KEY = 'price_alert_book_version'
+
+
+class AlertBook:
+    """
+    Sorted thresholds for all active alerts
+
+    books[(alert_type, key)][direction] = (sorted thresholds, alert ids), where key
+    is the stock symbol or basket id.
+    """
+
+    def __init__(self, rows):
+        grouped = defaultdict(lambda: {'above': [], 'below': []})
+        for alert_id, alert_type, key, direction, threshold in rows:
+            grouped[(alert_type, key)][direction].append((float(threshold), alert_id))
+
+        self.books = {}
+        for book_key, directions in grouped.items():
+            self.books[book_key] = {}
+            for direction, entries in directions.items():
+                entries.sort()
+                self.books[book_key][direction] = (
+                    [threshold for threshold, _ in entries],
+                    [alert_id for _, alert_id in entries],
+                )
+
+    def has_basket_alerts(self):
+        return any(alert_type == 'basket' for alert_type, _ in self.books)
+
+    def basket_ids(self):
+        return [key for alert_type, key in self.books if alert_type == 'basket']
+
+    def crossed(self, alert_type, key, old_value, new_value):
+        """
+        Ids of alerts whose threshold lies between old_value and new_value
+
+        'above' fires when old < threshold <= new, 'below' when new <= threshold < old.
+        """
+        book = self.books.get((alert_type, key))
+        if book is None or old_value is None or new_value is None or old_value == new_value:
+            return []
+
+        if new_value > old_value:
+            thresholds, ids = book['above']
+            return ids[bisect_right(thresholds, old_value):bisect_right(thresholds, new_value)]
+
+        thresholds, ids = book['below']
+        return ids[bisect_left(thresholds, new_value):bisect_left(thresholds, old_value)]
+
+
+_book = None
+_book_version = None
+_book_lock = threading.Lock()
+
+
+def _current_version():
+    version = cache.get(ALERT_BOOK_VERSION_KEY)
+    if version is None:
+        cache.add(ALERT_BOOK_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(ALERT_BOOK_VERSION_KEY)
+    return version
+
+
+def get_alert_book():
+    """Return the process-wide alert book, rebuilding it if alerts changed"""
+    global _book, _book_version
+    from .models import PriceAlert
+
+    version = _current_version()
+    if _book is not None and _book_version == version:
+        return _book
+
+    with _book_lock:
+        if _book is None or _book_version != version:
+            rows = []
+            for alert in PriceAlert.objects.filter(is_active=True).values(
+                'id', 'alert_type', 'stock__symbol', 'basket_id', 'direction', 'threshold'
+            ):
+                key = alert['stock__symbol'] if alert['alert_type'] == 'stock' else alert['basket_id']
+                rows.append((alert['id'], alert['alert_type'], key, alert['direction'], alert['threshold']))
+            _book = AlertBook(rows)
+            _book_version = version
+    return _book
+
+
+def invalidate_alert_book(**kwargs):
+    """Mark the alert book stale (usable directly or as a post_save/post_delete receiver)"""
+    try:
+        cache.incr(ALERT_BOOK_VERSION_KEY)
+    except ValueError:
+        cache.set(ALERT_BOOK_VERSION_KEY, time.time_ns(), None)
+
+
+def _basket_pl_changes(price_changes, basket_ids):
+    """
+    Old and new P/L percentage of baskets that hold any changed symbol
+
+    Returns:
+        Dictionary of basket id -> (old P/L %, new P/L %)
+    """
+    from .models import Basket, BasketItem
+
+    items = BasketItem.objects.filter(
+        basket_id__in=basket_ids,
+    ).values_list('basket_id', 'stock__symbol', 'quantity', 'allocated_amount', 'stock__current_price')
+
+    old_values = defaultdict(float)
+    new_values = defaultdict(float)
+    affected = set()
+    for basket_id, symbol, quantity, allocated, current_price in items:
+        if symbol in price_changes:
+            affected.add(basket_id)
+            old_price, new_price = price_changes[symbol]
+        else:
+            old_price = new_price = float(current_price) if current_price else None
+        # Same fallback as BasketItem.get_current_value for unpriced stocks
+        old_values[basket_id] += float(quantity) * old_price if old_price else float(allocated)
+        new_values[basket_id] += float(quantity) * new_price if new_price else float(allocated)
+
+    if not affected:
+        return {}
+
+    invested = dict(Basket.objects.filter(id__in=affected).values_list('id', 'investment_amount'))
+    changes = {}
+    for basket_id in affected:
+        amount = float(invested.get(basket_id) or 0)
+        if amount > 0:
+            changes[basket_id] = (
+                (old_values[basket_id] - amount) / amount * 100,
+                (new_values[basket_id] - amount) / amount * 100,
+            )
+    return changes
+
+
+def evaluate_price_changes(price_changes):
+    """
+    Find and fire alerts crossed by a price refresh
+
+    Args:
+        price_changes: Dictionary of symbol -> (old price, new price) as floats
+
+    Returns:
+        Number of alerts triggered
+    """
+    from decimal import Decimal
+    from django.utils import timezone
+    from .models import PriceAlert
+
+    book = get_alert_book()
+    if not book.books:
+        return 0
+
+    triggered = {}
+    for symbol, (old_price, new_price) in price_changes.items():
+        for alert_id in book.crossed('stock', symbol, old_price, new_price):
+            triggered[alert_id] = new_price
+
+    if book.has_basket_alerts():
+        for basket_id, (old_pl, new_pl) in _basket_pl_changes(price_changes, book.basket_ids()).items():
+            for alert_id in book.crossed('basket', basket_id, old_pl, new_pl):
+                triggered[alert_id] = new_pl
+
+    if not triggered:
+        return 0
+
+    alerts = list(
+        PriceAlert.objects.filter(id__in=triggered, is_active=True).select_related('stock', 'basket')
+    )
+    now = timezone.now()
+    for alert in alerts:
+        alert.is_active = False
+        alert.triggered_at = now
+        alert.triggered_value = Decimal(str(round(triggered[alert.id], 2)))
+    PriceAlert.objects.bulk_update(alerts, ['is_active', 'triggered_at', 'triggered_value'])
+    invalidate_alert_book()
+
+    notify_triggered_alerts(alerts)
+    return len(alerts)
+
+
+def serialize_alert(alert):
+    """JSON-safe dictionary for API responses and notifications"""
+    return {
+        'id': alert.id,
+        'alert_type': alert.alert_type,
+        'symbol': alert.stock.symbol if alert.stock_id else None,
+        'basket_id': alert.basket_id,
+        'basket_name': alert.basket.name if alert.basket_id else None,
+        'direction': alert.direction,
+        'threshold': float(alert.threshold),
+        'description': alert.describe(),
+        'is_active': alert.is_active,
+        'created_at': alert.created_at.isoformat() if alert.created_at else None,
+        'triggered_at': alert.triggered_at.isoformat() if alert.triggered_at else None,
+        'triggered_value': float(alert.triggered_value) if alert.triggered_value is not None else None,
+    }
+
+
+def notify_triggered_alerts(alerts):
+    """Push triggered alerts to each owner's alerts_<user id> Channels group"""
+    from asgiref.sync import async_to_sync
+    from channels.layers import get_channel_layer
+
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+
+    for alert in alerts:
+        try:
+            async_to_sync(channel_layer.group_send)(
+                f'alerts_{alert.user_id}',
+                {
+                    'type': 'price_alert',
+                    'alert': serialize_alert(alert),
+                }
+            )
+        except Exception as e:
+            print(f"Error sending alert {alert.id}: {e}")
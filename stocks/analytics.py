@@ -0,0 +1,873 @@
+# stocks/analytics.py
+"""
+Vectorized portfolio analytics built on a (trading days x symbols) price matrix.
+Everything here works on NumPy arrays so multi-year simulations run in milliseconds.
+"""
+
+import hashlib
+import numpy as np
+from django.core.cache import cache
+
+from .market_calendar import market_cache_ttl
+from .price_store import store_price_matrix
+from .simulation import simulate_chunk
+from .utils import TIME_PERIODS
+
+# Supported rebalance frequencies mapped to the NumPy datetime unit that defines a period
+REBALANCE_FREQUENCIES = {
+    'none': None,
+    'weekly': 'W',
+    'monthly': 'M',
+    'quarterly': 'Q',
+    'yearly': 'Y',
+}
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def load_price_matrix(symbols, period='1y'):
+    """
+    Load daily closing prices for several symbols as one aligned matrix
+
+    OPTIMIZATION: Served from the memory-mapped price store when it is current;
+    otherwise a single yf.download call for all symbols instead of one per stock,
+    cached for 1 hour so repeated analytics on the same holdings skip the network.
+
+    Args:
+        symbols: List of stock symbols
+        period: Time period - '1d', '7d', '1m', '3m', '6m', '1y', '3y', '5y'
+
+    Returns:
+        Dictionary with 'dates' (list of 'YYYY-MM-DD'), 'symbols' (symbols that had data)
+        and 'prices' (float64 array of shape [len(dates), len(symbols)]), or None
+    """
+    import pandas as pd
+    import yfinance as yf
+
+    symbols = sorted(set(symbols))
+    if not symbols:
+        return None
+
+    digest = hashlib.md5(','.join(symbols).encode()).hexdigest()
+    cache_key = f'price_matrix_{period}_{digest}'
+    matrix = cache.get(cache_key)
+    if matrix is not None:
+        return matrix
+
+    matrix = store_price_matrix(symbols, period)
+    if matrix is not None:
+        return matrix
+
+    try:
+        yf_period = TIME_PERIODS.get(period, period)
+        df = yf.download(symbols, period=yf_period, progress=False, auto_adjust=True)
+        if df.empty:
+            return None
+
+        close = df['Close']
+        if isinstance(close, pd.Series):
+            close = close.to_frame(symbols[0])
+        close = close.reindex(columns=symbols)
+
+        # Forward-fill holidays/suspensions, drop symbols with no data and
+        # leading rows where any remaining symbol has not started trading yet
+        close = close.ffill().dropna(axis=1, how='all').dropna(axis=0, how='any')
+        if close.empty:
+            return None
+
+        matrix = {
+            'dates': [d.strftime('%Y-%m-%d') for d in close.index],
+            'symbols': list(close.columns),
+            'prices': close.to_numpy(dtype=np.float64),
+        }
+        cache.set(cache_key, matrix, market_cache_ttl(3600))  # 1 hour in session, until next open otherwise
+        return matrix
+    except Exception as e:
+        print(f"Error loading price matrix for {len(symbols)} symbols: {e}")
+        return None
+
+
+def rebalance_indices(dates, frequency='monthly'):
+    """
+    Find the row indices where a new rebalance period starts
+
+    Args:
+        dates: Sequence of 'YYYY-MM-DD' strings (or datetime64 values), ascending
+        frequency: One of REBALANCE_FREQUENCIES
+
+    Returns:
+        Integer array of row indices, always starting with 0
+    """
+    if frequency not in REBALANCE_FREQUENCIES:
+        raise ValueError(f'Unknown rebalance frequency: {frequency}')
+
+    days = np.asarray(dates, dtype='datetime64[D]')
+    unit = REBALANCE_FREQUENCIES[frequency]
+    if unit is None or len(days) == 0:
+        return np.zeros(1, dtype=np.int64)
+
+    if unit == 'W':
+        # 1970-01-01 was a Thursday; shift so weeks start on Monday
+        buckets = (days.astype(np.int64) + 3) // 7
+    elif unit == 'Q':
+        buckets = days.astype('datetime64[M]').astype(np.int64) // 3
+    else:
+        buckets = days.astype(f'datetime64[{unit}]').astype(np.int64)
+
+    starts = np.flatnonzero(buckets[1:] != buckets[:-1]) + 1
+    return np.concatenate(([0], starts))
+
+
+def normalize_weights(symbols, weights=None):
+    """
+    Build a weight vector that sums to 1, aligned with symbols
+
+    Args:
+        symbols: Ordered list of symbols (matrix columns)
+        weights: None for equal weight, or dict of symbol -> weight (any scale)
+
+    Returns:
+        float64 array of length len(symbols)
+    """
+    if not weights:
+        return np.full(len(symbols), 1.0 / len(symbols))
+
+    vector = np.array([float(weights.get(symbol, 0)) for symbol in symbols])
+    vector = np.clip(vector, 0, None)
+    total = vector.sum()
+    if total <= 0:
+        raise ValueError('Weights must contain at least one positive value')
+    return vector / total
+
+
+def run_backtest(prices, weights, investment_amount, rebalance_at, transaction_cost_pct=0.1):
+    """
+    Simulate a whole-share portfolio that is reset to target weights at each rebalance point
+
+    Holdings between rebalances are constant, so each segment's daily value is a single
+    matrix-vector product over the price matrix. Only the rebalance points are iterated.
+
+    Args:
+        prices: float array [days, symbols]
+        weights: float array [symbols] summing to 1
+        investment_amount: Starting cash
+        rebalance_at: Sorted row indices where the portfolio is rebalanced (first must be 0)
+        transaction_cost_pct: Cost charged on traded value, in percent (0.1 = 0.1%)
+
+    Returns:
+        Dictionary with 'values' (array [days]), 'quantities' (array [rebalances, symbols]),
+        'cash' (array [rebalances]), 'costs' (array [rebalances]) and 'turnover' (array [rebalances])
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    rebalance_at = np.asarray(rebalance_at, dtype=np.int64)
+    cost_rate = float(transaction_cost_pct) / 100
+
+    num_days, num_symbols = prices.shape
+    values = np.empty(num_days)
+    quantities = np.zeros((len(rebalance_at), num_symbols))
+    cash_history = np.empty(len(rebalance_at))
+    costs = np.empty(len(rebalance_at))
+    turnover = np.empty(len(rebalance_at))
+
+    held = np.zeros(num_symbols)
+    cash = float(investment_amount)
+    ends = np.append(rebalance_at[1:], num_days)
+
+    for k, (start, end) in enumerate(zip(rebalance_at, ends)):
+        day_prices = prices[start]
+        portfolio_value = cash + held @ day_prices
+
+        # Reserve room for costs, then round down to whole shares like calculate_equal_weight_basket
+        investable = portfolio_value / (1 + cost_rate)
+        target = np.floor(weights * investable / day_prices)
+        traded_value = np.abs(target - held) @ day_prices
+        cost = traded_value * cost_rate
+        cash = portfolio_value - target @ day_prices - cost
+
+        # Selling and rebuying can cost more than the reserve; trim the largest position until funded
+        while cash < 0 and target.any():
+            largest = np.argmax(target * day_prices)
+            target[largest] -= 1
+            traded_value = np.abs(target - held) @ day_prices
+            cost = traded_value * cost_rate
+            cash = portfolio_value - target @ day_prices - cost
+
+        held = target
+        values[start:end] = cash + prices[start:end] @ held
+        quantities[k] = held
+        cash_history[k] = cash
+        costs[k] = cost
+        turnover[k] = traded_value
+
+    return {
+        'values': values,
+        'quantities': quantities,
+        'cash': cash_history,
+        'costs': costs,
+        'turnover': turnover,
+    }
+
+
+def performance_metrics(values):
+    """
+    Summary statistics for a daily value series
+
+    Args:
+        values: float array of portfolio values, one per trading day
+
+    Returns:
+        Dictionary with total return, CAGR, annualized volatility and max drawdown (percent)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < 2 or values[0] <= 0:
+        return {
+            'total_return_pct': 0.0,
+            'cagr_pct': 0.0,
+            'volatility_pct': 0.0,
+            'max_drawdown_pct': 0.0,
+        }
+
+    daily_returns = values[1:] / values[:-1] - 1
+    years = (len(values) - 1) / TRADING_DAYS_PER_YEAR
+    growth = values[-1] / values[0]
+    running_peak = np.maximum.accumulate(values)
+    drawdowns = values / running_peak - 1
+
+    return {
+        'total_return_pct': round(float(growth - 1) * 100, 2),
+        'cagr_pct': round(float(growth ** (1 / years) - 1) * 100, 2) if years > 0 and growth > 0 else 0.0,
+        'volatility_pct': round(float(daily_returns.std()) * np.sqrt(TRADING_DAYS_PER_YEAR) * 100, 2),
+        'max_drawdown_pct': round(float(drawdowns.min()) * 100, 2),
+    }
+
+
+def backtest_basket(symbols, investment_amount, period='5y', rebalance='monthly',
+                    weights=None, transaction_cost_pct=0.1):
+    """
+    Backtest an equal-weight or custom-weight basket with periodic rebalancing
+
+    Args:
+        symbols: List of stock symbols
+        investment_amount: Starting investment
+        period: History window - '1m', '3m', '6m', '1y', '3y', '5y'
+        rebalance: One of REBALANCE_FREQUENCIES ('none' is buy-and-hold)
+        weights: None for equal weight, or dict of symbol -> weight
+        transaction_cost_pct: Cost per trade as a percent of traded value
+
+    Returns:
+        Dictionary with success flag, dates, values, rebalance log and summary metrics
+    """
+    matrix = load_price_matrix(symbols, period)
+    if matrix is None:
+        return {'success': False, 'error': 'Unable to fetch historical data'}
+
+    try:
+        weight_vector = normalize_weights(matrix['symbols'], weights)
+        rebalance_at = rebalance_indices(matrix['dates'], rebalance)
+    except ValueError as e:
+        return {'success': False, 'error': str(e)}
+
+    result = run_backtest(
+        matrix['prices'],
+        weight_vector,
+        float(investment_amount),
+        rebalance_at,
+        transaction_cost_pct=transaction_cost_pct,
+    )
+    values = result['values']
+
+    rebalances = [
+        {
+            'date': matrix['dates'][day],
+            'quantities': dict(zip(matrix['symbols'], result['quantities'][k].astype(int).tolist())),
+            'cash': round(float(result['cash'][k]), 2),
+            'cost': round(float(result['costs'][k]), 2),
+            'turnover': round(float(result['turnover'][k]), 2),
+        }
+        for k, day in enumerate(rebalance_at.tolist())
+    ]
+
+    summary = performance_metrics(values)
+    summary.update({
+        'start_value': round(float(investment_amount), 2),
+        'final_value': round(float(values[-1]), 2),
+        'total_costs': round(float(result['costs'].sum()), 2),
+        'num_rebalances': len(rebalance_at),
+    })
+
+    return {
+        'success': True,
+        'period': period,
+        'rebalance': rebalance,
+        'symbols': matrix['symbols'],
+        'missing_symbols': sorted(set(symbols) - set(matrix['symbols'])),
+        'weights': dict(zip(matrix['symbols'], np.round(weight_vector * 100, 2).tolist())),
+        'dates': matrix['dates'],
+        'values': np.round(values, 2).tolist(),
+        'rebalances': rebalances,
+        'summary': summary,
+    }
+
+
+# ==========================================
+# Weighting Schemes
+# ==========================================
+
+WEIGHTING_SCHEMES = {
+    'equal': 'Equal Weight',
+    'market_cap': 'Market Cap Weight',
+    'inverse_volatility': 'Inverse Volatility',
+    'min_variance': 'Minimum Variance',
+}
+
+
+def fetch_market_caps(symbols):
+    """
+    Get market capitalisation for several symbols
+
+    Reads the persistent StockMetadata table first; symbols without a stored value
+    fall back to yfinance fast_info (far cheaper than .info), cached for a day,
+    since market cap rankings barely move intraday.
+
+    Args:
+        symbols: List of stock symbols
+
+    Returns:
+        Dictionary of symbol -> market cap (symbols without data are omitted)
+    """
+    import yfinance as yf
+    from .utils import get_stock_metadata
+
+    caps = {
+        symbol: float(meta['market_cap'])
+        for symbol, meta in get_stock_metadata(symbols).items()
+        if meta['market_cap']
+    }
+
+    missing = [symbol for symbol in symbols if symbol not in caps]
+    cached = cache.get_many([f'market_cap_{symbol}' for symbol in missing])
+    caps.update({symbol: cached[f'market_cap_{symbol}'] for symbol in missing if f'market_cap_{symbol}' in cached})
+
+    to_fetch = [symbol for symbol in symbols if symbol not in caps]
+    if to_fetch:
+        tickers = yf.Tickers(' '.join(to_fetch))
+        fetched = {}
+        for symbol in to_fetch:
+            try:
+                market_cap = tickers.tickers[symbol].fast_info['market_cap']
+                if market_cap and market_cap > 0:
+                    fetched[symbol] = float(market_cap)
+            except Exception as e:
+                print(f"Error fetching market cap for {symbol}: {e}")
+        cache.set_many({f'market_cap_{symbol}': cap for symbol, cap in fetched.items()}, 86400)
+        caps.update(fetched)
+
+    return caps
+
+
+def daily_returns(prices):
+    """Simple daily returns for a [days, symbols] price matrix"""
+    prices = np.asarray(prices, dtype=np.float64)
+    return prices[1:] / prices[:-1] - 1
+
+
+def covariance_matrix(prices, annualize=True):
+    """
+    Sample covariance of daily returns with a small ridge for numerical stability
+
+    Args:
+        prices: float array [days, symbols]
+        annualize: Scale to yearly units (x252)
+
+    Returns:
+        float array [symbols, symbols]
+    """
+    returns = daily_returns(prices)
+    cov = np.atleast_2d(np.cov(returns, rowvar=False))
+    if annualize:
+        cov = cov * TRADING_DAYS_PER_YEAR
+    ridge = 1e-8 * max(float(np.trace(cov)) / len(cov), 1e-12)
+    return cov + ridge * np.eye(len(cov))
+
+
+def project_to_capped_simplex(v, max_weight=1.0):
+    """
+    Euclidean projection onto {w : 0 <= w <= max_weight, sum(w) = 1}
+
+    Finds the shift tau with sum(clip(v - tau, 0, max_weight)) == 1 by vectorized bisection.
+    A 2-D input is projected row by row in the same pass.
+    """
+    v = np.asarray(v, dtype=np.float64)
+    if max_weight * v.shape[-1] < 1:
+        raise ValueError('Weight cap is too low for the number of stocks')
+
+    low = v.min(axis=-1, keepdims=True) - 1.0
+    high = v.max(axis=-1, keepdims=True)
+    for _ in range(60):
+        tau = (low + high) / 2
+        over = np.clip(v - tau, 0, max_weight).sum(axis=-1, keepdims=True) > 1
+        low = np.where(over, tau, low)
+        high = np.where(over, high, tau)
+    return np.clip(v - (low + high) / 2, 0, max_weight)
+
+
+def min_variance_weights(cov, max_weight=1.0, iterations=2000, tolerance=1e-10):
+    """
+    Long-only minimum variance weights by projected gradient descent
+
+    Args:
+        cov: Covariance matrix [symbols, symbols]
+        max_weight: Upper bound per stock (fraction, e.g. 0.25)
+
+    Returns:
+        float array of weights summing to 1
+    """
+    cov = np.asarray(cov, dtype=np.float64)
+    n = len(cov)
+    step = 1.0 / (2 * np.linalg.eigvalsh(cov)[-1])
+    weights = project_to_capped_simplex(np.full(n, 1.0 / n), max_weight)
+
+    for _ in range(iterations):
+        updated = project_to_capped_simplex(weights - step * 2 * cov @ weights, max_weight)
+        if np.abs(updated - weights).max() < tolerance:
+            return updated
+        weights = updated
+    return weights
+
+
+def compute_scheme_weights(symbols, scheme='equal', period='1y'):
+    """
+    Compute target weights for a weighting scheme in one batch
+
+    Args:
+        symbols: List of stock symbols
+        scheme: One of WEIGHTING_SCHEMES
+        period: History window used by the volatility based schemes
+
+    Returns:
+        Dictionary of symbol -> weight fraction (sums to 1)
+
+    Raises:
+        ValueError: If the scheme is unknown or there is not enough data
+    """
+    if scheme not in WEIGHTING_SCHEMES:
+        raise ValueError(f'Unknown weighting scheme: {scheme}')
+    if not symbols:
+        raise ValueError('No stocks to weight')
+
+    if scheme == 'equal':
+        return {symbol: 1.0 / len(symbols) for symbol in symbols}
+
+    if scheme == 'market_cap':
+        caps = fetch_market_caps(symbols)
+        missing = sorted(set(symbols) - set(caps))
+        if missing:
+            raise ValueError(f'Market cap unavailable for: {", ".join(missing)}')
+        vector = np.array([caps[symbol] for symbol in symbols])
+        return dict(zip(symbols, (vector / vector.sum()).tolist()))
+
+    matrix = load_price_matrix(symbols, period)
+    if matrix is None or len(matrix['dates']) < 20:
+        raise ValueError('Not enough price history to compute weights')
+    missing = sorted(set(symbols) - set(matrix['symbols']))
+    if missing:
+        raise ValueError(f'Price history unavailable for: {", ".join(missing)}')
+
+    if scheme == 'inverse_volatility':
+        volatility = daily_returns(matrix['prices']).std(axis=0)
+        inverse = 1.0 / np.maximum(volatility, 1e-12)
+        vector = inverse / inverse.sum()
+    else:
+        vector = min_variance_weights(covariance_matrix(matrix['prices']))
+
+    return dict(zip(matrix['symbols'], vector.tolist()))
+
+
+# ==========================================
+# Monte Carlo Projection
+# ==========================================
+
+SIMULATION_METHODS = ('bootstrap', 'gbm')
+
+# Percentiles reported for each checkpoint of the projection
+PROJECTION_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Paths simulated per chunk (bounds memory at chunk x horizon floats)
+SIMULATION_CHUNK_PATHS = 2000
+
+# Above this many paths, chunks are spread across a process pool
+PROCESS_POOL_MIN_PATHS = 20000
+
+# Largest paths x horizon a request may simulate; keeps one projection under a second
+# of CPU so the request thread is never held for long
+MAX_SIMULATION_STEPS = 25_000_000
+
+# Overall wait for process pool workers
+SIMULATION_TIMEOUT_SECONDS = 10
+
+_process_pool = None
+
+
+def _get_process_pool():
+    """
+    Lazily create the shared process pool used for large simulations
+
+    Workers are spawned rather than forked: the web server process is multithreaded
+    (ASGI loop, writer threads, DB connections), which fork would copy mid-state.
+    """
+    global _process_pool
+    if _process_pool is None:
+        import multiprocessing
+        import os
+        from concurrent.futures import ProcessPoolExecutor
+        _process_pool = ProcessPoolExecutor(
+            max_workers=min(4, os.cpu_count() or 1),
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+    return _process_pool
+
+
+def _reset_process_pool():
+    """Drop a broken pool (a worker died) so the next simulation starts a fresh one"""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+def simulate_growth_paths(returns, horizon=252, num_paths=5000, method='bootstrap',
+                          num_checkpoints=50, seed=None, timeout=SIMULATION_TIMEOUT_SECONDS):
+    """
+    Vectorized Monte Carlo simulation of portfolio growth
+
+    Args:
+        returns: 1-D array of historical daily portfolio returns
+        horizon: Number of trading days to project
+        num_paths: Number of simulated paths
+        method: 'bootstrap' (resample history) or 'gbm' (lognormal)
+        num_checkpoints: Number of evenly spaced days kept per path
+        seed: Optional seed for reproducible results
+        timeout: Overall seconds to wait for process pool workers
+
+    Raises:
+        ValueError: Unknown method or too little history
+        TimeoutError: The pool did not finish every chunk within timeout
+
+    Returns:
+        Tuple of (checkpoint day numbers [K], growth multiples [num_paths, K])
+    """
+    if method not in SIMULATION_METHODS:
+        raise ValueError(f'Unknown simulation method: {method}')
+
+    returns = np.asarray(returns, dtype=np.float64)
+    returns = returns[np.isfinite(returns)]
+    if len(returns) < 20:
+        raise ValueError('Not enough return history to simulate')
+
+    checkpoints = np.unique(np.linspace(0, horizon - 1, min(num_checkpoints, horizon)).astype(np.int64))
+    chunk_sizes = [SIMULATION_CHUNK_PATHS] * (num_paths // SIMULATION_CHUNK_PATHS)
+    if num_paths % SIMULATION_CHUNK_PATHS:
+        chunk_sizes.append(num_paths % SIMULATION_CHUNK_PATHS)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+
+    if num_paths >= PROCESS_POOL_MIN_PATHS:
+        from concurrent.futures import wait
+        from concurrent.futures.process import BrokenProcessPool
+
+        pool = _get_process_pool()
+        futures = [
+            pool.submit(simulate_chunk, returns, method, horizon, checkpoints, size, chunk_seed)
+            for size, chunk_seed in zip(chunk_sizes, seeds)
+        ]
+        # One deadline for the whole simulation, not one per chunk
+        _, not_done = wait(futures, timeout=timeout)
+        if not_done:
+            for future in not_done:
+                future.cancel()
+            raise TimeoutError(f'Simulation did not finish within {timeout}s')
+        try:
+            chunks = [future.result() for future in futures]
+        except BrokenProcessPool:
+            _reset_process_pool()
+            raise
+    else:
+        chunks = [
+            simulate_chunk(returns, method, horizon, checkpoints, size, chunk_seed)
+            for size, chunk_seed in zip(chunk_sizes, seeds)
+        ]
+
+    return checkpoints + 1, np.vstack(chunks)
+
+
+def project_basket_value(basket, horizon=252, num_paths=5000, method='bootstrap', history_period='3y'):
+    """
+    Project the range of a basket's future value from its historical daily returns
+
+    Args:
+        basket: Basket model instance
+        horizon: Trading days to project (252 = 1 year)
+        num_paths: Number of simulated paths
+        method: 'bootstrap' or 'gbm'
+        history_period: Window of history used to estimate returns
+
+    Returns:
+        Dictionary with success flag, percentile bands per checkpoint and summary stats.
+        start_value covers only the simulated holdings; holdings without price history
+        are listed in missing_symbols and their value in excluded_value.
+    """
+    items = list(basket.items.select_related('stock'))
+    quantities = {item.stock.symbol: float(item.quantity) for item in items if item.quantity > 0}
+    if not quantities:
+        return {'success': False, 'error': 'Basket has no holdings to project'}
+
+    matrix = load_price_matrix(list(quantities), history_period)
+    if matrix is None:
+        return {'success': False, 'error': 'Unable to fetch historical data'}
+
+    holdings = np.array([quantities[symbol] for symbol in matrix['symbols']])
+    history = matrix['prices'] @ holdings
+    returns = history[1:] / history[:-1] - 1
+
+    try:
+        days, growth = simulate_growth_paths(returns, horizon, num_paths, method)
+    except (ValueError, TimeoutError) as e:
+        return {'success': False, 'error': str(e)}
+
+    # The paths only carry the returns of symbols with history, so they apply to those
+    # holdings' value alone
+    simulated = set(matrix['symbols'])
+    start_value = sum(item.get_current_value() for item in items if item.stock.symbol in simulated)
+    missing_symbols = sorted(set(quantities) - simulated)
+    excluded_value = sum(item.get_current_value() for item in items if item.stock.symbol in missing_symbols)
+    values = growth * start_value
+    bands = np.percentile(values, PROJECTION_PERCENTILES, axis=0)
+    final_values = values[:, -1]
+
+    return {
+        'success': True,
+        'method': method,
+        'horizon_days': horizon,
+        'num_paths': num_paths,
+        'start_value': round(start_value, 2),
+        'days': days.tolist(),
+        'percentiles': {
+            f'p{p}': np.round(band, 2).tolist() for p, band in zip(PROJECTION_PERCENTILES, bands)
+        },
+        'summary': {
+            'expected_value': round(float(final_values.mean()), 2),
+            'median_value': round(float(np.median(final_values)), 2),
+            'p5_value': round(float(bands[0][-1]), 2),
+            'p95_value': round(float(bands[-1][-1]), 2),
+            'probability_of_loss_pct': round(float((final_values < start_value).mean()) * 100, 2),
+        },
+        'missing_symbols': missing_symbols,
+        'excluded_value': round(excluded_value, 2),
+    }
+
+
+# ==========================================
+# Mean-Variance Optimization
+# ==========================================
+
+OPTIMIZATION_OBJECTIVES = {
+    'max_sharpe': 'Maximum Sharpe Ratio',
+    'min_variance': 'Minimum Variance',
+}
+
+# Annual risk-free rate used for Sharpe ratios (approx. Indian 91-day T-bill yield)
+RISK_FREE_RATE = 0.065
+
+
+def efficient_frontier(mu, cov, max_weight=1.0, risk_aversions=None, iterations=3000, tolerance=1e-10):
+    """
+    Long-only, capped mean-variance portfolios for many risk aversions at once
+
+    Solves max(mu.w - lambda * w.cov.w) for every lambda simultaneously: the weights of all
+    frontier points form one [points, symbols] matrix updated by projected gradient steps.
+
+    Args:
+        mu: Expected annual returns [symbols]
+        cov: Annual covariance [symbols, symbols]
+        max_weight: Upper bound per stock (fraction)
+        risk_aversions: Iterable of lambda values (default: 60 log-spaced values)
+
+    Returns:
+        float array [points, symbols] of weights, one row per risk aversion
+    """
+    mu = np.asarray(mu, dtype=np.float64)
+    cov = np.asarray(cov, dtype=np.float64)
+    if risk_aversions is None:
+        risk_aversions = np.logspace(-2, 3, 60)
+    lambdas = np.asarray(risk_aversions, dtype=np.float64)[:, None]
+
+    n = len(mu)
+    step = 1.0 / (2 * lambdas * np.linalg.eigvalsh(cov)[-1])
+    weights = project_to_capped_simplex(np.full((len(lambdas), n), 1.0 / n), max_weight)
+
+    for _ in range(iterations):
+        gradient = 2 * lambdas * (weights @ cov) - mu
+        updated = project_to_capped_simplex(weights - step * gradient, max_weight)
+        if np.abs(updated - weights).max() < tolerance:
+            return updated
+        weights = updated
+    return weights
+
+
+def portfolio_statistics(weights, mu, cov, risk_free_rate=RISK_FREE_RATE):
+    """
+    Expected return, volatility and Sharpe ratio for one or many weight vectors
+
+    Returns:
+        Tuple of arrays (returns, volatilities, sharpe_ratios)
+    """
+    weights = np.atleast_2d(weights)
+    returns = weights @ mu
+    volatilities = np.sqrt(np.einsum('ij,jk,ik->i', weights, cov, weights))
+    sharpe = (returns - risk_free_rate) / np.maximum(volatilities, 1e-12)
+    return returns, volatilities, sharpe
+
+
+def optimize_weights(symbols, objective='max_sharpe', max_weight=1.0, period='1y'):
+    """
+    Mean-variance optimal weights for a set of holdings
+
+    OPTIMIZATION: Results are cached by (holdings set, window, objective, cap), so
+    repeated optimize clicks on an unchanged basket skip both download and solve.
+
+    Args:
+        symbols: List of stock symbols
+        objective: One of OPTIMIZATION_OBJECTIVES
+        max_weight: Upper bound per stock (fraction, e.g. 0.3)
+        period: History window for expected returns and covariance
+
+    Returns:
+        Dictionary with 'weights' (symbol -> fraction), 'expected_return_pct',
+        'volatility_pct' and 'sharpe_ratio'
+
+    Raises:
+        ValueError: If inputs are invalid or there is not enough data
+    """
+    if objective not in OPTIMIZATION_OBJECTIVES:
+        raise ValueError(f'Unknown optimization objective: {objective}')
+    if len(symbols) < 2:
+        raise ValueError('At least 2 stocks are needed to optimize')
+    if max_weight * len(symbols) < 1:
+        raise ValueError(f'A {max_weight * 100:.0f}% cap is too low for {len(symbols)} stocks')
+
+    digest = hashlib.md5(','.join(sorted(set(symbols))).encode()).hexdigest()
+    cache_key = f'optimized_weights_{objective}_{period}_{max_weight}_{digest}'
+    result = cache.get(cache_key)
+    if result is not None:
+        return result
+
+    matrix = load_price_matrix(symbols, period)
+    if matrix is None or len(matrix['dates']) < 20:
+        raise ValueError('Not enough price history to optimize')
+    missing = sorted(set(symbols) - set(matrix['symbols']))
+    if missing:
+        raise ValueError(f'Price history unavailable for: {", ".join(missing)}')
+
+    mu = daily_returns(matrix['prices']).mean(axis=0) * TRADING_DAYS_PER_YEAR
+    cov = covariance_matrix(matrix['prices'])
+
+    if objective == 'min_variance':
+        best = min_variance_weights(cov, max_weight)
+    else:
+        frontier = efficient_frontier(mu, cov, max_weight)
+        _, _, sharpe = portfolio_statistics(frontier, mu, cov)
+        best = frontier[np.argmax(sharpe)]
+
+    returns, volatilities, sharpe = portfolio_statistics(best, mu, cov)
+    result = {
+        'weights': dict(zip(matrix['symbols'], best.tolist())),
+        'expected_return_pct': round(float(returns[0]) * 100, 2),
+        'volatility_pct': round(float(volatilities[0]) * 100, 2),
+        'sharpe_ratio': round(float(sharpe[0]), 3),
+    }
+    cache.set(cache_key, result, market_cache_ttl(3600))  # 1 hour in session, until next open otherwise
+    return result
+
+
+# Dimensions an exposure breakdown can be grouped by (StockMetadata fields)
+EXPOSURE_DIMENSIONS = ('sector', 'industry')
+UNCLASSIFIED_LABEL = 'Unclassified'
+
+
+def exposure_breakdown(items, group_by='sector'):
+    """
+    Aggregate value and weight of basket items per sector or industry in SQL
+
+    OPTIMIZATION: Grouping, current value (quantity x price, falling back to the
+    allocated amount for unpriced stocks, same as BasketItem.get_current_value)
+    and sums all run as one GROUP BY query; only one row per group reaches Python.
+
+    Args:
+        items: BasketItem queryset (one basket or a whole portfolio)
+        group_by: 'sector' or 'industry'
+
+    Returns:
+        Dictionary with total_value, total_invested and groups (list of dicts with
+        name, value, invested, holdings, weight_pct), largest group first
+    """
+    from django.db.models import Case, Count, DecimalField, F, Sum, Value, When
+    from django.db.models.functions import Coalesce, NullIf
+
+    if group_by not in EXPOSURE_DIMENSIONS:
+        raise ValueError(f"Unknown exposure dimension: {group_by}")
+
+    money = DecimalField(max_digits=20, decimal_places=4)
+    current_value = Case(
+        When(stock__current_price__isnull=False, then=F('quantity') * F('stock__current_price')),
+        default=F('allocated_amount'),
+        output_field=money,
+    )
+
+    rows = (
+        items.order_by()
+        .annotate(group=Coalesce(NullIf(f'stock__metadata__{group_by}', Value('')), Value(UNCLASSIFIED_LABEL)))
+        .values('group')
+        .annotate(
+            value=Sum(current_value),
+            invested=Sum('allocated_amount', output_field=money),
+            holdings=Count('stock', distinct=True),
+        )
+        .order_by('-value')
+    )
+
+    groups = [
+        {
+            'name': row['group'],
+            'value': float(row['value'] or 0),
+            'invested': float(row['invested'] or 0),
+            'holdings': row['holdings'],
+        }
+        for row in rows
+    ]
+
+    total_value = sum(group['value'] for group in groups)
+    for group in groups:
+        group['weight_pct'] = round(group['value'] / total_value * 100, 2) if total_value else 0.0
+        group['value'] = round(group['value'], 2)
+        group['invested'] = round(group['invested'], 2)
+
+    return {
+        'group_by': group_by,
+        'total_value': round(total_value, 2),
+        'total_invested': round(sum(group['invested'] for group in groups), 2),
+        'groups': groups,
+    }
+
+
+def basket_exposure(basket, group_by='sector'):
+    """Sector/industry exposure of a single basket"""
+    from .models import BasketItem
+
+    return exposure_breakdown(BasketItem.objects.filter(basket=basket), group_by)
+
+
+def portfolio_exposure(user, group_by='sector'):
+    """Sector/industry exposure across all of a user's baskets"""
+    from .models import BasketItem
+
+    return exposure_breakdown(BasketItem.objects.filter(basket__user=user), group_by)
@@ -3,3 +3,31 @@ from django.apps import AppConfig
 
 class StocksConfig(AppConfig):
     name = 'stocks'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from .alerts import invalidate_alert_book
+        from .consumers import notify_membership_change
+        from .models import (
+            ChatGroupMember, ChatMessage, PriceAlert, Stock, update_group_member_count,
+            update_group_on_message_delete, update_group_on_message_save,
+        )
+        from .search import invalidate_search_index
+
+        # Rebuild the typeahead index lazily after stocks are added, renamed or removed
+        post_save.connect(invalidate_search_index, sender=Stock, dispatch_uid='stock_search_index_save')
+        post_delete.connect(invalidate_search_index, sender=Stock, dispatch_uid='stock_search_index_delete')
+
+        # Alert thresholds are re-read after alerts are created, edited or deleted
+        post_save.connect(invalidate_alert_book, sender=PriceAlert, dispatch_uid='price_alert_book_save')
+        post_delete.connect(invalidate_alert_book, sender=PriceAlert, dispatch_uid='price_alert_book_delete')
+
+        # Denormalized chat group counters used by the groups list
+        post_save.connect(update_group_on_message_save, sender=ChatMessage, dispatch_uid='chat_group_last_message_save')
+        post_delete.connect(update_group_on_message_delete, sender=ChatMessage, dispatch_uid='chat_group_last_message_delete')
+        post_save.connect(update_group_member_count, sender=ChatGroupMember, dispatch_uid='chat_group_member_count_save')
+        post_delete.connect(update_group_member_count, sender=ChatGroupMember, dispatch_uid='chat_group_member_count_delete')
+
+        # Open WebSocket connections cache their memberships; push changes to them
+        post_save.connect(notify_membership_change, sender=ChatGroupMember, dispatch_uid='chat_membership_notify_save')
+        post_delete.connect(notify_membership_change, sender=ChatGroupMember, dispatch_uid='chat_membership_notify_delete')
@@ -0,0 +1,137 @@
+# stocks/chat_presence.py
+"""
+Who is online in each chat group.
+Presence is kept in the shared cache, never in the database: one entry per group maps
+online user ids to (username, expires_at), and one entry per user maps their open
+WebSocket connections to expires_at (a user with several tabs stays online until the
+last one goes). ChatConsumer marks the user online on connect, refreshes the entries
+on every client heartbeat and drops the connection on disconnect; only transitions
+(came online / went offline) are reported back for pushing to the group.
+
+Entries expire PRESENCE_TTL_SECONDS after the last heartbeat, so a connection that
+died without a disconnect (crashed process, half-open socket) stops counting by
+itself: readers ignore expired entries, and heartbeats in the group sweep them out
+and report them as gone offline. Updates are read-modify-write; an entry lost to a
+concurrent writer in another process is restored by the owner's next heartbeat.
+"""
+
+import time
+
+from django.core.cache import cache
+
+# Clients send {'type': 'heartbeat'} this often
+HEARTBEAT_INTERVAL_SECONDS = 25
+
+# A connection is considered dead after missing two heartbeats (plus slack)
+PRESENCE_TTL_SECONDS = 60
+
+
+def _group_key(group_id):
+    return f'chat_presence_group_{group_id}'
+
+
+def _user_key(user_id):
+    return f'chat_presence_user_{user_id}'
+
+
+def _update_groups(user_id, username, group_ids, online, now):
+    """
+    Set or clear the user's entry in each group, sweeping other members' expired entries
+
+    Returns:
+        List of (group_id, user_id, username, is_online) transitions
+    """
+    keys = {_group_key(group_id): group_id for group_id in group_ids}
+    if not keys:
+        return []
+
+    current = cache.get_many(keys)
+    changes = []
+    updated, emptied = {}, []
+    for key, group_id in keys.items():
+        members = current.get(key) or {}
+
+        for other_id, (other_name, expires_at) in list(members.items()):
+            if other_id != user_id and expires_at <= now:
+                del members[other_id]
+                changes.append((group_id, other_id, other_name, False))
+
+        was_online = user_id in members and members[user_id][1] > now
+        if online:
+            members[user_id] = (username, now + PRESENCE_TTL_SECONDS)
+            if not was_online:
+                changes.append((group_id, user_id, username, True))
+        elif members.pop(user_id, None) is not None and was_online:
+            changes.append((group_id, user_id, username, False))
+
+        if members:
+            updated[key] = members
+        elif key in current:
+            emptied.append(key)
+
+    # Kept past the members' expiry so the next heartbeat can still report them offline
+    if updated:
+        cache.set_many(updated, PRESENCE_TTL_SECONDS * 2)
+    if emptied:
+        cache.delete_many(emptied)
+    return changes
+
+
+def _update_connections(user_id, channel_name, connected, now):
+    """Record or drop one connection of the user; returns whether any live connection remains"""
+    key = _user_key(user_id)
+    connections = {
+        name: expires_at for name, expires_at in (cache.get(key) or {}).items() if expires_at > now
+    }
+    if connected:
+        connections[channel_name] = now + PRESENCE_TTL_SECONDS
+    else:
+        connections.pop(channel_name, None)
+
+    if connections:
+        cache.set(key, connections, PRESENCE_TTL_SECONDS)
+    else:
+        cache.delete(key)
+    return bool(connections)
+
+
+def mark_online(user_id, username, channel_name, group_ids):
+    """
+    Connect or heartbeat of one connection: (re)mark the user online in their groups
+
+    Returns:
+        List of (group_id, user_id, username, is_online) transitions to push
+    """
+    now = time.time()
+    _update_connections(user_id, channel_name, True, now)
+    return _update_groups(user_id, username, group_ids, True, now)
+
+
+def mark_offline(user_id, username, channel_name, group_ids):
+    """
+    Disconnect of one connection; the user goes offline only with their last connection
+
+    Returns:
+        List of (group_id, user_id, username, is_online) transitions to push
+    """
+    now = time.time()
+    if _update_connections(user_id, channel_name, False, now):
+        return []
+    return _update_groups(user_id, username, group_ids, False, now)
+
+
+def leave_group(user_id, username, group_id):
+    """The user was removed from a group while connected"""
+    return _update_groups(user_id, username, [group_id], False, time.time())
+
+
+def online_users(group_id):
+    """
+    Users currently online in a group (cache only, no database access)
+
+    Returns:
+        Dict of user_id -> username
+    """
+    now = time.time()
+    members = cache.get(_group_key(group_id)) or {}
+    return {user_id: username for user_id, (username, expires_at) in members.items() if expires_at > now}
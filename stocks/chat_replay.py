@@ -0,0 +1,141 @@
+# stocks/chat_replay.py
+"""
+Missed-message replay for reconnecting chat clients.
+Every new_message frame the consumer broadcasts is also kept, pre-encoded, in a small
+per-group ring buffer. A client that reconnects with resume_from=<id of the last
+message it received> gets just the frames after that id; message ids come from one
+sequence shared by all groups, so a single id covers every group on the socket.
+
+The database is read only when the gap reaches past a group's buffer (older frames
+were evicted, or were sent before this process started), and a gap larger than
+REPLAY_DB_LIMIT is left to a full reload by the client. Buffers are per process,
+matching the single ASGI process with the in-memory channel layer.
+"""
+
+import bisect
+import json
+import threading
+
+# Frames kept per group
+REPLAY_BUFFER_SIZE = 100
+
+# Largest gap served from the database; beyond it the client reloads the group
+REPLAY_DB_LIMIT = 200
+
+
+class ReplayBuffer:
+    """Recent broadcast frames of one group, ordered by message id"""
+
+    def __init__(self, capacity=REPLAY_BUFFER_SIZE):
+        self.capacity = capacity
+        self.ids = []
+        self.frames = []
+        self.evicted_id = 0  # highest id dropped from the buffer
+
+    def append(self, message_id, text):
+        # Ids arrive almost in order (concurrent senders may finish out of order)
+        index = bisect.bisect(self.ids, message_id)
+        self.ids.insert(index, message_id)
+        self.frames.insert(index, text)
+        if len(self.ids) > self.capacity:
+            self.evicted_id = max(self.evicted_id, self.ids.pop(0))
+            self.frames.pop(0)
+
+    def entries_after(self, message_id):
+        """(id, frame) pairs after message_id"""
+        index = bisect.bisect(self.ids, message_id)
+        return list(zip(self.ids[index:], self.frames[index:]))
+
+
+_buffers = {}
+_lock = threading.Lock()
+_start_id = None
+
+
+def record_message(group_id, message_id, text):
+    """Keep a broadcast new_message frame for replay (called on the event loop, no I/O)"""
+    with _lock:
+        buffer = _buffers.get(group_id)
+        if buffer is None:
+            buffer = _buffers[group_id] = ReplayBuffer()
+        buffer.append(message_id, text)
+
+
+def replay_start_id():
+    """Highest message id when the first client connected; every later broadcast is buffered"""
+    global _start_id
+    if _start_id is None:
+        from django.db.models import Max
+        from .models import ChatMessage
+
+        _start_id = ChatMessage.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+    return _start_id
+
+
+def _frames_from_database(group_id, resume_from, buffered):
+    """
+    Frames after resume_from read from the database (merged with the buffered frames,
+    which win for ids present in both)
+
+    Returns None when the gap is larger than REPLAY_DB_LIMIT
+    """
+    from .models import ChatMessage
+
+    messages = list(
+        ChatMessage.objects.filter(group_id=group_id, is_deleted=False, id__gt=resume_from)
+        .select_related('sender')
+        .order_by('id')[:REPLAY_DB_LIMIT + 1]
+    )
+    if len(messages) > REPLAY_DB_LIMIT:
+        return None
+
+    frames = {
+        message.id: json.dumps({
+            'type': 'new_message',
+            'message': {
+                'id': message.id,
+                'content': message.content,
+                'sender': message.get_sender_name(),
+                'sender_id': message.sender_id,
+                'message_type': message.message_type,
+                'created_at': message.created_at.strftime('%H:%M'),
+                'group_id': group_id,
+            }
+        })
+        for message in messages
+    }
+    frames.update(buffered)
+    return [frames[message_id] for message_id in sorted(frames)]
+
+
+def replay_frames(group_ids, resume_from):
+    """
+    Encoded new_message frames the client missed since resume_from (sync; may query)
+
+    Returns:
+        (frames, resync): frames in id order per group, and the group ids whose gap
+        was too large to replay (the client reloads those)
+    """
+    start_id = replay_start_id()
+    frames, resync = [], []
+    for group_id in group_ids:
+        with _lock:
+            buffer = _buffers.get(group_id)
+            buffered = dict(buffer.entries_after(resume_from)) if buffer else {}
+            floor = max(start_id, buffer.evicted_id if buffer else 0)
+
+        if resume_from >= floor:
+            # OPTIMIZATION: the whole gap is in memory - no query
+            frames.extend(buffered[message_id] for message_id in sorted(buffered))
+            continue
+
+        try:
+            group_frames = _frames_from_database(group_id, resume_from, buffered)
+        except Exception as e:
+            print(f"Error replaying messages for group {group_id}: {e}")
+            group_frames = None
+        if group_frames is None:
+            resync.append(group_id)
+        else:
+            frames.extend(group_frames)
+    return frames, resync
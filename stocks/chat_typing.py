@@ -0,0 +1,112 @@
+# stocks/chat_typing.py
+"""
+Coalesced typing indicators.
+Consumers report typing state changes here instead of broadcasting every keystroke.
+Each group gets at most one aggregated "who is typing" frame per FLUSH_INTERVAL_SECONDS,
+encoded once and fanned out as pre-encoded text; receivers drop frames that sat in
+their queue too long, so typing is the first traffic shed under backpressure.
+
+The aggregate covers typers connected to this process (the app runs a single
+ASGI process with the in-memory channel layer).
+"""
+
+import asyncio
+import json
+import time
+
+# At most this many aggregated frames per group per second (1 / interval)
+FLUSH_INTERVAL_SECONDS = 0.3
+
+# A typer who stops refreshing disappears after this long (lost "stopped" events)
+TYPING_TTL_SECONDS = 6
+
+# Per connection and group, repeated "still typing" events are forwarded at most this often
+TYPING_REFRESH_SECONDS = 2
+
+# Receivers skip typing frames older than this (their send queue is backed up)
+MAX_FRAME_LAG_SECONDS = 1.0
+
+
+class TypingAggregator:
+    """Per-process typing state for all groups, flushed as one frame per group per interval"""
+
+    def __init__(self, channel_layer):
+        self.channel_layer = channel_layer
+        self.typers = {}  # group_id -> {user_id: (username, expires_at)}
+        self.emitted = {}  # group_id -> user ids in the last frame sent
+        self.last_flush = {}
+        self.scheduled = {}  # group_id -> monotonic time of the pending flush
+
+    def update(self, group_id, user_id, username, is_typing):
+        """Record a typing start/refresh/stop; the group's frame goes out on the next flush"""
+        typers = self.typers.setdefault(group_id, {})
+        if is_typing:
+            typers[user_id] = (username, time.monotonic() + TYPING_TTL_SECONDS)
+        elif typers.pop(user_id, None) is None:
+            return
+        self._schedule(group_id)
+
+    def _schedule(self, group_id, delay=None):
+        now = time.monotonic()
+        if delay is None:
+            delay = self.last_flush.get(group_id, 0) + FLUSH_INTERVAL_SECONDS - now
+        due = now + max(delay, 0)
+        # A pending flush that comes sooner (or as soon) already covers this one
+        if self.scheduled.get(group_id, float('inf')) <= due:
+            return
+        self.scheduled[group_id] = due
+        asyncio.get_running_loop().create_task(self._flush_later(group_id, due))
+
+    async def _flush_later(self, group_id, due):
+        await asyncio.sleep(due - time.monotonic())
+        if self.scheduled.get(group_id) != due:
+            return  # superseded by an earlier flush, which reschedules what is left
+        del self.scheduled[group_id]
+        try:
+            await self.flush(group_id)
+        except Exception as e:
+            print(f"Error sending typing update for group {group_id}: {e}")
+
+    async def flush(self, group_id):
+        now = time.monotonic()
+        self.last_flush[group_id] = now
+        typers = self.typers.get(group_id, {})
+        for user_id in [user_id for user_id, (_, expires_at) in typers.items() if expires_at <= now]:
+            del typers[user_id]
+
+        user_ids = sorted(typers)
+        if user_ids != self.emitted.get(group_id, []):
+            self.emitted[group_id] = user_ids
+            text = json.dumps({
+                'type': 'typing',
+                'group_id': group_id,
+                'users': [{'id': user_id, 'username': typers[user_id][0]} for user_id in user_ids],
+            })
+            await self.channel_layer.group_send(
+                f'chat_{group_id}',
+                {
+                    'type': 'typing_update',
+                    'text': text,
+                    'sent_at': time.time(),
+                }
+            )
+
+        if typers:
+            # Come back when the next typer would expire
+            next_expiry = min(expires_at for _, expires_at in typers.values())
+            self._schedule(group_id, max(next_expiry - now, FLUSH_INTERVAL_SECONDS))
+        else:
+            self.typers.pop(group_id, None)
+            self.emitted.pop(group_id, None)
+            self.last_flush.pop(group_id, None)
+
+
+_aggregator = None
+
+
+def get_typing_aggregator(channel_layer):
+    """Process-wide aggregator (created on the event loop's first typing event)"""
+    global _aggregator
+    if _aggregator is None or _aggregator.channel_layer is not channel_layer:
+        _aggregator = TypingAggregator(channel_layer)
+    return _aggregator
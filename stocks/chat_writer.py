@@ -0,0 +1,188 @@
+# stocks/chat_writer.py
+"""
+Group-commit persistence for chat messages sent over WebSockets.
+Consumers hand their messages to a per-process writer thread that inserts everything
+queued in the last few milliseconds (or BATCH_SIZE messages) with one bulk_create in
+one transaction and bumps each touched group once per flush. Each submit returns a
+future that resolves once the row is committed, so the consumer broadcasts a message
+with its real id: ids are assigned by the insert itself and follow send order across
+WebSocket and HTTP writers, which read cursors, keyset paging and replay rely on.
+
+A failed batch is retried row by row: rows that can never be inserted (e.g. their group
+or sender was deleted meanwhile) fail their own future without holding up the rest,
+and transient errors are retried with backoff up to MAX_ATTEMPTS times.
+"""
+
+import atexit
+import threading
+import time
+from concurrent.futures import Future
+
+from django.db import DatabaseError, IntegrityError, close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+# Flush queued messages after this long...
+FLUSH_INTERVAL_SECONDS = 0.01
+# ...or as soon as this many are waiting
+BATCH_SIZE = 100
+
+# Retry delays after a failed flush
+RETRY_BASE_SECONDS = 0.5
+RETRY_MAX_SECONDS = 30
+
+# A message still failing with transient errors after this many flushes is given up
+MAX_ATTEMPTS = 5
+
+
+class MessageWriter:
+    """Per-process queue of ChatMessage instances flushed with bulk_create by a background thread"""
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL_SECONDS, batch_size=BATCH_SIZE):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._pending = []  # (message, future, attempts)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._failures = 0
+        self._thread = threading.Thread(target=self._run, name='chat-message-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, message):
+        """
+        Queue an unsaved ChatMessage
+
+        Returns:
+            concurrent.futures.Future resolving to the saved message (with its id), or
+            raising if it could not be written
+        """
+        future = Future()
+        with self._lock:
+            self._pending.append((message, future, 0))
+        self._wake.set()
+        return future
+
+    def _insert(self, messages):
+        from .models import ChatGroup, ChatMessage
+
+        with transaction.atomic():
+            if connection.features.can_return_rows_from_bulk_insert:
+                ChatMessage.objects.bulk_create(messages)
+            else:
+                for message in messages:
+                    message.save()
+
+            # One group bump per flush instead of a group.save() per message
+            # (bulk_create skips the post_save receiver that normally does this)
+            latest = {}
+            for message in messages:
+                if message.group_id not in latest or message.id > latest[message.group_id].id:
+                    latest[message.group_id] = message
+            now = timezone.now()
+            for group_id, message in latest.items():
+                ChatGroup.objects.filter(pk=group_id).filter(
+                    Q(last_message_at__isnull=True) | Q(last_message_at__lte=message.created_at)
+                ).update(last_message_id=message.id, last_message_at=message.created_at, updated_at=now)
+
+    def flush(self):
+        """
+        Insert everything queued so far in one transaction
+
+        Returns:
+            Number of messages written
+        """
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return 0
+
+        close_old_connections()
+        try:
+            self._insert([message for message, _, _ in batch])
+        except Exception as e:
+            print(f"Error flushing {len(batch)} chat messages, retrying one by one: {e}")
+        else:
+            for message, future, _ in batch:
+                future.set_result(message)
+            self._failures = 0
+            return len(batch)
+
+        # Isolate the rows that fail so one bad message does not block the others
+        written, retry = 0, []
+        for message, future, attempts in batch:
+            message.pk = None
+            try:
+                self._insert([message])
+            except (IntegrityError, ValueError) as e:
+                print(f"Dropping chat message for group {message.group_id}: {e}")
+                future.set_exception(e)
+            except DatabaseError as e:
+                if attempts + 1 >= MAX_ATTEMPTS:
+                    print(f"Giving up on chat message for group {message.group_id}: {e}")
+                    future.set_exception(e)
+                else:
+                    retry.append((message, future, attempts + 1))
+            else:
+                future.set_result(message)
+                written += 1
+
+        if retry:
+            with self._lock:
+                self._pending[:0] = retry
+            self._failures += 1
+        else:
+            self._failures = 0
+        return written
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            if self._failures:
+                # Interrupted by stop() so queued messages are not lost at exit
+                self._stopping.wait(min(RETRY_BASE_SECONDS * 2 ** (self._failures - 1), RETRY_MAX_SECONDS))
+            elif not self._stopping.is_set():
+                # Let a burst accumulate unless the batch is already full
+                with self._lock:
+                    full = len(self._pending) >= self.batch_size
+                if not full:
+                    time.sleep(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+            if self._stopping.is_set():
+                if self._pending:
+                    # Last attempt; whatever still fails is reported to its sender
+                    self._failures = 0
+                    self.flush()
+                self._fail_pending()
+                return
+            if self._pending:
+                self._wake.set()
+
+    def _fail_pending(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        for message, future, _ in batch:
+            print(f"Chat message for group {message.group_id} not written before shutdown")
+            future.set_exception(RuntimeError('Message writer stopped'))
+
+    def stop(self, timeout=5):
+        """Flush what is queued before the process exits"""
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join(timeout)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_message_writer():
+    """Return the process-wide writer, starting its thread on first use"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = MessageWriter()
+                atexit.register(_writer.stop)
+    return _writer
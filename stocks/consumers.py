@@ -5,15 +5,33 @@ This enables instant message delivery between users.
 """
 
 import json
+import time
+from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+# Upper bound on chat_<id> groups one connection may subscribe to
+MAX_SUBSCRIPTIONS_PER_CONNECTION = 200
+
 
 class ChatConsumer(AsyncWebsocketConsumer):
-    """WebSocket consumer for real-time chat messaging"""
+    """
+    WebSocket consumer for real-time chat messaging
+    
+    One connection multiplexes any number of the user's groups: clients send
+    subscribe/unsubscribe frames ({'group_ids': [...]} or {'all': true}) and every
+    message, typing event and confirmation carries its group_id.
+    
+    Clients also send {'type': 'heartbeat'} every HEARTBEAT_INTERVAL_SECONDS, which
+    keeps the user online in all of their groups (see chat_presence).
+    
+    A reconnecting client passes ?resume_from=<last message id it received> (or
+    'resume_from' in its subscribe frame); the messages it missed in the groups it
+    subscribes to are replayed, followed by a replay_complete frame (see chat_replay).
+    """
     
     async def connect(self):
         """Handle WebSocket connection"""
@@ -24,18 +42,49 @@ class ChatConsumer(AsyncWebsocketConsumer):
             await self.close()
             return
         
-        # Get group_id from URL route
+        self.username = self.user.username or self.user.email.split('@')[0]
+        
+        # Active memberships are loaded once and kept current by membership_changed
+        # events, so sending and joining never query ChatGroupMember
+        self.group_ids, self.support_group_id = await self.load_memberships()
+        self.membership_group_name = f'membership_{self.user.id}'
+        await self.channel_layer.group_add(
+            self.membership_group_name,
+            self.channel_name
+        )
+        
+        # Group subscriptions (chat_<id> channel groups) of this connection; with
+        # subscribe_all, groups the user joins later are subscribed automatically
+        self.subscriptions = set()
+        self.subscribe_all = False
+        
+        # group_id -> (is_typing, last forwarded) for throttling typing events
+        self.typing_state = {}
+        
+        # Set once this connection counts towards the user's presence
+        self.presence_online = False
+        
+        # Last message id the client received before reconnecting (used by the first
+        # subscribe, see replay)
+        self.resume_from = None
+        resume_from = parse_qs(self.scope.get('query_string', b'').decode()).get('resume_from')
+        if resume_from and resume_from[0].isdigit():
+            self.resume_from = int(resume_from[0])
+        
+        # Get group_id from URL route (default target of messages sent without one)
         self.group_id = self.scope['url_route']['kwargs'].get('group_id')
         
         if self.group_id:
-            self.room_group_name = f'chat_{self.group_id}'
-        else:
-            # Create a personal room for the user (for support chat)
-            self.room_group_name = f'user_{self.user.id}'
+            self.group_id = int(self.group_id)
+            if self.group_id not in self.group_ids:
+                await self.close(code=4403)
+                return
+            await self.subscribe(self.group_id)
         
-        # Join room group
+        # Personal price alert notifications (see alerts.notify_triggered_alerts)
+        self.alerts_group_name = f'alerts_{self.user.id}'
         await self.channel_layer.group_add(
-            self.room_group_name,
+            self.alerts_group_name,
             self.channel_name
         )
         
@@ -45,15 +94,37 @@ class ChatConsumer(AsyncWebsocketConsumer):
         await self.send(text_data=json.dumps({
             'type': 'connection_established',
             'message': 'Connected to chat server',
-            'room': self.room_group_name
+            'user_id': self.user.id,  # lets the client derive is_own for broadcasts
+            'group_id': self.group_id,
+            'subscriptions': sorted(self.subscriptions)
         }))
+        
+        await self.update_presence(True)
+        
+        if self.resume_from is not None and self.subscriptions:
+            await self.replay(sorted(self.subscriptions), self.resume_from)
     
     async def disconnect(self, close_code):
         """Handle WebSocket disconnection"""
-        if hasattr(self, 'room_group_name'):
-            # Leave room group
+        if getattr(self, 'presence_online', False):
+            await self.update_presence(False)
+        
+        # Clear this user's typing state so others don't wait for it to expire
+        for group_id, (is_typing, _) in getattr(self, 'typing_state', {}).items():
+            if is_typing:
+                self.report_typing(group_id, False)
+        
+        # Leave all subscribed room groups
+        for group_id in list(getattr(self, 'subscriptions', ())):
+            await self.unsubscribe(group_id)
+        if hasattr(self, 'alerts_group_name'):
+            await self.channel_layer.group_discard(
+                self.alerts_group_name,
+                self.channel_name
+            )
+        if hasattr(self, 'membership_group_name'):
             await self.channel_layer.group_discard(
-                self.room_group_name,
+                self.membership_group_name,
                 self.channel_name
             )
     
@@ -65,10 +136,16 @@ class ChatConsumer(AsyncWebsocketConsumer):
             
             if message_type == 'message':
                 await self.handle_chat_message(data)
+            elif message_type == 'subscribe':
+                await self.handle_subscribe(data)
+            elif message_type == 'unsubscribe':
+                await self.handle_unsubscribe(data)
             elif message_type == 'join_group':
                 await self.handle_join_group(data)
             elif message_type == 'typing':
                 await self.handle_typing(data)
+            elif message_type == 'heartbeat':
+                await self.update_presence(True)
                 
         except json.JSONDecodeError:
             await self.send(text_data=json.dumps({
@@ -83,6 +160,8 @@ class ChatConsumer(AsyncWebsocketConsumer):
     
     async def handle_chat_message(self, data):
         """Handle sending a chat message"""
+        from .chat_replay import record_message
+        
         content = data.get('content', '').strip()
         group_id = data.get('group_id') or self.group_id
         
@@ -93,14 +172,20 @@ class ChatConsumer(AsyncWebsocketConsumer):
         message_data = await self.save_message(content, group_id)
         
         if message_data:
-            # Broadcast to room group
+            # Broadcast to room group. OPTIMIZATION: the frame is encoded once here and
+            # written as-is by every receiver; clients derive is_own from sender_id
             room_name = f'chat_{message_data["group_id"]}'
+            broadcast = {key: value for key, value in message_data.items() if key != 'is_own'}
+            text = json.dumps({'type': 'new_message', 'message': broadcast})
+            
+            # Kept for clients that reconnect after missing it
+            record_message(message_data['group_id'], message_data['id'], text)
             
             await self.channel_layer.group_send(
                 room_name,
                 {
                     'type': 'chat_message',
-                    'message': message_data
+                    'text': text
                 }
             )
             
@@ -109,144 +194,384 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 'type': 'message_sent',
                 'message': message_data
             }))
+        else:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': 'Message could not be sent'
+            }))
+    
+    async def subscribe(self, group_id):
+        """Start receiving a group's events on this connection (caller checks membership)"""
+        if group_id in self.subscriptions:
+            return True
+        if len(self.subscriptions) >= MAX_SUBSCRIPTIONS_PER_CONNECTION:
+            return False
+        await self.channel_layer.group_add(f'chat_{group_id}', self.channel_name)
+        self.subscriptions.add(group_id)
+        return True
+    
+    async def unsubscribe(self, group_id):
+        if group_id not in self.subscriptions:
+            return
+        await self.channel_layer.group_discard(f'chat_{group_id}', self.channel_name)
+        self.subscriptions.discard(group_id)
+    
+    def _requested_group_ids(self, data):
+        """Group ids named by a subscribe/unsubscribe frame (group_id or group_ids)"""
+        group_ids = data.get('group_ids')
+        if group_ids is None:
+            group_ids = [data['group_id']] if data.get('group_id') else []
+        return [int(group_id) for group_id in group_ids]
+    
+    async def handle_subscribe(self, data):
+        """Subscribe to several groups at once ({'all': true} for every current and future membership)"""
+        if data.get('all'):
+            self.subscribe_all = True
+            group_ids = sorted(self.group_ids)
+        else:
+            group_ids = self._requested_group_ids(data)
+        
+        rejected, added = [], []
+        for group_id in group_ids:
+            if group_id in self.subscriptions:
+                continue
+            if group_id not in self.group_ids or not await self.subscribe(group_id):
+                rejected.append(group_id)
+            else:
+                added.append(group_id)
+        
+        await self.send(text_data=json.dumps({
+            'type': 'subscribed',
+            'group_ids': sorted(self.subscriptions),
+            'rejected': rejected
+        }))
+        
+        # The resume point given at connect applies to the first subscribe only
+        resume_from = data.get('resume_from', self.resume_from)
+        self.resume_from = None
+        if resume_from is not None:
+            await self.replay(added, int(resume_from))
+    
+    async def replay(self, group_ids, resume_from):
+        """
+        Send the new_message frames of group_ids after resume_from, then replay_complete
+        
+        OPTIMIZATION: Frames come pre-encoded from the per-group replay buffers; the
+        database is read only for groups whose gap is older than their buffer, so a
+        wave of reconnects does not turn into a full history reload per client.
+        """
+        from .chat_replay import replay_frames
+        
+        frames, resync = [], []
+        if group_ids:
+            frames, resync = await database_sync_to_async(replay_frames)(group_ids, resume_from)
+        for text in frames:
+            await self.send(text_data=text)
+        
+        await self.send(text_data=json.dumps({
+            'type': 'replay_complete',
+            'group_ids': group_ids,
+            'resume_from': resume_from,
+            'replayed': len(frames),
+            'resync': resync  # gap too large; reload these groups over HTTP
+        }))
+    
+    async def handle_unsubscribe(self, data):
+        """Stop receiving events from the given groups"""
+        if data.get('all'):
+            self.subscribe_all = False
+            group_ids = list(self.subscriptions)
+        else:
+            group_ids = self._requested_group_ids(data)
+        
+        for group_id in group_ids:
+            await self.unsubscribe(group_id)
+        
+        await self.send(text_data=json.dumps({
+            'type': 'unsubscribed',
+            'group_ids': sorted(self.subscriptions)
+        }))
     
     async def handle_join_group(self, data):
-        """Handle joining a different chat group"""
+        """Handle switching the default chat group (other subscriptions are kept)"""
         new_group_id = data.get('group_id')
         
         if not new_group_id:
             return
         
-        # Leave current group
-        if hasattr(self, 'room_group_name'):
-            await self.channel_layer.group_discard(
-                self.room_group_name,
-                self.channel_name
-            )
+        new_group_id = int(new_group_id)
+        if new_group_id not in self.group_ids or not await self.subscribe(new_group_id):
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': 'Not a member of this group'
+            }))
+            return
         
-        # Join new group
         self.group_id = new_group_id
-        self.room_group_name = f'chat_{new_group_id}'
-        
-        await self.channel_layer.group_add(
-            self.room_group_name,
-            self.channel_name
-        )
         
         await self.send(text_data=json.dumps({
             'type': 'group_joined',
             'group_id': new_group_id,
-            'room': self.room_group_name
+            'subscriptions': sorted(self.subscriptions)
         }))
     
     async def handle_typing(self, data):
-        """Handle typing indicator"""
+        """
+        Handle typing indicator
+        
+        OPTIMIZATION: Throttled per connection and group (only start/stop changes and a
+        refresh every TYPING_REFRESH_SECONDS pass), then coalesced per group by the
+        typing aggregator into at most a few "who is typing" frames per second.
+        """
+        from .chat_typing import TYPING_REFRESH_SECONDS
+        
         group_id = data.get('group_id') or self.group_id
-        is_typing = data.get('is_typing', False)
+        is_typing = bool(data.get('is_typing', False))
         
-        if group_id:
-            room_name = f'chat_{group_id}'
-            await self.channel_layer.group_send(
-                room_name,
-                {
-                    'type': 'typing_indicator',
-                    'user_id': self.user.id,
-                    'username': self.user.username or self.user.email.split('@')[0],
-                    'is_typing': is_typing
-                }
-            )
+        if not group_id or int(group_id) not in self.group_ids:
+            return
+        group_id = int(group_id)
+        
+        now = time.monotonic()
+        was_typing, last_forwarded = self.typing_state.get(group_id, (False, 0))
+        if is_typing == was_typing and (not is_typing or now - last_forwarded < TYPING_REFRESH_SECONDS):
+            return
+        self.typing_state[group_id] = (is_typing, now)
+        self.report_typing(group_id, is_typing)
+    
+    def report_typing(self, group_id, is_typing):
+        from .chat_typing import get_typing_aggregator
+        
+        get_typing_aggregator(self.channel_layer).update(
+            group_id,
+            self.user.id,
+            self.username,
+            is_typing
+        )
+    
+    async def update_presence(self, online):
+        """
+        Mark this connection online (connect/heartbeat) or gone (disconnect)
+        
+        OPTIMIZATION: Presence lives in the cache with a TTL, so nothing is written to
+        the database per heartbeat; only came-online/went-offline transitions are pushed.
+        """
+        from .chat_presence import mark_offline, mark_online
+        
+        if online:
+            self.presence_online = True
+            changes = mark_online(self.user.id, self.username, self.channel_name, self.group_ids)
+        else:
+            self.presence_online = False
+            changes = mark_offline(self.user.id, self.username, self.channel_name, self.group_ids)
+        await self.push_presence(changes)
+    
+    async def push_presence(self, changes):
+        """Send presence deltas to the groups they happened in (each frame encoded once)"""
+        for group_id, user_id, username, is_online in changes:
+            try:
+                await self.channel_layer.group_send(
+                    f'chat_{group_id}',
+                    {
+                        'type': 'presence_update',
+                        'text': json.dumps({
+                            'type': 'presence',
+                            'group_id': group_id,
+                            'user': {'id': user_id, 'username': username},
+                            'status': 'online' if is_online else 'offline',
+                        })
+                    }
+                )
+            except Exception as e:
+                print(f"Error sending presence update for group {group_id}: {e}")
     
     async def chat_message(self, event):
-        """Handle chat message event from channel layer"""
-        message = event['message'].copy()  # Copy to avoid mutating original
+        """Handle chat message event from channel layer (frame pre-encoded by the sender)"""
+        await self.send(text_data=event['text'])
+    
+    async def typing_update(self, event):
+        """
+        Handle an aggregated typing frame (pre-encoded; clients leave themselves out)
         
-        # Set is_own based on whether this user is the sender
-        message['is_own'] = message.get('sender_id') == self.user.id
+        Typing is dropped first under backpressure: a frame that waited in this
+        consumer's queue past MAX_FRAME_LAG_SECONDS is stale and skipped.
+        """
+        from .chat_typing import MAX_FRAME_LAG_SECONDS
+        
+        if time.time() - event['sent_at'] > MAX_FRAME_LAG_SECONDS:
+            return
+        await self.send(text_data=event['text'])
+    
+    async def presence_update(self, event):
+        """Handle a presence delta (pre-encoded)"""
+        await self.send(text_data=event['text'])
+    
+    async def membership_changed(self, event):
+        """Handle a membership change of this user (see notify_membership_change)"""
+        from .chat_presence import leave_group, mark_online
         
-        # Send to client
+        group_id = event['group_id']
+        if event['is_member']:
+            self.group_ids.add(group_id)
+            if event.get('group_type') == 'support' and self.support_group_id is None:
+                self.support_group_id = group_id
+            if self.subscribe_all:
+                await self.subscribe(group_id)
+            if self.presence_online:
+                await self.push_presence(mark_online(self.user.id, self.username, self.channel_name, [group_id]))
+            return
+        
+        self.group_ids.discard(group_id)
+        if self.presence_online:
+            await self.push_presence(leave_group(self.user.id, self.username, group_id))
+        if self.support_group_id == group_id:
+            self.support_group_id = None
+        # Stop receiving the room's messages once removed
+        await self.unsubscribe(group_id)
+        if self.group_id == group_id:
+            self.group_id = None
+    
+    async def price_alert(self, event):
+        """Handle triggered price alert event"""
         await self.send(text_data=json.dumps({
-            'type': 'new_message',
-            'message': message
+            'type': 'price_alert',
+            'alert': event['alert']
         }))
     
-    async def typing_indicator(self, event):
-        """Handle typing indicator event"""
-        # Don't send typing indicator back to the typer
-        if event['user_id'] != self.user.id:
-            await self.send(text_data=json.dumps({
-                'type': 'typing',
-                'user_id': event['user_id'],
-                'username': event['username'],
-                'is_typing': event['is_typing']
-            }))
+    async def save_message(self, content, group_id):
+        """
+        Save message to database
+        
+        OPTIMIZATION: Group commit - the message is queued on the process-wide writer,
+        which inserts everything sent in the last few ms with one bulk INSERT and one
+        group update per transaction; this waits for that commit, so the broadcast
+        carries the real id (ids follow send order for cursors and paging).
+        """
+        import asyncio
+        from django.utils import timezone
+        from .chat_writer import get_message_writer
+        from .models import ChatMessage
+        
+        if group_id:
+            group_id = int(group_id)
+            if group_id not in self.group_ids:
+                return None
+        elif self.support_group_id:
+            group_id = self.support_group_id
+        else:
+            group_id = await self.create_support_chat()
+            if group_id is None:
+                return None
+            self.group_ids.add(group_id)
+            self.support_group_id = group_id
+            await self.subscribe(group_id)
+        
+        message = ChatMessage(
+            group_id=group_id,
+            sender=self.user,
+            content=content,
+            message_type='text',
+            created_at=timezone.now(),
+        )
+        
+        try:
+            await asyncio.wrap_future(get_message_writer().submit(message))
+        except Exception as e:
+            print(f"Error saving message: {e}")
+            return None
+        
+        return {
+            'id': message.id,
+            'content': message.content,
+            'sender': message.get_sender_name(),
+            'sender_id': self.user.id,
+            'message_type': message.message_type,
+            'created_at': message.created_at.strftime('%H:%M'),
+            'group_id': group_id,
+            'is_own': True
+        }
+    
+    @database_sync_to_async
+    def load_memberships(self):
+        """(set of active group ids, support group id or None) for the connected user"""
+        from .chat_replay import replay_start_id
+        from .models import ChatGroupMember
+        
+        # Pin where this process's replay buffers start before anything is broadcast
+        replay_start_id()
+        
+        group_ids = set()
+        support_group_id = None
+        for group_id, group_type in ChatGroupMember.objects.filter(
+            user=self.user,
+            is_active=True,
+            group__is_active=True
+        ).order_by('joined_at').values_list('group_id', 'group__group_type'):
+            group_ids.add(group_id)
+            if group_type == 'support' and support_group_id is None:
+                support_group_id = group_id
+        return group_ids, support_group_id
     
     @database_sync_to_async
-    def save_message(self, content, group_id):
-        """Save message to database"""
+    def create_support_chat(self):
+        """Create the user's support chat on their first message; returns its id or None"""
         from .models import ChatGroup, ChatGroupMember, ChatMessage
         
         try:
-            if group_id:
-                group = ChatGroup.objects.get(id=group_id, is_active=True)
-                # Verify user is member
-                if not ChatGroupMember.objects.filter(
-                    group=group, 
-                    user=self.user, 
-                    is_active=True
-                ).exists():
-                    return None
-            else:
-                # Get or create support chat
-                membership = ChatGroupMember.objects.filter(
-                    user=self.user,
-                    group__group_type='support',
-                    is_active=True
-                ).select_related('group').first()
-                
-                if membership:
-                    group = membership.group
-                else:
-                    # Create support chat
-                    group = ChatGroup.objects.create(
-                        name=f"Support Chat - {self.user.email}",
-                        group_type='support',
-                        created_by=self.user,
-                        avatar='👨‍💻'
-                    )
-                    ChatGroupMember.objects.create(
-                        group=group,
-                        user=self.user,
-                        role='member'
-                    )
-                    # Add welcome message
-                    ChatMessage.objects.create(
-                        group=group,
-                        content="Hello! How can we help you today? 👋",
-                        message_type='system'
-                    )
-            
-            # Create message
-            message = ChatMessage.objects.create(
+            group = ChatGroup.objects.create(
+                name=f"Support Chat - {self.user.email}",
+                group_type='support',
+                created_by=self.user,
+                avatar='👨‍💻'
+            )
+            ChatGroupMember.objects.create(
                 group=group,
-                sender=self.user,
-                content=content,
-                message_type='text'
+                user=self.user,
+                role='member'
             )
-            
-            # Update group timestamp
-            group.save()
-            
-            return {
-                'id': message.id,
-                'content': message.content,
-                'sender': message.get_sender_name(),
-                'sender_id': self.user.id,
-                'message_type': message.message_type,
-                'created_at': message.created_at.strftime('%H:%M'),
-                'group_id': group.id,
-                'is_own': True
-            }
+            # Add welcome message
+            ChatMessage.objects.create(
+                group=group,
+                content="Hello! How can we help you today? 👋",
+                message_type='system'
+            )
+            return group.id
             
         except Exception as e:
             print(f"Error saving message: {e}")
             return None
+
+
+def notify_membership_change(sender, instance, **kwargs):
+    """
+    post_save/post_delete receiver telling the member's open WebSocket connections
+    about the change (after commit), so their cached memberships stay current
+    """
+    from asgiref.sync import async_to_sync
+    from channels.layers import get_channel_layer
+    from django.db import transaction
+    
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and 'is_active' not in update_fields:
+        return
+    
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    
+    # post_delete sends no 'created' argument
+    is_member = instance.is_active and 'created' in kwargs
+    event = {
+        'type': 'membership_changed',
+        'group_id': instance.group_id,
+        'group_type': instance.group.group_type if is_member else None,
+        'is_member': is_member,
+    }
+    
+    def send():
+        try:
+            async_to_sync(channel_layer.group_send)(f'membership_{instance.user_id}', event)
+        except Exception as e:
+            print(f"Error sending membership change for user {instance.user_id}: {e}")
+    
+    transaction.on_commit(send)
@@ -0,0 +1,169 @@
+# stocks/intraday.py
+"""
+Intraday bars for the '1d' chart period.
+Each symbol keeps a fixed-size ring buffer of 5-minute closes in memory. The buffers
+are filled by the bulk price refresher during the session (it downloads 5-minute bars
+then; after the close it uses daily bars for the official close) and on demand for
+empty buffers, so the intraday chart is served from memory and old bars fall off
+automatically.
+"""
+
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from .market_calendar import IST, is_market_open
+
+INTRADAY_INTERVAL = '5m'
+
+# Two sessions of 5-minute bars (09:15-15:30 is 75 bars)
+RING_CAPACITY = 150
+
+# Symbols not covered by the refresher (e.g. indices) are refetched at most this often
+INTRADAY_REFRESH_SECONDS = 300
+
+
+class BarRingBuffer:
+    """Fixed-capacity ring of (epoch seconds, close) bars; the oldest bar is overwritten"""
+
+    def __init__(self, capacity=RING_CAPACITY):
+        self.timestamps = np.zeros(capacity, dtype=np.int64)
+        self.closes = np.zeros(capacity, dtype=np.float64)
+        self.capacity = capacity
+        self.head = 0  # next write position
+        self.count = 0
+        self.refreshed_at = 0.0
+        self.lock = threading.Lock()
+
+    def last_timestamp(self):
+        if not self.count:
+            return None
+        return int(self.timestamps[(self.head - 1) % self.capacity])
+
+    def append(self, timestamp, close):
+        """Add a bar; a bar for the latest timestamp replaces it, older bars are ignored"""
+        with self.lock:
+            last = self.last_timestamp()
+            if last is not None and timestamp < last:
+                return
+            if last is not None and timestamp == last:
+                self.closes[(self.head - 1) % self.capacity] = close
+                return
+            self.timestamps[self.head] = timestamp
+            self.closes[self.head] = close
+            self.head = (self.head + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+
+    def extend(self, timestamps, closes):
+        for timestamp, close in zip(timestamps, closes):
+            self.append(int(timestamp), float(close))
+        self.refreshed_at = time.time()
+
+    def snapshot(self):
+        """Chronological copies of (timestamps, closes)"""
+        with self.lock:
+            if self.count < self.capacity:
+                return self.timestamps[:self.count].copy(), self.closes[:self.count].copy()
+            order = np.r_[self.head:self.capacity, 0:self.head]
+            return self.timestamps[order], self.closes[order]
+
+
+_buffers = {}
+_buffers_lock = threading.Lock()
+
+
+def get_buffer(symbol):
+    buffer = _buffers.get(symbol)
+    if buffer is None:
+        with _buffers_lock:
+            buffer = _buffers.setdefault(symbol, BarRingBuffer())
+    return buffer
+
+
+def record_intraday_bars(data, symbols):
+    """
+    Append 5-minute bars from a yf.download DataFrame to the ring buffers
+
+    Args:
+        data: DataFrame from yf.download(..., interval='5m', group_by='ticker')
+        symbols: Symbols that were requested
+    """
+    if data is None or data.empty:
+        return
+
+    for symbol in symbols:
+        try:
+            if data.columns.nlevels > 1:
+                if symbol not in data.columns.get_level_values(0):
+                    continue
+                closes = data[symbol]['Close']
+            else:
+                closes = data['Close']
+            closes = closes.dropna()
+            if closes.empty:
+                continue
+            # Epoch seconds regardless of the index resolution (ns or us)
+            timestamps = closes.index.as_unit('s').asi8
+            get_buffer(symbol).extend(timestamps, closes.to_numpy(dtype=np.float64))
+        except Exception as e:
+            print(f"Error recording intraday bars for {symbol}: {e}")
+
+
+def refresh_intraday_bars(symbols):
+    """Download today's 5-minute bars for symbols in one call and record them"""
+    import yfinance as yf
+
+    if not symbols:
+        return
+    try:
+        data = yf.download(
+            ' '.join(symbols), period='1d', interval=INTRADAY_INTERVAL,
+            group_by='ticker', progress=False,
+        )
+        record_intraday_bars(data, symbols)
+    except Exception as e:
+        print(f"Error fetching intraday bars: {e}")
+    # Mark as refreshed even when empty so failures don't trigger a download per request
+    now = time.time()
+    for symbol in symbols:
+        get_buffer(symbol).refreshed_at = now
+
+
+def ensure_intraday_bars(symbols):
+    """Fetch bars (in one download) only for symbols whose buffer is empty or stale"""
+    now = time.time()
+    market_open = is_market_open()
+    missing = []
+    for symbol in symbols:
+        buffer = get_buffer(symbol)
+        # Outside the session a filled buffer cannot go stale
+        if now - buffer.refreshed_at > INTRADAY_REFRESH_SECONDS and (market_open or not buffer.count):
+            missing.append(symbol)
+    refresh_intraday_bars(missing)
+
+
+def get_intraday_series(symbol):
+    """
+    Latest session's 5-minute closes for a symbol
+
+    Returns:
+        List of {date: 'HH:MM', value} dictionaries (same shape as the daily history)
+    """
+    ensure_intraday_bars([symbol])
+    timestamps, closes = get_buffer(symbol).snapshot()
+    if not len(timestamps):
+        return []
+
+    # Only the most recent session (the ring also holds the previous one)
+    days = (timestamps + 19800) // 86400  # IST is UTC+05:30
+    keep = days == days[-1]
+
+    return [
+        {
+            'date': datetime.fromtimestamp(int(ts), IST).strftime('%H:%M'),
+            'value': float(close),
+        }
+        for ts, close in zip(timestamps[keep], closes[keep])
+    ]
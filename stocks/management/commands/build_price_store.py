@@ -0,0 +1,36 @@
+"""
+Management command to build or extend the memory-mapped columnar price store.
+Schedule after the close: python manage.py build_price_store
+"""
+
+from django.core.management.base import BaseCommand
+from stocks.price_store import build_price_store, get_store_dir, PRICE_STORE_HISTORY
+
+
+class Command(BaseCommand):
+    help = 'Appends the latest settled sessions (and any new stocks) to the columnar price store'
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbols', nargs='*', help='Symbols to include (default: all stocks)')
+        parser.add_argument(
+            '--history',
+            default=PRICE_STORE_HISTORY,
+            help=f'History downloaded for new symbols or a full build (default: {PRICE_STORE_HISTORY})',
+        )
+        parser.add_argument('--full', action='store_true', help='Rebuild from scratch instead of appending')
+
+    def handle(self, *args, **options):
+        result = build_price_store(
+            symbols=options['symbols'] or None,
+            history=options['history'],
+            full=options['full'],
+        )
+        if result is None:
+            self.stdout.write(self.style.WARNING('No price data downloaded; store unchanged'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Price store generation {result['generation']} in {get_store_dir()}: "
+            f"{result['symbols']} symbols x {result['dates']} days "
+            f"(+{result['new_dates']} days, +{result['new_symbols']} symbols, {result['reloaded']} reloaded)"
+        ))
@@ -0,0 +1,42 @@
+"""
+Management command to load a full NSE/BSE stock listing in one bulk upsert.
+Run with: python manage.py load_stock_universe sample_stocks.csv --exchange NSE
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from stocks.utils import load_stock_universe, EXCHANGE_SUFFIXES
+
+
+class Command(BaseCommand):
+    help = 'Bulk upserts stocks from a listing file and seeds missing prices in chunked batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV with a symbol column (optional name column) or one symbol per line')
+        parser.add_argument(
+            '--exchange',
+            default='NSE',
+            choices=list(EXCHANGE_SUFFIXES),
+            help='Exchange suffix added to bare symbols (default: NSE)',
+        )
+        parser.add_argument(
+            '--no-prices',
+            action='store_true',
+            help='Skip seeding prices for stocks that have none',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            result = load_stock_universe(
+                options['path'],
+                exchange=options['exchange'],
+                seed_prices=not options['no_prices'],
+            )
+        except FileNotFoundError:
+            raise CommandError(f"File not found: {options['path']}")
+
+        self.stdout.write(f"Read {result['total']} symbols from {options['path']}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {result['created']} new stocks, seeded prices for {result['priced']}"
+            )
+        )
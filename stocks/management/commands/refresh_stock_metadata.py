@@ -0,0 +1,36 @@
+"""
+Management command to populate the stock metadata table (sector, industry, market cap, ISIN).
+Run with: python manage.py refresh_stock_metadata
+"""
+
+from django.core.management.base import BaseCommand
+from stocks.utils import refresh_stock_metadata, METADATA_MAX_AGE_DAYS, METADATA_FETCH_WORKERS
+
+
+class Command(BaseCommand):
+    help = 'Fetches missing or stale stock metadata from Yahoo Finance in parallel batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbols', nargs='*', help='Symbols to refresh (default: all stocks)')
+        parser.add_argument(
+            '--max-age-days',
+            type=int,
+            default=METADATA_MAX_AGE_DAYS,
+            help=f'Refetch rows older than this many days (default: {METADATA_MAX_AGE_DAYS})',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=METADATA_FETCH_WORKERS,
+            help=f'Parallel requests (default: {METADATA_FETCH_WORKERS})',
+        )
+        parser.add_argument('--force', action='store_true', help='Refetch even fresh rows')
+
+    def handle(self, *args, **options):
+        count = refresh_stock_metadata(
+            symbols=options['symbols'] or None,
+            max_age_days=options['max_age_days'],
+            workers=options['workers'],
+            force=options['force'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Refreshed metadata for {count} stocks'))
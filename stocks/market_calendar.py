@@ -0,0 +1,151 @@
+# stocks/market_calendar.py
+"""
+NSE/BSE trading calendar used for price freshness and cache TTLs.
+Prices can only move during the equity session (09:15-15:30 IST on trading days),
+so outside it a fetched price stays valid until the next open.
+"""
+
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.utils import timezone
+
+IST = ZoneInfo('Asia/Kolkata')
+
+SESSION_OPEN = time(9, 15)
+SESSION_CLOSE = time(15, 30)
+
+# Closing prices settle a few minutes after the bell; keep refreshing until then
+CLOSE_SETTLE_MINUTES = 15
+
+# Default freshness window for live prices during the session
+LIVE_PRICE_TTL = 300
+
+# Shortest TTL handed out, so boundary instants never produce zero/negative timeouts
+MIN_TTL = 60
+
+# Longest TTL for data users can change (basket holdings), whatever the market hours
+USER_DATA_MAX_TTL = 3600
+
+# NSE and BSE share the equity trading holiday list (weekday closures only).
+# Update yearly from the exchange circular; extra dates can be added through
+# settings.MARKET_HOLIDAYS (iterable of 'YYYY-MM-DD' strings).
+MARKET_HOLIDAYS = {
+    # 2025
+    date(2025, 2, 26), date(2025, 3, 14), date(2025, 3, 31), date(2025, 4, 10),
+    date(2025, 4, 14), date(2025, 4, 18), date(2025, 5, 1), date(2025, 8, 15),
+    date(2025, 8, 27), date(2025, 10, 2), date(2025, 10, 21), date(2025, 10, 22),
+    date(2025, 11, 5), date(2025, 12, 25),
+    # 2026
+    date(2026, 1, 26), date(2026, 3, 3), date(2026, 3, 26), date(2026, 3, 31),
+    date(2026, 4, 3), date(2026, 4, 14), date(2026, 5, 1), date(2026, 5, 28),
+    date(2026, 6, 26), date(2026, 9, 14), date(2026, 10, 2), date(2026, 10, 20),
+    date(2026, 11, 10), date(2026, 11, 24), date(2026, 12, 25),
+}
+
+
+def _holidays():
+    extra = getattr(settings, 'MARKET_HOLIDAYS', ())
+    if not extra:
+        return MARKET_HOLIDAYS
+    return MARKET_HOLIDAYS | {date.fromisoformat(str(day)) for day in extra}
+
+
+def _to_ist(moment=None):
+    moment = moment or timezone.now()
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment.astimezone(IST)
+
+
+def is_trading_day(day):
+    """True for weekdays that are not exchange holidays"""
+    return day.weekday() < 5 and day not in _holidays()
+
+
+def _session_bounds(day):
+    """(open, settle) datetimes for a trading day, where settle is close + settle window"""
+    open_at = datetime.combine(day, SESSION_OPEN, tzinfo=IST)
+    close_at = datetime.combine(day, SESSION_CLOSE, tzinfo=IST)
+    return open_at, close_at + timedelta(minutes=CLOSE_SETTLE_MINUTES)
+
+
+def is_market_open(moment=None):
+    """True while prices can still change (session plus the closing settle window)"""
+    moment = _to_ist(moment)
+    if not is_trading_day(moment.date()):
+        return False
+    open_at, settle_at = _session_bounds(moment.date())
+    return open_at <= moment < settle_at
+
+
+def next_market_open(moment=None):
+    """Start of the next session strictly after moment"""
+    moment = _to_ist(moment)
+    day = moment.date()
+    if is_trading_day(day) and moment < _session_bounds(day)[0]:
+        return _session_bounds(day)[0]
+    day += timedelta(days=1)
+    while not is_trading_day(day):
+        day += timedelta(days=1)
+    return _session_bounds(day)[0]
+
+
+def last_closed_session(moment=None):
+    """Date of the most recent session whose closing prices have settled"""
+    moment = _to_ist(moment)
+    day = moment.date()
+    if is_trading_day(day) and moment >= _session_bounds(day)[1]:
+        return day
+    day -= timedelta(days=1)
+    while not is_trading_day(day):
+        day -= timedelta(days=1)
+    return day
+
+
+def session_end(moment=None):
+    """End of the settle window of the session running at moment (None when closed)"""
+    moment = _to_ist(moment)
+    if not is_market_open(moment):
+        return None
+    return _session_bounds(moment.date())[1]
+
+
+def freshness_deadline(fetched_at, live_ttl=LIVE_PRICE_TTL):
+    """
+    Moment after which a price fetched at fetched_at is stale
+
+    During the session that is fetched_at + live_ttl; a price fetched while the
+    market is closed stays valid until the next open.
+    """
+    if is_market_open(fetched_at):
+        return fetched_at + timedelta(seconds=live_ttl)
+    return next_market_open(fetched_at)
+
+
+def is_price_stale(fetched_at, now=None, live_ttl=LIVE_PRICE_TTL):
+    """Whether a price last fetched at fetched_at needs refreshing"""
+    if fetched_at is None:
+        return True
+    now = now or timezone.now()
+    return now >= freshness_deadline(fetched_at, live_ttl)
+
+
+def market_cache_ttl(live_ttl=LIVE_PRICE_TTL, now=None, max_ttl=None):
+    """
+    Cache timeout (seconds) for anything derived from market prices
+
+    During the session: live_ttl, but never past the end of the session so the
+    closing prices get picked up. Outside it: until the next open, or at most
+    max_ttl when given (entries that also depend on user-editable data).
+    """
+    now = _to_ist(now)
+    end = session_end(now)
+    if end is not None:
+        seconds = min(live_ttl, (end - now).total_seconds())
+    else:
+        seconds = (next_market_open(now) - now).total_seconds()
+    if max_ttl is not None:
+        seconds = min(seconds, max_ttl)
+    return max(MIN_TTL, int(seconds))
@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-19 01:03
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0005_tinyurl'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMetadata',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('long_name', models.CharField(blank=True, max_length=200)),
+                ('sector', models.CharField(blank=True, db_index=True, max_length=100)),
+                ('industry', models.CharField(blank=True, db_index=True, max_length=150)),
+                ('market_cap', models.BigIntegerField(blank=True, null=True)),
+                ('isin', models.CharField(blank=True, max_length=12)),
+                ('currency', models.CharField(blank=True, max_length=10)),
+                ('fetched_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('stock', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='metadata', to='stocks.stock')),
+            ],
+            options={
+                'verbose_name_plural': 'Stock metadata',
+            },
+        ),
+    ]
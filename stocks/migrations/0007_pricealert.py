@@ -0,0 +1,36 @@
+# Generated by Django 6.0 on 2026-10-19 01:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0006_stockmetadata'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alert_type', models.CharField(choices=[('stock', 'Stock Price'), ('basket', 'Basket P/L %')], default='stock', max_length=10)),
+                ('direction', models.CharField(choices=[('above', 'Rises Above'), ('below', 'Falls Below')], max_length=10)),
+                ('threshold', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('triggered_at', models.DateTimeField(blank=True, null=True)),
+                ('triggered_value', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('basket', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='price_alerts', to='stocks.basket')),
+                ('stock', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='price_alerts', to='stocks.stock')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_alerts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['is_active', 'alert_type'], name='stocks_pric_is_acti_c9781c_idx'), models.Index(fields=['user', '-created_at'], name='stocks_pric_user_id_ec1dfe_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 6.0 on 2026-10-19 01:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_group_counters(apps, schema_editor):
+    ChatGroup = apps.get_model('stocks', 'ChatGroup')
+    ChatGroupMember = apps.get_model('stocks', 'ChatGroupMember')
+    ChatMessage = apps.get_model('stocks', 'ChatMessage')
+
+    active_members = ChatGroupMember.objects.filter(
+        group_id=OuterRef('pk'), is_active=True
+    ).order_by().values('group_id').annotate(total=Count('id')).values('total')
+    latest = ChatMessage.objects.filter(
+        group_id=OuterRef('pk'), is_deleted=False
+    ).order_by('-created_at', '-id')
+
+    ChatGroup.objects.update(
+        member_count=Coalesce(Subquery(active_members), 0),
+        last_message_id=Subquery(latest.values('id')[:1]),
+        last_message_at=Subquery(latest.values('created_at')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0007_pricealert'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatgroup',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='stocks.chatmessage'),
+        ),
+        migrations.AddField(
+            model_name='chatgroup',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='chatgroup',
+            name='member_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_group_counters, migrations.RunPython.noop),
+    ]
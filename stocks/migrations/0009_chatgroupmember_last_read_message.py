@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-19 01:20
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_read_cursors(apps, schema_editor):
+    """Start each cursor at the newest message the old global flag marked read (or the member sent)"""
+    ChatGroupMember = apps.get_model('stocks', 'ChatGroupMember')
+    ChatMessage = apps.get_model('stocks', 'ChatMessage')
+
+    newest_seen = ChatMessage.objects.filter(
+        Q(is_read=True) | Q(sender_id=OuterRef('user_id')),
+        group_id=OuterRef('group_id'),
+    ).order_by('-id').values('id')[:1]
+    ChatGroupMember.objects.update(last_read_message_id=Coalesce(Subquery(newest_seen), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0008_chatgroup_denormalized_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatgroupmember',
+            name='last_read_message_id',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_read_cursors, migrations.RunPython.noop),
+    ]
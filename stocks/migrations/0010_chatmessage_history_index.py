@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-19 01:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0009_chatgroupmember_last_read_message'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['group', 'is_deleted', 'id'], name='stocks_chat_group_i_7be6ee_idx'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 # stocks/models.py
 
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 
@@ -26,6 +27,24 @@ class Stock(models.Model):
         ]
 
 
+class StockMetadata(models.Model):
+    """Slow-changing symbol metadata (sector, industry, market cap, ISIN) cached from Yahoo Finance"""
+    stock = models.OneToOneField(Stock, on_delete=models.CASCADE, related_name='metadata')
+    long_name = models.CharField(max_length=200, blank=True)
+    sector = models.CharField(max_length=100, blank=True, db_index=True)
+    industry = models.CharField(max_length=150, blank=True, db_index=True)
+    market_cap = models.BigIntegerField(null=True, blank=True)
+    isin = models.CharField(max_length=12, blank=True)
+    currency = models.CharField(max_length=10, blank=True)
+    fetched_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.stock.symbol} - {self.sector or 'Unknown sector'}"
+
+    class Meta:
+        verbose_name_plural = 'Stock metadata'
+
+
 class Basket(models.Model):
     """Model to store stock baskets"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='baskets', null=True, blank=True, db_index=True)
@@ -98,6 +117,47 @@ class BasketItem(models.Model):
         ]
 
 
+class PriceAlert(models.Model):
+    """Model to store price alerts on a stock price or a basket's profit/loss percentage"""
+    ALERT_TYPE_CHOICES = [
+        ('stock', 'Stock Price'),
+        ('basket', 'Basket P/L %'),
+    ]
+    DIRECTION_CHOICES = [
+        ('above', 'Rises Above'),
+        ('below', 'Falls Below'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='price_alerts')
+    alert_type = models.CharField(max_length=10, choices=ALERT_TYPE_CHOICES, default='stock')
+    stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name='price_alerts', null=True, blank=True)
+    basket = models.ForeignKey(Basket, on_delete=models.CASCADE, related_name='price_alerts', null=True, blank=True)
+    direction = models.CharField(max_length=10, choices=DIRECTION_CHOICES)
+    # Price in rupees for stock alerts, P/L percentage for basket alerts
+    threshold = models.DecimalField(max_digits=12, decimal_places=2)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    triggered_at = models.DateTimeField(null=True, blank=True)
+    triggered_value = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+
+    def __str__(self):
+        target = self.stock.symbol if self.alert_type == 'stock' else self.basket.name
+        return f"{target} {self.direction} {self.threshold}"
+
+    def describe(self):
+        """Human readable condition, e.g. 'RELIANCE.NS above ₹3000.00'"""
+        if self.alert_type == 'stock':
+            return f"{self.stock.symbol} {self.direction} ₹{self.threshold}"
+        return f"{self.basket.name} P/L {self.direction} {self.threshold}%"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['is_active', 'alert_type']),
+            models.Index(fields=['user', '-created_at']),
+        ]
+
+
 # ==========================================
 # Chat Models for Group Messaging
 # ==========================================
@@ -126,18 +186,64 @@ class ChatGroup(models.Model):
     avatar = models.CharField(max_length=10, default='👥')  # Emoji avatar
     is_ai_only = models.BooleanField(default=False)  # True for AI-only support chats
     
+    # Denormalized for the groups list; maintained by the ChatMessage/ChatGroupMember
+    # signal receivers below so listing groups never touches messages or members
+    last_message = models.ForeignKey(
+        'ChatMessage',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    member_count = models.PositiveIntegerField(default=0)
+    
+    DENORMALIZED_FIELDS = ('last_message', 'last_message_at', 'member_count')
+    
     def __str__(self):
         return f"{self.name} ({self.get_group_type_display()})"
     
+    def save(self, **kwargs):
+        # The receivers write the denormalized columns with UPDATEs; a full save of an
+        # instance loaded earlier (admin form, import) must not put back stale values
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.DENORMALIZED_FIELDS
+            ]
+        super().save(**kwargs)
+    
     def get_members_count(self):
-        return self.members.filter(is_active=True).count()
+        return self.member_count
     
     def get_last_message(self):
-        return self.messages.order_by('-created_at').first()
+        return self.last_message
+    
+    @classmethod
+    def refresh_member_count(cls, group_id):
+        """Recount active members in a single UPDATE ... SET member_count = (subquery)"""
+        active_members = ChatGroupMember.objects.filter(
+            group_id=models.OuterRef('pk'), is_active=True
+        ).order_by().values('group_id').annotate(total=models.Count('id')).values('total')
+        cls.objects.filter(pk=group_id).update(
+            member_count=Coalesce(models.Subquery(active_members), 0)
+        )
+    
+    @classmethod
+    def refresh_last_message(cls, group_id):
+        """Point last_message at the newest non-deleted message (after deletes/edits)"""
+        latest = ChatMessage.objects.filter(
+            group_id=models.OuterRef('pk'), is_deleted=False
+        ).order_by('-created_at', '-id')
+        cls.objects.filter(pk=group_id).update(
+            last_message_id=models.Subquery(latest.values('id')[:1]),
+            last_message_at=models.Subquery(latest.values('created_at')[:1]),
+        )
     
     def get_unread_count(self, user):
-        """Get count of unread messages for a specific user"""
-        return self.messages.exclude(sender=user).filter(is_read=False).count()
+        """Get count of unread messages for a specific user (messages from others past their read cursor)"""
+        cursor = self.members.filter(user=user).values_list('last_read_message_id', flat=True).first() or 0
+        return self.messages.filter(id__gt=cursor, is_deleted=False).exclude(sender=user).count()
     
     class Meta:
         ordering = ['-updated_at']
@@ -161,10 +267,30 @@ class ChatGroupMember(models.Model):
     joined_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
     notifications_enabled = models.BooleanField(default=True)
+    # Id of the newest message this member has seen; unread = newer messages from others
+    last_read_message_id = models.BigIntegerField(default=0)
     
     def __str__(self):
         return f"{self.user.email} in {self.group.name}"
     
+    def mark_read(self, message_id):
+        """
+        Advance the read cursor to message_id
+        
+        A single-row conditional UPDATE, skipped entirely when the cursor would not move,
+        so polling an already-read group writes nothing.
+        
+        Returns:
+            True if the cursor advanced
+        """
+        if not message_id or message_id <= self.last_read_message_id:
+            return False
+        updated = ChatGroupMember.objects.filter(
+            pk=self.pk, last_read_message_id__lt=message_id
+        ).update(last_read_message_id=message_id)
+        self.last_read_message_id = message_id
+        return bool(updated)
+    
     class Meta:
         unique_together = ['group', 'user']
         ordering = ['joined_at']
@@ -193,6 +319,7 @@ class ChatMessage(models.Model):
     message_type = models.CharField(max_length=20, choices=MESSAGE_TYPE_CHOICES, default='text')
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Legacy global flag kept for exports; read state is per member (ChatGroupMember.last_read_message_id)
     is_read = models.BooleanField(default=False)
     is_deleted = models.BooleanField(default=False)
     
@@ -219,9 +346,41 @@ class ChatMessage(models.Model):
         indexes = [
             models.Index(fields=['group', '-created_at']),
             models.Index(fields=['sender']),
+            # Keyset history pages and unread range counts
+            models.Index(fields=['group', 'is_deleted', 'id']),
         ]
 
 
+def update_group_on_message_save(sender, instance, created, **kwargs):
+    """post_save receiver keeping ChatGroup.last_message current"""
+    if created and not instance.is_deleted:
+        # One conditional UPDATE; an older message saved late never moves the pointer back
+        ChatGroup.objects.filter(pk=instance.group_id).filter(
+            models.Q(last_message_at__isnull=True) | models.Q(last_message_at__lte=instance.created_at)
+        ).update(
+            last_message_id=instance.id,
+            last_message_at=instance.created_at,
+            updated_at=timezone.now(),
+        )
+    elif not created:
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'is_deleted' in update_fields:
+            ChatGroup.refresh_last_message(instance.group_id)
+
+
+def update_group_on_message_delete(sender, instance, **kwargs):
+    """post_delete receiver: the SET_NULL already cleared the pointer, find the new newest"""
+    ChatGroup.refresh_last_message(instance.group_id)
+
+
+def update_group_member_count(sender, instance, **kwargs):
+    """post_save/post_delete receiver keeping ChatGroup.member_count current"""
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and 'is_active' not in update_fields:
+        return
+    ChatGroup.refresh_member_count(instance.group_id)
+
+
 # ==========================================
 # URL Shortening for Basket Sharing
 # ==========================================
@@ -0,0 +1,357 @@
+# stocks/price_store.py
+"""
+Columnar daily price store for universe-wide analytics.
+Each field is a (symbols x trading days) float32 matrix saved as an .npy file and
+memory-mapped read-only, so screeners, correlations and backtests slice it without
+loading rows or hitting the network. build_price_store() extends it incrementally
+after each session; every build writes a new generation and swaps the manifest last,
+so readers never see a half-written matrix.
+"""
+
+import json
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from .market_calendar import last_closed_session
+from .utils import PRICE_FETCH_CHUNK_SIZE, TIME_PERIODS
+
+PRICE_STORE_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+# History downloaded for a full build and for symbols new to the store
+PRICE_STORE_HISTORY = '5y'
+
+MANIFEST_NAME = 'manifest.json'
+
+# Older generations kept on disk (workers may still have them mapped)
+KEEP_GENERATIONS = 1
+
+# Relative change of an already stored close that means the history was re-adjusted
+# (split or dividend) and the symbol's row has to be reloaded
+ADJUSTMENT_TOLERANCE = 1e-3
+
+# Calendar days covered by each analytics period
+PERIOD_DAYS = {
+    '1d': 1, '7d': 7,
+    '1m': 31, '1mo': 31, '3m': 92, '3mo': 92, '6m': 183, '6mo': 183,
+    '1y': 366, '2y': 731, '3y': 1096, '5y': 1827, '10y': 3653,
+}
+
+
+def get_store_dir():
+    directory = getattr(settings, 'PRICE_STORE_DIR', None)
+    return Path(directory) if directory else settings.BASE_DIR / 'price_store'
+
+
+def _field_path(directory, field, generation):
+    return directory / f'{field}-{generation}.npy'
+
+
+def _read_manifest(directory):
+    try:
+        with open(directory / MANIFEST_NAME) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class PriceStore:
+    """
+    Read-only view of one generation of the store
+
+    Matrices are mapped lazily per field; rows follow self.symbols and columns
+    follow self.dates ('YYYY-MM-DD', ascending).
+    """
+
+    def __init__(self, directory, manifest):
+        self.directory = directory
+        self.generation = manifest['generation']
+        self.symbols = manifest['symbols']
+        self.dates = manifest['dates']
+        self.symbol_index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._fields = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def field(self, name):
+        """Memory-mapped (symbols x dates) float32 matrix of a field"""
+        matrix = self._fields.get(name)
+        if matrix is None:
+            with self._lock:
+                matrix = self._fields.get(name)
+                if matrix is None:
+                    matrix = np.load(_field_path(self.directory, name, self.generation), mmap_mode='r')
+                    self._fields[name] = matrix
+        return matrix
+
+    def date_slice(self, start=None, end=None):
+        """Column slice for dates between start and end (inclusive, 'YYYY-MM-DD' or date)"""
+        lo = bisect_left(self.dates, str(start)) if start else 0
+        hi = bisect_right(self.dates, str(end)) if end else len(self.dates)
+        return slice(lo, hi)
+
+    def window(self, field='close', symbols=None, start=None, end=None):
+        """
+        Slice a field by symbols and date range
+
+        Without symbols the result is a zero-copy view of the mapped file; a symbol
+        subset gathers just those rows. Unknown symbols are skipped.
+
+        Returns:
+            Tuple (symbols, dates, float32 array of shape [len(symbols), len(dates)])
+        """
+        columns = self.date_slice(start, end)
+        matrix = self.field(field)
+        if symbols is None:
+            return self.symbols, self.dates[columns], matrix[:, columns]
+
+        found = [symbol for symbol in symbols if symbol in self.symbol_index]
+        rows = [self.symbol_index[symbol] for symbol in found]
+        return found, self.dates[columns], matrix[rows, columns]
+
+
+_store = None
+_store_mtime = None
+_store_lock = threading.Lock()
+
+
+def get_price_store():
+    """Return the current store generation (remapped after a rebuild), or None if not built"""
+    global _store, _store_mtime
+    directory = get_store_dir()
+    try:
+        mtime = os.stat(directory / MANIFEST_NAME).st_mtime_ns
+    except OSError:
+        return None
+    if _store is not None and _store_mtime == mtime:
+        return _store
+
+    with _store_lock:
+        if _store is None or _store_mtime != mtime:
+            manifest = _read_manifest(directory)
+            if manifest is None:
+                return None
+            _store = PriceStore(directory, manifest)
+            _store_mtime = mtime
+    return _store
+
+
+def store_price_matrix(symbols, period='1y'):
+    """
+    Closing price matrix for symbols served from the store
+
+    Same result shape and cleaning as analytics.load_price_matrix. Only used when
+    the store is current (has the last settled session), covers the whole period
+    and holds every symbol, so callers can fall back to a download otherwise.
+
+    Returns:
+        Dictionary with 'dates', 'symbols' and 'prices' (float64 [dates x symbols]), or None
+    """
+    import pandas as pd
+
+    store = get_price_store()
+    days = PERIOD_DAYS.get(period) or PERIOD_DAYS.get(TIME_PERIODS.get(period, ''))
+    if store is None or not days or not store.dates:
+        return None
+
+    cutoff = last_closed_session()
+    if store.dates[-1] != cutoff.isoformat():
+        return None
+    start = cutoff - timedelta(days=days)
+    if store.dates[0] > start.isoformat() or any(symbol not in store.symbol_index for symbol in symbols):
+        return None
+
+    found, dates, closes = store.window('close', symbols, start=start + timedelta(days=1))
+    close = pd.DataFrame(closes.T, index=dates, columns=found, dtype=np.float64)
+    close = close.ffill().dropna(axis=1, how='all').dropna(axis=0, how='any')
+    if close.empty:
+        return None
+
+    return {
+        'dates': list(close.index),
+        'symbols': list(close.columns),
+        'prices': close.to_numpy(dtype=np.float64),
+    }
+
+
+def _download_fields(symbols, chunk_size=PRICE_FETCH_CHUNK_SIZE, **kwargs):
+    """
+    Daily OHLCV for symbols in chunked yf.download calls
+
+    Returns:
+        Dictionary of field -> DataFrame (index 'YYYY-MM-DD', one column per symbol)
+    """
+    import pandas as pd
+    import yfinance as yf
+
+    parts = {field: [] for field in PRICE_STORE_FIELDS}
+    for i in range(0, len(symbols), chunk_size):
+        chunk = symbols[i:i + chunk_size]
+        try:
+            df = yf.download(chunk, interval='1d', progress=False, auto_adjust=True, **kwargs)
+        except Exception as e:
+            print(f"Error downloading daily bars for chunk starting {chunk[0]}: {e}")
+            continue
+        if df.empty:
+            continue
+
+        for field in PRICE_STORE_FIELDS:
+            column = field.capitalize()
+            if column not in df.columns.get_level_values(0):
+                continue
+            frame = df[column]
+            if isinstance(frame, pd.Series):
+                frame = frame.to_frame(chunk[0])
+            parts[field].append(frame.set_axis(frame.index.strftime('%Y-%m-%d'), axis=0))
+
+    return {field: pd.concat(frames, axis=1) for field, frames in parts.items() if frames}
+
+
+def _adjusted_symbols(store, recent, last_date):
+    """Stored symbols whose close on last_date no longer matches a fresh (re-adjusted) download"""
+    close = recent.get('close')
+    if close is None or last_date not in close.index:
+        return []
+
+    fresh = close.loc[last_date]
+    _, _, stored = store.window('close', list(fresh.index), start=last_date, end=last_date)
+    stored = stored[:, 0].astype(np.float64)
+    fresh = fresh.to_numpy(dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drift = np.abs(fresh / stored - 1)
+    changed = np.isfinite(drift) & (drift > ADJUSTMENT_TOLERANCE)
+    return [symbol for symbol, flag in zip(close.columns, changed) if flag]
+
+
+def build_price_store(symbols=None, history=PRICE_STORE_HISTORY, full=False,
+                      chunk_size=PRICE_FETCH_CHUNK_SIZE):
+    """
+    Create or extend the columnar store up to the last settled session
+
+    OPTIMIZATION: Incremental by default - stored symbols only download the days
+    since the last build (plus one overlap day used to detect re-adjusted history),
+    new symbols download their full history, and existing columns are copied
+    from the mapped previous generation instead of being refetched.
+
+    Args:
+        symbols: Symbols to include (default: every Stock); stored symbols are kept
+        history: yfinance period downloaded for a full build / new symbols
+        full: Discard the current store and rebuild from scratch
+        chunk_size: Symbols per yf.download call
+
+    Returns:
+        Dictionary with generation, symbols, dates, new_symbols, new_dates and reloaded
+    """
+    from .models import Stock
+
+    universe = list(dict.fromkeys(
+        symbols or Stock.objects.order_by('symbol').values_list('symbol', flat=True)
+    ))
+    directory = get_store_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    store = None if full else get_price_store()
+    old_symbols = store.symbols if store else []
+    old_dates = store.dates if store else []
+    cutoff = last_closed_session().isoformat()
+
+    known = set(old_symbols)
+    new_symbols = [symbol for symbol in universe if symbol not in known]
+
+    # Days since the last build for stored symbols, starting on the last stored day
+    recent = {}
+    reloaded = []
+    if old_dates and old_dates[-1] < cutoff:
+        recent = _download_fields(
+            old_symbols, chunk_size,
+            start=old_dates[-1], end=(date.fromisoformat(cutoff) + timedelta(days=1)).isoformat(),
+        )
+        reloaded = _adjusted_symbols(store, recent, old_dates[-1])
+
+    # Full history for new symbols and for symbols whose history was re-adjusted
+    history_kwargs = {'start': old_dates[0]} if old_dates else {'period': history}
+    full_rows = _download_fields(new_symbols + reloaded, chunk_size, **history_kwargs) if new_symbols or reloaded else {}
+
+    if not old_dates and not full_rows:
+        return None
+
+    # Date axis: stored days, then settled days newer than the last stored one
+    downloaded_dates = set()
+    for frames in (recent, full_rows):
+        for frame in frames.values():
+            downloaded_dates.update(frame.index)
+    last_stored = old_dates[-1] if old_dates else ''
+    all_dates = old_dates + sorted(d for d in downloaded_dates if last_stored < d <= cutoff)
+    all_symbols = old_symbols + new_symbols
+    new_columns = slice(len(old_dates), len(all_dates))
+
+    if len(all_dates) == len(old_dates) and not new_symbols and not reloaded:
+        return {
+            'generation': store.generation, 'symbols': len(all_symbols), 'dates': len(all_dates),
+            'new_symbols': 0, 'new_dates': 0, 'reloaded': 0,
+        }
+
+    # Full rebuilds keep counting so a new generation never overwrites a mapped file
+    previous = store.generation if store else (_read_manifest(directory) or {}).get('generation', 0)
+    generation = previous + 1
+    shape = (len(all_symbols), len(all_dates))
+    row_index = {symbol: i for i, symbol in enumerate(all_symbols)}
+
+    for field in PRICE_STORE_FIELDS:
+        tmp_path = directory / f'{field}-{generation}.tmp.npy'
+        out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=shape)
+        out[:] = np.nan
+        if store:
+            out[:len(old_symbols), :len(old_dates)] = store.field(field)
+
+        frame = recent.get(field)
+        if frame is not None and new_columns.stop > new_columns.start:
+            frame = frame.reindex(index=all_dates[new_columns], columns=old_symbols)
+            out[:len(old_symbols), new_columns] = frame.to_numpy(dtype=np.float32).T
+
+        frame = full_rows.get(field)
+        if frame is not None:
+            frame = frame.loc[:, ~frame.columns.duplicated()].reindex(index=all_dates)
+            rows = [row_index[symbol] for symbol in frame.columns]
+            out[rows, :] = frame.to_numpy(dtype=np.float32).T
+
+        out.flush()
+        del out
+        os.replace(tmp_path, _field_path(directory, field, generation))
+
+    manifest = {
+        'generation': generation,
+        'fields': list(PRICE_STORE_FIELDS),
+        'symbols': all_symbols,
+        'dates': all_dates,
+        'built_at': timezone.now().isoformat(),
+    }
+    tmp_manifest = directory / f'{MANIFEST_NAME}.tmp'
+    with open(tmp_manifest, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_manifest, directory / MANIFEST_NAME)
+
+    # Unlinking is safe for processes that still map an older generation
+    for path in directory.glob('*-*.npy'):
+        try:
+            if int(path.stem.rsplit('-', 1)[1]) < generation - KEEP_GENERATIONS:
+                path.unlink()
+        except (ValueError, OSError):
+            continue
+
+    return {
+        'generation': generation,
+        'symbols': len(all_symbols),
+        'dates': len(all_dates),
+        'new_symbols': len(new_symbols),
+        'new_dates': len(all_dates) - len(old_dates),
+        'reloaded': len(reloaded),
+    }
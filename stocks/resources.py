@@ -3,6 +3,10 @@
 from import_export import resources, fields, widgets
 from import_export.widgets import ForeignKeyWidget, DecimalWidget
 from .models import Stock, Basket, BasketItem, ChatGroup, ChatGroupMember, ChatMessage, TinyURL
+from .utils import (
+    fetch_stock_price, get_stock_metadata, fetch_metadata_parallel, store_stock_metadata,
+    _extract_closing_prices,
+)
 from django.contrib.auth import get_user_model
 import yfinance as yf
 from decimal import Decimal
@@ -13,7 +17,7 @@ User = get_user_model()
 class StockResource(resources.ModelResource):
     """
     Resource class for Stock model with import/export functionality.
-    Automatically fetches stock data from Yahoo Finance during import.
+    Automatically fills in missing names and prices during import.
     """
     
     class Meta:
@@ -24,20 +28,50 @@ class StockResource(resources.ModelResource):
         skip_unchanged = True
         report_skipped = True
     
+    def before_import(self, dataset, **kwargs):
+        """
+        Prefetch names and prices for the whole file before rows are processed.
+        Names come from the StockMetadata table and prices from one batched
+        download, instead of a slow Ticker.info call per row. Symbols the table
+        does not know yet are fetched in parallel (and stored after the import).
+        """
+        symbols = []
+        needs_name = []
+        needs_price = []
+        for row in dataset.dict:
+            symbol = self._normalize_symbol(row.get('symbol'))
+            if symbol:
+                symbols.append(symbol)
+                if not row.get('name'):
+                    needs_name.append(symbol)
+                if not row.get('current_price'):
+                    needs_price.append(symbol)
+
+        self._metadata = get_stock_metadata(symbols)
+        self._fetched_metadata = fetch_metadata_parallel(
+            [symbol for symbol in needs_name if symbol not in self._metadata]
+        )
+        self._metadata.update(self._fetched_metadata)
+        self._prices = self._fetch_prices(needs_price)
+        return super().before_import(dataset, **kwargs)
+    
+    def after_import(self, dataset, result, **kwargs):
+        """Keep the metadata fetched for new symbols so the next import finds it"""
+        super().after_import(dataset, result, **kwargs)
+        if not kwargs.get('dry_run') and not result.has_errors():
+            store_stock_metadata(getattr(self, '_fetched_metadata', {}))
+
     def before_import_row(self, row, **kwargs):
         """
         Pre-process each row before import.
-        Fetch stock data from Yahoo Finance if not provided.
+        Fill in name and price from the prefetched data if not provided.
         """
-        symbol = row.get('symbol', '').strip()
+        symbol = self._normalize_symbol(row.get('symbol'))
         
         if symbol:
-            # Add .NS suffix if not present (for NSE stocks)
-            if not symbol.endswith('.NS') and not symbol.endswith('.BO'):
-                symbol = f"{symbol}.NS"
-                row['symbol'] = symbol
+            row['symbol'] = symbol
             
-            # Fetch data from Yahoo Finance if name or price is missing
+            # Fill in data if name or price is missing
             if not row.get('name') or not row.get('current_price'):
                 stock_data = self._fetch_stock_data(symbol)
                 if stock_data:
@@ -46,36 +80,45 @@ class StockResource(resources.ModelResource):
                     if not row.get('current_price'):
                         row['current_price'] = stock_data['price']
     
-    def _fetch_stock_data(self, symbol):
-        """Fetch stock information from yfinance"""
+    @staticmethod
+    def _normalize_symbol(symbol):
+        """Add .NS suffix if not present (for NSE stocks)"""
+        symbol = (symbol or '').strip()
+        if symbol and not symbol.endswith('.NS') and not symbol.endswith('.BO'):
+            symbol = f"{symbol}.NS"
+        return symbol
+    
+    @staticmethod
+    def _fetch_prices(symbols):
+        """Fetch latest closing prices for many symbols in one download"""
+        if not symbols:
+            return {}
         try:
-            stock = yf.Ticker(symbol)
-            info = stock.info
-            
-            # Get current price
-            current_price = None
-            if 'currentPrice' in info:
-                current_price = info['currentPrice']
-            elif 'regularMarketPrice' in info:
-                current_price = info['regularMarketPrice']
-            else:
-                # Try to get from history
-                hist = stock.history(period='1d')
-                if not hist.empty:
-                    current_price = float(hist['Close'].iloc[-1])
-            
-            # Get company name
-            name = info.get('longName') or info.get('shortName') or symbol.split('.')[0]
-            
-            if current_price:
-                return {
-                    'name': name,
-                    'price': Decimal(str(current_price))
-                }
-            return None
+            data = yf.download(' '.join(symbols), period='1d', group_by='ticker', progress=False)
+            return _extract_closing_prices(data, symbols)
         except Exception as e:
-            print(f"Error fetching {symbol}: {e}")
-            return None
+            print(f"Error fetching prices: {e}")
+            return {}
+    
+    def _fetch_stock_data(self, symbol):
+        """Look up stock name (metadata table) and price (prefetched, else yfinance history)"""
+        metadata = getattr(self, '_metadata', {}).get(symbol)
+        if metadata is None:
+            metadata = get_stock_metadata([symbol]).get(symbol, {})
+        
+        current_price = getattr(self, '_prices', {}).get(symbol)
+        if current_price is None:
+            current_price = fetch_stock_price(symbol)
+        
+        # Ticker as the name only when Yahoo has no metadata for the symbol
+        name = metadata.get('long_name') or symbol.split('.')[0]
+        
+        if current_price:
+            return {
+                'name': name,
+                'price': Decimal(str(round(current_price, 2)))
+            }
+        return None
 
 
 class BasketResource(resources.ModelResource):
@@ -0,0 +1,244 @@
+# stocks/search.py
+"""
+In-memory typeahead index over the stock universe.
+Prefix matches come from sorted key arrays searched with bisect; misspellings fall
+back to trigram overlap. The index is rebuilt lazily whenever the universe changes.
+"""
+
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.core.cache import cache
+
+# Bumped whenever stocks are added, renamed or removed
+SEARCH_INDEX_VERSION_KEY = 'stock_search_index_version'
+AUTOCOMPLETE_LIMIT = 10
+MAX_AUTOCOMPLETE_LIMIT = 50
+
+# Fuzzy matching needs a few characters to be meaningful
+MIN_FUZZY_QUERY_LENGTH = 3
+MIN_TRIGRAM_SIMILARITY = 0.4
+# Trigrams in more than max(this, 5% of stocks) are too common to use for fuzzy matching
+MIN_COMMON_TRIGRAM_POSTINGS = 200
+
+# Match tiers, best first
+TIER_EXACT_SYMBOL = 0
+TIER_SYMBOL_PREFIX = 1
+TIER_NAME_PREFIX = 2
+TIER_WORD_PREFIX = 3
+TIER_FUZZY = 4
+
+_TOKEN_RE = re.compile(r'[a-z0-9&]+')
+
+
+def _tokens(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _base_symbol(symbol):
+    """Ticker without the exchange suffix ('TCS.NS' -> 'tcs')"""
+    symbol = symbol.lower()
+    for suffix in ('.ns', '.bo'):
+        if symbol.endswith(suffix):
+            return symbol[:-len(suffix)]
+    return symbol
+
+
+def _trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class StockSearchIndex:
+    """
+    Immutable search index built from (id, symbol, name) rows
+
+    One sorted key array per match tier (bare ticker, compacted company name,
+    later name words), so a prefix lookup is a bisect per tier and only the
+    first few keys of each range are ever scanned.
+    """
+
+    # Keys scanned per tier before ranking; bounds 1-2 character queries
+    SCAN_PER_TIER = 64
+
+    def __init__(self, rows):
+        self.ids = []
+        self.symbols = []
+        self.names = []
+        self.name_words = []
+        self.trigrams = defaultdict(list)
+
+        tier_entries = {TIER_SYMBOL_PREFIX: [], TIER_NAME_PREFIX: [], TIER_WORD_PREFIX: []}
+        for position, (stock_id, symbol, name) in enumerate(rows):
+            base = _base_symbol(symbol)
+            words = _tokens(name)
+            compact_name = ''.join(words)
+
+            self.ids.append(stock_id)
+            self.symbols.append(symbol)
+            self.names.append(name)
+            self.name_words.append(words)
+
+            tier_entries[TIER_SYMBOL_PREFIX].append((base, position))
+            if compact_name:
+                tier_entries[TIER_NAME_PREFIX].append((compact_name, position))
+            for word in words[1:]:
+                tier_entries[TIER_WORD_PREFIX].append((word, position))
+
+            for trigram in _trigrams(base) | _trigrams(compact_name):
+                self.trigrams[trigram].append(position)
+
+        self.max_postings = max(MIN_COMMON_TRIGRAM_POSTINGS, len(self.ids) // 20)
+
+        self.tiers = {}
+        for tier, entries in tier_entries.items():
+            entries.sort()
+            self.tiers[tier] = ([key for key, _ in entries], [position for _, position in entries])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _prefix_matches(self, tier, prefix, limit):
+        """Yield (key, position) for up to limit keys of a tier starting with prefix"""
+        keys, positions = self.tiers[tier]
+        start = bisect_left(keys, prefix)
+        end = min(bisect_left(keys, prefix + '\uffff', lo=start), start + limit)
+        for i in range(start, end):
+            yield keys[i], positions[i]
+
+    def search(self, query, limit=AUTOCOMPLETE_LIMIT, exclude_ids=None):
+        """
+        Ranked top-k matches for a typeahead query
+
+        Args:
+            query: Free text (ticker or company name, with or without exchange suffix)
+            limit: Maximum results
+            exclude_ids: Stock ids to leave out (e.g. stocks already in a basket)
+
+        Returns:
+            List of dicts with id, symbol, name and match ('exact', 'prefix' or 'fuzzy')
+        """
+        words = _tokens(_base_symbol(query.strip()))
+        if not words or not self.ids:
+            return []
+
+        exclude_ids = exclude_ids or set()
+        compact = ''.join(words)
+        scan = max(self.SCAN_PER_TIER, limit * 4)
+        best = {}
+
+        def consider(position, tier, score=0.0):
+            if self.ids[position] in exclude_ids:
+                return
+            if position not in best or (tier, score) < best[position]:
+                best[position] = (tier, score)
+
+        for key, position in self._prefix_matches(TIER_SYMBOL_PREFIX, compact, scan):
+            consider(position, TIER_EXACT_SYMBOL if key == compact else TIER_SYMBOL_PREFIX)
+        for tier in (TIER_NAME_PREFIX, TIER_WORD_PREFIX):
+            for _, position in self._prefix_matches(tier, compact, scan):
+                consider(position, tier)
+
+        # Multi-word queries: first word prefixes a name word, the rest prefix other words
+        if len(words) > 1:
+            for tier in (TIER_NAME_PREFIX, TIER_WORD_PREFIX):
+                for _, position in self._prefix_matches(tier, words[0], scan):
+                    if all(any(w.startswith(word) for w in self.name_words[position]) for word in words[1:]):
+                        consider(position, tier)
+
+        # Trigram fallback for typos once prefix hits run out
+        if len(best) < limit and len(compact) >= MIN_FUZZY_QUERY_LENGTH:
+            query_trigrams = _trigrams(compact)
+            overlap = defaultdict(int)
+            for trigram in query_trigrams:
+                postings = self.trigrams.get(trigram, ())
+                # Trigrams shared by a large slice of the universe ('ltd', 'ind')
+                # say little about the match and dominate the cost, so skip them
+                if len(postings) > self.max_postings:
+                    continue
+                for position in postings:
+                    overlap[position] += 1
+            for position, shared in overlap.items():
+                similarity = shared / len(query_trigrams)
+                if similarity >= MIN_TRIGRAM_SIMILARITY and position not in best:
+                    consider(position, TIER_FUZZY, -similarity)
+
+        # Within a tier, shorter tickers first (closer to what was typed)
+        top = heapq.nsmallest(
+            limit,
+            best.items(),
+            key=lambda item: (item[1], len(self.symbols[item[0]]), self.symbols[item[0]]),
+        )
+
+        return [
+            {
+                'id': self.ids[position],
+                'symbol': self.symbols[position],
+                'name': self.names[position],
+                'match': 'exact' if tier == TIER_EXACT_SYMBOL else 'fuzzy' if tier == TIER_FUZZY else 'prefix',
+            }
+            for position, (tier, _) in top
+        ]
+
+
+_index = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def _current_version():
+    version = cache.get(SEARCH_INDEX_VERSION_KEY)
+    if version is None:
+        # Time-based seed so an evicted key never reuses an old version number
+        cache.add(SEARCH_INDEX_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(SEARCH_INDEX_VERSION_KEY)
+    return version
+
+
+def get_search_index():
+    """Return the process-wide index, rebuilding it if the universe changed"""
+    global _index, _index_version
+    from .models import Stock
+
+    version = _current_version()
+    if _index is not None and _index_version == version:
+        return _index
+
+    with _index_lock:
+        if _index is None or _index_version != version:
+            rows = Stock.objects.order_by('id').values_list('id', 'symbol', 'name')
+            _index = StockSearchIndex(list(rows))
+            _index_version = version
+    return _index
+
+
+def invalidate_search_index(**kwargs):
+    """Mark the index stale (usable directly or as a post_save/post_delete receiver)"""
+    if kwargs.get('update_fields') and not {'symbol', 'name'} & set(kwargs['update_fields']):
+        return
+    try:
+        cache.incr(SEARCH_INDEX_VERSION_KEY)
+    except ValueError:
+        cache.set(SEARCH_INDEX_VERSION_KEY, time.time_ns(), None)
+
+
+def search_stocks(query, limit=AUTOCOMPLETE_LIMIT, exclude_ids=None):
+    """Ranked typeahead matches across symbol and company name"""
+    return get_search_index().search(query, limit=limit, exclude_ids=exclude_ids)
+
+
+def attach_current_prices(results):
+    """Add current_price to search results (prices change constantly, so they are read fresh for the top-k ids)"""
+    from .models import Stock
+
+    prices = dict(
+        Stock.objects.filter(id__in=[result['id'] for result in results]).values_list('id', 'current_price')
+    )
+    for result in results:
+        price = prices.get(result['id'])
+        result['current_price'] = float(price) if price is not None else None
+    return results
@@ -0,0 +1,30 @@
+# stocks/simulation.py
+"""
+Monte Carlo path simulation kernel.
+Kept free of Django imports: process pool workers are spawned fresh and import only
+this module, so they never need configured settings or a loaded app registry.
+"""
+
+import numpy as np
+
+
+def simulate_chunk(returns, method, horizon, checkpoints, num_paths, seed):
+    """
+    Simulate one chunk of growth paths and keep only the checkpoint columns
+
+    Returns:
+        float array [num_paths, len(checkpoints)] of growth multiples (1.0 = no change)
+    """
+    rng = np.random.default_rng(seed)
+
+    if method == 'bootstrap':
+        # Resample historical daily returns with replacement
+        picks = rng.integers(0, len(returns), size=(num_paths, horizon))
+        log_steps = np.log1p(returns[picks])
+    else:
+        # Geometric Brownian motion with drift/volatility estimated from log returns
+        log_returns = np.log1p(returns)
+        log_steps = rng.normal(log_returns.mean(), log_returns.std(), size=(num_paths, horizon))
+
+    np.cumsum(log_steps, axis=1, out=log_steps)
+    return np.exp(log_steps[:, checkpoints])
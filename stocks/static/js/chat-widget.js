@@ -16,6 +16,17 @@
     let typingTimeout = null;
     let displayedMessageIds = new Set();  // Track displayed messages to prevent duplicates
     let isAIOnly = false;  // Track if current chat is AI-only
+    let currentUserId = null;  // From connection_established; broadcasts omit is_own
+    let oldestMessageId = null;  // Keyset cursor for loading older history
+    let hasMoreHistory = false;
+    let loadingHistory = false;
+    let heartbeatTimer = null;
+    let lastMessageId = null;  // Newest message id received on the socket (any group)
+    let replaying = false;  // Missed messages are being replayed after a reconnect
+    let groupsStale = false;
+
+    // Keeps this user online in their groups; the server expires silent connections
+    const HEARTBEAT_INTERVAL_MS = 25000;
 
     // DOM Elements
     const container = document.getElementById('chat-widget-container');
@@ -72,11 +83,13 @@
     }
 
     // WebSocket Connection
+    // One socket multiplexes every group the user belongs to
     function connectWebSocket() {
         const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-        const wsUrl = currentGroupId
-            ? `${protocol}//${window.location.host}/ws/chat/${currentGroupId}/`
-            : `${protocol}//${window.location.host}/ws/chat/`;
+        // After a drop, ask the server to replay only what was missed
+        const resume = lastMessageId !== null ? `?resume_from=${lastMessageId}` : '';
+        const wsUrl = `${protocol}//${window.location.host}/ws/chat/${resume}`;
+        replaying = lastMessageId !== null;
 
         socket = new WebSocket(wsUrl);
 
@@ -84,6 +97,14 @@
             console.log('WebSocket connected');
             updateStatus('Online', 'online');
             reconnectAttempts = 0;
+            socket.send(JSON.stringify({ type: 'subscribe', all: true }));
+
+            clearInterval(heartbeatTimer);
+            heartbeatTimer = setInterval(() => {
+                if (socket && socket.readyState === WebSocket.OPEN) {
+                    socket.send(JSON.stringify({ type: 'heartbeat' }));
+                }
+            }, HEARTBEAT_INTERVAL_MS);
         };
 
         socket.onmessage = function (e) {
@@ -94,6 +115,12 @@
         socket.onclose = function (e) {
             console.log('WebSocket disconnected');
             updateStatus('Offline', 'offline');
+            clearInterval(heartbeatTimer);
+
+            // 4403: not a member of the group; reconnecting would be refused again
+            if (e.code === 4403) {
+                return;
+            }
 
             // Attempt to reconnect with exponential backoff
             if (isOpen && reconnectAttempts < 5) {
@@ -113,10 +140,30 @@
     function handleSocketMessage(data) {
         switch (data.type) {
             case 'connection_established':
-                console.log('Connection established:', data.room);
+                currentUserId = data.user_id;
+                console.log('Connection established:', data.subscriptions);
+                break;
+
+            case 'subscribed':
+                console.log('Subscribed groups:', data.group_ids);
                 break;
 
             case 'new_message':
+                // Broadcasts are encoded once for every receiver, so is_own is derived here
+                data.message.is_own = data.message.sender_id === currentUserId;
+                if (data.message.id) {
+                    lastMessageId = Math.max(lastMessageId || 0, data.message.id);
+                }
+
+                // Other groups arrive on the same socket; refresh their unread counts instead
+                if (data.message.group_id !== currentGroupId) {
+                    if (replaying) {
+                        groupsStale = true;  // once, on replay_complete
+                    } else if (groupsPanel.style.display === 'flex') {
+                        loadGroups();
+                    }
+                    break;
+                }
                 // Only add if it's not our own message (we already added it optimistically)
                 if (!data.message.is_own) {
                     addMessageToUI(data.message);
@@ -140,13 +187,39 @@
                 console.log('Message sent successfully:', data.message?.id);
                 break;
 
+            case 'replay_complete':
+                replaying = false;
+                // Gaps too large to replay: reload those groups from the API
+                if (data.resync.includes(currentGroupId)) {
+                    loadMessages();
+                }
+                if ((groupsStale || data.resync.length) && groupsPanel.style.display === 'flex') {
+                    loadGroups();
+                }
+                groupsStale = false;
+                break;
+
             case 'group_joined':
                 console.log('Joined group:', data.group_id);
                 loadMessages();
                 break;
 
             case 'typing':
-                showTypingIndicator(data.username, data.is_typing);
+                // Aggregated frame listing everyone typing in the group (including us)
+                if (data.group_id === currentGroupId) {
+                    showTypingIndicator(data.users.filter(user => user.id !== currentUserId));
+                }
+                break;
+
+            case 'presence':
+                // Only came-online/went-offline changes are pushed
+                if (data.group_id === currentGroupId) {
+                    updateMemberPresence(data.user.id, data.status === 'online');
+                }
+                break;
+
+            case 'price_alert':
+                showPriceAlert(data.alert);
                 break;
 
             case 'error':
@@ -155,18 +228,37 @@
         }
     }
 
+    function showPriceAlert(alert) {
+        const text = `🔔 Alert triggered: ${alert.description}`;
+        // Use the page's toast helper where available (basket pages)
+        if (typeof window.showMessage === 'function') {
+            window.showMessage(text, 'success');
+        } else {
+            console.log(text);
+        }
+    }
+
     function updateStatus(text, state) {
         statusIndicator.textContent = text;
         statusIndicator.className = 'status ' + state;
     }
 
-    function showTypingIndicator(username, isTyping) {
-        if (isTyping) {
-            document.getElementById('typing-user').textContent = username;
-            typingIndicator.style.display = 'block';
-        } else {
+    function showTypingIndicator(users) {
+        if (users.length === 0) {
             typingIndicator.style.display = 'none';
+            return;
+        }
+
+        let label;
+        if (users.length === 1) {
+            label = `${users[0].username} is`;
+        } else if (users.length === 2) {
+            label = `${users[0].username} and ${users[1].username} are`;
+        } else {
+            label = `${users.length} people are`;
         }
+        document.getElementById('typing-user').textContent = label;
+        typingIndicator.style.display = 'block';
     }
 
     // Send typing indicator
@@ -182,7 +274,7 @@
 
     // Show AI typing indicator
     function showAITyping() {
-        document.getElementById('typing-user').textContent = 'AI Assistant';
+        document.getElementById('typing-user').textContent = 'AI Assistant is';
         typingIndicator.style.display = 'block';
     }
 
@@ -241,12 +333,16 @@
                 updateHeader(data.group_name, data.group_avatar);
                 console.log('data response', data.messages)
                 renderMessages(data.messages);
-
-                // Connect WebSocket after we know the group
-                if (socket) {
-                    socket.close();
+                oldestMessageId = data.oldest_id;
+                hasMoreHistory = data.has_more || false;
+
+                // Keep the one socket; make sure this group is subscribed
+                // (a new support chat may not have existed when we subscribed)
+                if (socket && socket.readyState === WebSocket.OPEN) {
+                    socket.send(JSON.stringify({ type: 'subscribe', group_id: currentGroupId }));
+                } else if (!socket || socket.readyState === WebSocket.CLOSED) {
+                    connectWebSocket();
                 }
-                connectWebSocket();
 
                 // Show group actions for group chats
                 if (currentGroupType === 'group') {
@@ -261,6 +357,34 @@
         }
     }
 
+    // Load the page of history before the oldest displayed message (scrolling back)
+    async function loadOlderMessages() {
+        if (loadingHistory || !hasMoreHistory || !currentGroupId || !oldestMessageId) return;
+        loadingHistory = true;
+
+        try {
+            const response = await fetch(getApiUrl(`/api/chat/messages/?group_id=${currentGroupId}&before_id=${oldestMessageId}`));
+            const data = await response.json();
+
+            if (data.success && data.group_id === currentGroupId) {
+                const older = data.messages.filter(msg => !displayedMessageIds.has(msg.id));
+                older.forEach(msg => displayedMessageIds.add(msg.id));
+
+                // Prepend while keeping the visible messages where they are
+                const previousHeight = messagesContainer.scrollHeight;
+                messagesContainer.insertAdjacentHTML('afterbegin', older.map(msg => createMessageHTML(msg)).join(''));
+                messagesContainer.scrollTop += messagesContainer.scrollHeight - previousHeight;
+
+                oldestMessageId = data.oldest_id || oldestMessageId;
+                hasMoreHistory = data.has_more || false;
+            }
+        } catch (error) {
+            console.error('Error loading older messages:', error);
+        } finally {
+            loadingHistory = false;
+        }
+    }
+
     // Render Messages
     function renderMessages(messages) {
         // Clear the displayed messages tracker for new conversation
@@ -573,7 +697,7 @@
                 const membersList = document.getElementById('members-list');
 
                 membersList.innerHTML = data.members.map(member => `
-                    <div class="member-item">
+                    <div class="member-item${member.is_online ? ' online' : ''}" data-user-id="${member.id}">
                         <div class="member-avatar">${member.username.charAt(0).toUpperCase()}</div>
                         <div class="member-info">
                             <p class="member-name">${escapeHtml(member.username)}${member.is_current_user ? ' (You)' : ''}</p>
@@ -596,6 +720,13 @@
         }
     }
 
+    function updateMemberPresence(userId, isOnline) {
+        const item = document.querySelector(`#members-list .member-item[data-user-id="${userId}"]`);
+        if (item) {
+            item.classList.toggle('online', isOnline);
+        }
+    }
+
     // Add Member
     async function addMember(email) {
         if (!currentGroupId || !email) return;
@@ -779,6 +910,13 @@
         }
     });
 
+    // Load older history when scrolled near the top
+    messagesContainer.addEventListener('scroll', () => {
+        if (messagesContainer.scrollTop < 40) {
+            loadOlderMessages();
+        }
+    });
+
     // Typing indicator on input
     chatInput.addEventListener('input', () => {
         sendTypingIndicator(true);
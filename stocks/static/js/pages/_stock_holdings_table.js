@@ -114,20 +114,22 @@ function closeAddStockModal() {
     modal.style.display = 'none';
 }
 
-function filterAvailableStocks() {
-    const searchTerm = document.getElementById('stock-search-input').value.toLowerCase();
-    const stockItems = document.querySelectorAll('#available-stocks-list .stock-item');
+let availableStocksSearchTimer = null;
 
-    stockItems.forEach(item => {
-        const symbol = item.getAttribute('data-symbol');
-        const name = item.getAttribute('data-name');
+function filterAvailableStocks() {
+    // Search runs server-side (the list is paginated), debounced while typing
+    clearTimeout(availableStocksSearchTimer);
+    availableStocksSearchTimer = setTimeout(function () {
+        const searchTerm = document.getElementById('stock-search-input').value.trim();
+        const basketId = document.querySelector('[data-basket-id]')?.dataset.basketId;
 
-        if (symbol.includes(searchTerm) || name.includes(searchTerm)) {
-            item.style.display = 'flex';
-        } else {
-            item.style.display = 'none';
+        if (basketId) {
+            htmx.ajax('GET', `/basket/${basketId}/available-stocks/?q=${encodeURIComponent(searchTerm)}`, {
+                target: '#available-stocks-list',
+                swap: 'innerHTML'
+            });
         }
-    });
+    }, 300);
 }
 
 // Close modal when clicking outside
@@ -28,20 +28,128 @@ document.querySelector('form').addEventListener('submit', function (e) {
     }
 });
 
-function filterStocks() {
-    const searchTerm = document.getElementById('searchStock').value.toLowerCase();
-    const stockItems = document.querySelectorAll('.stock-checkbox');
+function renderStockOption(stock) {
+    const item = document.createElement('div');
+    item.className = 'stock-checkbox';
+    item.dataset.name = stock.name;
+    item.dataset.symbol = stock.symbol;
+
+    const checkbox = document.createElement('input');
+    checkbox.type = 'checkbox';
+    checkbox.name = 'stocks';
+    checkbox.value = stock.symbol;
+    checkbox.id = 'stock_' + stock.id;
+    checkbox.addEventListener('change', updateCount);
+
+    const label = document.createElement('label');
+    label.htmlFor = checkbox.id;
+    label.className = 'stock-info';
+    const symbol = document.createElement('div');
+    symbol.className = 'stock-symbol';
+    symbol.textContent = stock.symbol;
+    const name = document.createElement('div');
+    name.className = 'stock-name';
+    name.textContent = stock.name;
+    label.append(symbol, name);
+
+    const price = document.createElement('div');
+    price.className = 'stock-price';
+    price.textContent = stock.current_price === null ? 'Price N/A' : '₹' + stock.current_price.toFixed(2);
+
+    item.append(checkbox, label, price);
+    return item;
+}
+
+// Fetch one page of stocks from the server-side stock API and append it.
+// Checked stocks always stay in the list so they are submitted with the form.
+function fetchStocks(cursor) {
+    const list = document.getElementById('stocksList');
+    const loadMore = document.getElementById('loadMoreStocks');
+    const search = document.getElementById('searchStock').value.trim();
+
+    const params = new URLSearchParams({ search: search, length: 50 });
+    if (cursor) {
+        params.set('cursor', cursor);
+    }
+
+    fetch(list.dataset.url + '?' + params.toString())
+        .then(response => response.json())
+        .then(data => {
+            if (!cursor) {
+                list.querySelectorAll('.stock-checkbox').forEach(item => {
+                    if (!item.querySelector('input').checked) {
+                        item.remove();
+                    }
+                });
+                list.querySelector('.no-stocks-message')?.remove();
+            }
+
+            const shown = new Set(
+                Array.from(list.querySelectorAll('.stock-checkbox')).map(item => item.dataset.symbol)
+            );
+            data.data.forEach(stock => {
+                if (!shown.has(stock.symbol)) {
+                    list.appendChild(renderStockOption(stock));
+                }
+            });
 
-    stockItems.forEach(item => {
-        const name = item.getAttribute('data-name').toLowerCase();
-        const symbol = item.getAttribute('data-symbol').toLowerCase();
+            loadMore.dataset.cursor = data.next_cursor || '';
+            loadMore.style.display = data.next_cursor ? '' : 'none';
+        })
+        .catch(error => console.error('Error loading stocks:', error));
+}
+
+// Ranked typeahead results replace the unchecked stocks in the list
+function searchStocks(query) {
+    const list = document.getElementById('stocksList');
+    const loadMore = document.getElementById('loadMoreStocks');
+
+    const params = new URLSearchParams({ q: query, limit: 50 });
+    fetch(list.dataset.autocompleteUrl + '?' + params.toString())
+        .then(response => response.json())
+        .then(data => {
+            list.querySelectorAll('.stock-checkbox').forEach(item => {
+                if (!item.querySelector('input').checked) {
+                    item.remove();
+                }
+            });
+            list.querySelector('.no-stocks-message')?.remove();
+
+            const shown = new Set(
+                Array.from(list.querySelectorAll('.stock-checkbox')).map(item => item.dataset.symbol)
+            );
+            data.results.forEach(stock => {
+                if (!shown.has(stock.symbol)) {
+                    list.appendChild(renderStockOption(stock));
+                }
+            });
+
+            loadMore.dataset.cursor = '';
+            loadMore.style.display = 'none';
+        })
+        .catch(error => console.error('Error searching stocks:', error));
+}
 
-        if (name.includes(searchTerm) || symbol.includes(searchTerm)) {
-            item.style.display = 'flex';
+let stockSearchTimer = null;
+
+function filterStocks() {
+    // Search runs server-side, debounced while typing
+    clearTimeout(stockSearchTimer);
+    stockSearchTimer = setTimeout(() => {
+        const query = document.getElementById('searchStock').value.trim();
+        if (query) {
+            searchStocks(query);
         } else {
-            item.style.display = 'none';
+            fetchStocks(null);
         }
-    });
+    }, 150);
+}
+
+function loadMoreStocks() {
+    const cursor = document.getElementById('loadMoreStocks').dataset.cursor;
+    if (cursor) {
+        fetchStocks(cursor);
+    }
 }
 
 // Initialize count on page load
@@ -149,6 +149,52 @@ function saveEdit(itemId, field) {
 }
 
 
+// Investment amount editing (all quantities are recalculated server-side)
+function toggleInvestmentEdit(show) {
+    const card = document.getElementById('investment-card');
+    card.querySelector('.stat-value').style.display = show ? 'none' : 'block';
+    card.querySelector('.investment-edit').style.display = show ? 'flex' : 'none';
+    if (show) {
+        document.getElementById('investment-input').focus();
+    }
+}
+
+function saveInvestment() {
+    const card = document.getElementById('investment-card');
+    const amount = parseFloat(document.getElementById('investment-input').value);
+
+    if (isNaN(amount) || amount <= 0) {
+        showMessage('Please enter a valid positive amount', 'error');
+        return;
+    }
+
+    const formData = new FormData();
+    formData.append('investment_amount', amount);
+    formData.append('allocation_mode', document.getElementById('investment-allocation-mode').value);
+
+    fetch(card.dataset.editUrl, {
+        method: 'POST',
+        headers: {
+            'X-CSRFToken': csrftoken,
+        },
+        body: formData
+    })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                // Every holding, chart and metric changes; reload to show them
+                window.location.reload();
+            } else {
+                showMessage(data.error || 'Failed to update investment', 'error');
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            showMessage('An error occurred while updating', 'error');
+        });
+}
+
+
 // Allow Enter key to save, Escape to cancel
 document.addEventListener('keydown', function (e) {
     const activeInput = document.activeElement;
@@ -424,9 +470,50 @@ document.querySelectorAll('.period-btn').forEach(button => {
 });
 
 
+// Projected value range (Monte Carlo)
+function formatRupees(value) {
+    return '₹' + value.toLocaleString('en-IN', { maximumFractionDigits: 0 });
+}
+
+async function loadProjection() {
+    const section = document.getElementById('projection-section');
+    const content = document.getElementById('projection-content');
+    if (!section || !content) return;
+
+    try {
+        const response = await fetch(section.dataset.projectionUrl);
+        const data = await response.json();
+
+        if (!data.success) {
+            content.textContent = 'Projection unavailable: ' + (data.error || 'Unknown error');
+            return;
+        }
+
+        const summary = data.summary;
+        content.innerHTML = `
+            <div style="display: grid; grid-template-columns: repeat(auto-fit, minmax(180px, 1fr)); gap: 15px;">
+                <div class="stat-card"><div class="stat-label">Pessimistic (5%)</div><div class="stat-value">${formatRupees(summary.p5_value)}</div></div>
+                <div class="stat-card"><div class="stat-label">Median</div><div class="stat-value">${formatRupees(summary.median_value)}</div></div>
+                <div class="stat-card"><div class="stat-label">Optimistic (95%)</div><div class="stat-value">${formatRupees(summary.p95_value)}</div></div>
+                <div class="stat-card"><div class="stat-label">Chance of Loss</div><div class="stat-value">${summary.probability_of_loss_pct.toFixed(1)}%</div></div>
+            </div>`;
+
+        if (data.missing_symbols.length) {
+            const note = document.createElement('p');
+            note.style.marginTop = '10px';
+            note.textContent = `Excludes ${data.missing_symbols.join(', ')} (${formatRupees(data.excluded_value)}): no price history`;
+            content.appendChild(note);
+        }
+    } catch (error) {
+        console.error('Error loading projection:', error);
+        content.textContent = 'Projection unavailable';
+    }
+}
+
 // Load chart when page is ready
 document.addEventListener('DOMContentLoaded', () => {
     loadPerformanceChart('1m');  // Default to 1 month
+    loadProjection();
 
     // Watch for theme changes to re-render chart
     const observer = new MutationObserver((mutations) => {
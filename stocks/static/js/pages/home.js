@@ -6,6 +6,43 @@
 
         $(document).ready(function() {
             console.log('ready');
-            $('#stocks-table').DataTable();
+            const table = $('#stocks-table');
+            if (!table.length) {
+                return;
+            }
+
+            // Keyset cursor of the last page, reused when paging straight forward
+            let lastPage = null;
+
+            table.DataTable({
+                serverSide: true,
+                processing: true,
+                searchDelay: 300,
+                ajax: {
+                    url: table.data('url'),
+                    data: function (params) {
+                        const order = JSON.stringify(params.order) + params.search.value;
+                        if (lastPage && lastPage.nextCursor && lastPage.order === order
+                                && params.start === lastPage.start + params.length) {
+                            params.cursor = lastPage.nextCursor;
+                        }
+                        lastPage = { start: params.start, order: order, nextCursor: null };
+                    },
+                    dataSrc: function (json) {
+                        if (lastPage) {
+                            lastPage.nextCursor = json.next_cursor;
+                        }
+                        return json.data;
+                    }
+                },
+                columns: [
+                    { data: 'symbol', render: $.fn.dataTable.render.text() },
+                    { data: 'name', render: $.fn.dataTable.render.text() },
+                    { data: 'current_price', render: function (data) { return data === null ? 'N/A' : '₹' + data.toFixed(2); } },
+                    { data: 'last_updated', render: function (data) {
+                        return data ? new Date(data).toLocaleString('en-IN', { day: '2-digit', month: 'short', year: 'numeric', hour: '2-digit', minute: '2-digit', hour12: false }) : '';
+                    } }
+                ]
+            });
         });
     
\ No newline at end of file
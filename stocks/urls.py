@@ -8,16 +8,25 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('populate-stocks/', views.populate_stocks, name='populate_stocks'),
     path('update-prices/', views.update_prices, name='update_prices'),
+    path('api/stocks/', views.stock_list_api, name='stock_list_api'),
+    path('api/stocks/autocomplete/', views.stock_autocomplete, name='stock_autocomplete'),
     
     # Basket management
     path('basket/create/', views.basket_create, name='basket_create'),
     path('basket/<int:basket_id>/', views.basket_detail, name='basket_detail'),
     path('basket/<int:basket_id>/performance/', views.basket_performance, name='basket_performance'),
     path('basket/<int:basket_id>/chart-data/', views.basket_chart_data, name='basket_chart_data'),
+    path('basket/<int:basket_id>/backtest/', views.basket_backtest, name='basket_backtest'),
+    path('basket/<int:basket_id>/exposure/', views.basket_exposure, name='basket_exposure'),
+    path('basket/<int:basket_id>/projection/', views.basket_projection, name='basket_projection'),
     path('basket/<int:basket_id>/delete/', views.basket_delete, name='basket_delete'),
     path('basket/<int:basket_id>/duplicate/', views.basket_duplicate, name='basket_duplicate'),
     path('basket/<int:basket_id>/edit-investment/', views.basket_edit_investment, name='basket_edit_investment'),
+    path('basket/<int:basket_id>/reweight/', views.basket_reweight, name='basket_reweight'),
+    path('basket/<int:basket_id>/optimize/', views.basket_optimize, name='basket_optimize'),
     path('basket/preview/', views.preview_basket, name='preview_basket'),
+    path('basket/preview/sweep/', views.preview_basket_sweep, name='preview_basket_sweep'),
+    path('portfolio/exposure/', views.portfolio_exposure, name='portfolio_exposure'),
     path('basket-item/<int:item_id>/edit/', views.basket_item_edit, name='basket_item_edit'),
     path('basket/<int:basket_id>/stock/<int:stock_id>/delete/', views.basket_stock_delete, name='basket_stock_delete'),
     path('basket/<int:basket_id>/stock/add/', views.basket_stock_add, name='basket_stock_add'),
@@ -38,6 +47,10 @@ urlpatterns = [
     path('api/chat/groups/leave/', views.chat_leave_group, name='chat_leave_group'),
     path('api/chat/users/search/', views.chat_search_users, name='chat_search_users'),
     
+    # Price alerts
+    path('api/alerts/', views.price_alerts, name='price_alerts'),
+    path('api/alerts/<int:alert_id>/delete/', views.price_alert_delete, name='price_alert_delete'),
+    
     # AI Chat API
     path('api/ai/chat/', views.ai_chat, name='ai_chat'),
     
@@ -40,16 +40,27 @@ INDIAN_STOCKS = {
     'UNITDSPR.NS': 'United Spirits',
     'TARIL.NS': 'Transformers & Rectifiers',
     'MAZDOCK.NS': 'Mazagon Dock Shipbuilding',
-    'GRSE.NS': 'Garden Reach Shipbuilders', 
-    'COFORGE.NS': 'Coforge', 
-    'INDHOTEL.NS': 'Indian Hotels Company', 
-    'HEROMOTOCO.NS': 'Hero Motocorp', 
-    'LT.NS': 'Larsen & Toubro', 
-    'RELIANCE.NS': 'Reliance Industries', 
-    'CHAMBLFERT.NS': 'Chambal Fertilisers & Chemicals', 
-    'BEL.NS': 'Bharat Electronics', 
-    'INDIGO.NS': 'Interglobe Aviation', 
-    'BHARTIARTL.NS': 'Bharti Airtel'
+    'GRSE.NS': 'Garden Reach Shipbuilders',
+    'COFORGE.NS': 'Coforge',
+    'INDHOTEL.NS': 'Indian Hotels Company',
+    'HEROMOTOCO.NS': 'Hero Motocorp',
+    'CHAMBLFERT.NS': 'Chambal Fertilisers & Chemicals',
+    'BEL.NS': 'Bharat Electronics',
+    'INDIGO.NS': 'Interglobe Aviation',
+}
+
+# Symbols per yf.download call when refreshing prices in bulk
+PRICE_FETCH_CHUNK_SIZE = 100
+
+# Metadata (sector, industry, market cap, ISIN) changes rarely, so rows are only
+# refetched after this many days; fetches run in parallel threads
+METADATA_MAX_AGE_DAYS = 7
+METADATA_FETCH_WORKERS = 8
+
+# Exchange suffixes used by yfinance
+EXCHANGE_SUFFIXES = {
+    'NSE': '.NS',
+    'BSE': '.BO',
 }
 
 # Indian market indices
@@ -59,7 +70,7 @@ INDIAN_INDICES = {
     '^BSESN': 'Sensex',
 }
 
-# Time period mappings for yfinance
+# Time period mappings for yfinance ('1d' is served from intraday bars, see intraday.py)
 TIME_PERIODS = {
     '1d': '1d',
     '7d': '7d',
@@ -84,6 +95,11 @@ def fetch_index_historical_data(index_symbol, period='1mo'):
         List of {date, value} dictionaries
     """
     try:
+        # Intraday period is served from the in-memory 5-minute bars
+        if period == '1d':
+            from .intraday import get_intraday_series
+            return get_intraday_series(index_symbol)
+        
         # Convert our period format to yfinance format
         yf_period = TIME_PERIODS.get(period, '1mo')
         
@@ -116,6 +132,11 @@ def fetch_stock_historical_data(symbol, period='1mo'):
         List of {date, value} dictionaries
     """
     try:
+        # Intraday period is served from the in-memory 5-minute bars
+        if period == '1d':
+            from .intraday import get_intraday_series
+            return get_intraday_series(symbol)
+        
         yf_period = TIME_PERIODS.get(period, '1mo')
         
         stock = yf.Ticker(symbol)
@@ -152,6 +173,11 @@ def calculate_basket_historical_performance(basket, period='1mo'):
     if not items:
         return []
     
+    # Warm intraday buffers for all holdings with at most one download
+    if period == '1d':
+        from .intraday import ensure_intraday_bars
+        ensure_intraday_bars([item.stock.symbol for item in items])
+    
     # Fetch historical data for all stocks in basket
     stock_histories = {}
     for item in items:
@@ -217,91 +243,124 @@ def fetch_stock_price(symbol):
         return None
 
 
-def update_stock_prices_bulk(symbols):
+def _extract_closing_prices(data, symbols):
+    """
+    Pull the latest closing price per symbol out of a yf.download DataFrame
+
+    Args:
+        data: DataFrame returned by yf.download(..., group_by='ticker')
+        symbols: Symbols that were requested
+
+    Returns:
+        Dictionary of symbol -> float price (symbols without data are omitted)
+    """
+    prices = {}
+    if data.empty:
+        return prices
+
+    for symbol in symbols:
+        try:
+            if data.columns.nlevels > 1:
+                if symbol not in data.columns.get_level_values(0):
+                    continue
+                closes = data[symbol]['Close']
+            else:
+                # Single stock without a ticker level
+                closes = data['Close']
+            closes = closes.dropna()
+            if not closes.empty:
+                prices[symbol] = float(closes.iloc[-1])
+        except Exception as e:
+            print(f"Error reading price for {symbol}: {e}")
+    return prices
+
+
+def update_stock_prices_bulk(symbols, chunk_size=PRICE_FETCH_CHUNK_SIZE):
     """
     OPTIMIZATION: Update prices for multiple stocks in bulk (much faster than one-by-one)
-    
+
+    Symbols are downloaded in chunks (one yf.download per chunk) and all prices are
+    written back with a single bulk_update, so refreshing thousands of stocks costs
+    a handful of HTTP calls and UPDATE batches instead of a query per stock.
+
     Args:
         symbols: List of stock symbols to update
-    
+        chunk_size: Symbols per yf.download call
+
     Returns:
         Number of stocks updated
     """
     from django.utils import timezone
-    from datetime import timedelta
-    
+    from .intraday import INTRADAY_INTERVAL, record_intraday_bars
+    from .market_calendar import is_market_open
+
     if not symbols:
         return 0
-    
-    try:
-        # Fetch data for all symbols at once (much faster!)
-        symbols_str = ' '.join(symbols)
-        data = yf.download(symbols_str, period='1d', group_by='ticker', progress=False)
-        
-        updated_count = 0
-        for symbol in symbols:
-            try:
-                if len(symbols) == 1:
-                    # Single stock
-                    if not data.empty and 'Close' in data.columns:
-                        price = float(data['Close'].iloc[-1])
-                        stock = Stock.objects.get(symbol=symbol)
-                        stock.current_price = Decimal(str(price))
-                        stock.save()
-                        updated_count += 1
-                else:
-                    # Multiple stocks
-                    if symbol in data.columns.get_level_values(0):
-                        stock_data = data[symbol]
-                        if not stock_data.empty and 'Close' in stock_data.columns:
-                            price = float(stock_data['Close'].iloc[-1])
-                            stock = Stock.objects.get(symbol=symbol)
-                            stock.current_price = Decimal(str(price))
-                            stock.save()
-                            updated_count += 1
-            except Exception as e:
-                print(f"Error updating {symbol}: {e}")
-                continue
-        
-        print(f"Bulk updated {updated_count} stock prices")
-        return updated_count
-        
-    except Exception as e:
-        print(f"Error in bulk update: {e}")
-        # Fallback to individual updates
-        updated_count = 0
-        for symbol in symbols:
-            try:
+
+    symbols = list(dict.fromkeys(symbols))
+    prices = {}
+
+    # During the session 5-minute bars: the last close is the current price and the
+    # bars feed the intraday chart. Once the session has settled, daily bars, whose
+    # close is the official closing price rather than the last 5-minute bar.
+    intraday = is_market_open()
+
+    for start in range(0, len(symbols), chunk_size):
+        chunk = symbols[start:start + chunk_size]
+        try:
+            # Fetch data for the whole chunk at once (much faster!)
+            data = yf.download(
+                ' '.join(chunk), period='1d', interval=INTRADAY_INTERVAL if intraday else '1d',
+                group_by='ticker', progress=False,
+            )
+            prices.update(_extract_closing_prices(data, chunk))
+            if intraday:
+                record_intraday_bars(data, chunk)
+        except Exception as e:
+            print(f"Error in bulk download: {e}")
+            # Fallback to individual fetches for this chunk
+            for symbol in chunk:
                 price = fetch_stock_price(symbol)
                 if price:
-                    stock = Stock.objects.get(symbol=symbol)
-                    stock.current_price = Decimal(str(price))
-                    stock.save()
-                    updated_count += 1
-            except Exception as e:
-                print(f"Error updating {symbol}: {e}")
-                continue
-        return updated_count
+                    prices[symbol] = price
+
+    stocks = list(Stock.objects.filter(symbol__in=prices.keys()))
+    now = timezone.now()
+    price_changes = {}
+    for stock in stocks:
+        new_price = Decimal(str(round(prices[stock.symbol], 2)))
+        if stock.current_price is not None and stock.current_price != new_price:
+            price_changes[stock.symbol] = (float(stock.current_price), float(new_price))
+        stock.current_price = new_price
+        # bulk_update skips auto_now, so set the timestamp explicitly
+        stock.last_updated = now
+
+    Stock.objects.bulk_update(stocks, ['current_price', 'last_updated'], batch_size=500)
+
+    print(f"Bulk updated {len(stocks)} stock prices")
+
+    # Fire price alerts crossed between the old and new prices
+    if price_changes:
+        from .alerts import evaluate_price_changes
+        try:
+            evaluate_price_changes(price_changes)
+        except Exception as e:
+            print(f"Error evaluating price alerts: {e}")
+
+    return len(stocks)
 
 
 def update_stock_prices():
-    """Update prices for all stocks in database (with 5-minute cache)"""
-    from datetime import datetime, timedelta
-    from django.utils import timezone
+    """Update prices for all stocks in database (fresh for 5 minutes in session, until the next open otherwise)"""
+    from .market_calendar import is_price_stale
     
-    stocks = Stock.objects.all()
+    stocks = Stock.objects.only('symbol', 'current_price', 'last_updated')
     
-    # Filter stocks that need updating (no price or stale price)
-    stale_stocks = []
-    for stock in stocks:
-        should_update = False
-        if not stock.current_price:
-            should_update = True
-        elif stock.last_updated and stock.last_updated < timezone.now() - timedelta(minutes=5):
-            should_update = True
-        
-        if should_update:
-            stale_stocks.append(stock.symbol)
+    # Filter stocks that need updating (no price or stale price per the trading calendar)
+    stale_stocks = [
+        stock.symbol for stock in stocks
+        if not stock.current_price or is_price_stale(stock.last_updated)
+    ]
     
     if not stale_stocks:
         print("All stock prices are up to date")
@@ -314,31 +373,482 @@ def update_stock_prices():
     return updated_count
 
 
+def upsert_stocks(stock_names, update_names=True):
+    """
+    Insert or update many stocks with a single bulk upsert
+
+    Args:
+        stock_names: Dictionary of symbol -> company name
+        update_names: Overwrite names of existing stocks (False keeps existing rows untouched)
+
+    Returns:
+        List of symbols that did not exist before
+    """
+    if not stock_names:
+        return []
+
+    existing = set(
+        Stock.objects.filter(symbol__in=stock_names.keys()).values_list('symbol', flat=True)
+    )
+    objs = [Stock(symbol=symbol, name=name) for symbol, name in stock_names.items()]
+
+    if update_names:
+        Stock.objects.bulk_create(
+            objs,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['symbol'],
+            update_fields=['name'],
+        )
+    else:
+        Stock.objects.bulk_create(objs, batch_size=1000, ignore_conflicts=True)
+
+    # bulk_create skips post_save, so mark the search index stale explicitly
+    from .search import invalidate_search_index
+    invalidate_search_index()
+
+    return [symbol for symbol in stock_names if symbol not in existing]
+
+
+def read_stock_listing(path, exchange='NSE'):
+    """
+    Read a stock listing file into a symbol -> name mapping
+
+    Accepts a CSV with a 'symbol' column (and optional 'name' column) like
+    stock_import_template.csv, or a plain one-symbol-per-line file like sample_stocks.csv.
+    Exchange suffixes are added to bare symbols.
+
+    Args:
+        path: Path to the listing file
+        exchange: 'NSE' or 'BSE' (decides the .NS/.BO suffix)
+
+    Returns:
+        Tuple of (dictionary of symbol -> name, whether names came from the file)
+    """
+    import csv
+
+    suffix = EXCHANGE_SUFFIXES.get(exchange.upper(), '.NS')
+
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        rows = [row for row in csv.reader(f) if row and row[0].strip()]
+
+    if not rows:
+        return {}, False
+
+    header = [column.strip().lower() for column in rows[0]]
+    if 'symbol' in header:
+        symbol_index = header.index('symbol')
+        name_index = header.index('name') if 'name' in header else None
+        rows = rows[1:]
+    else:
+        symbol_index, name_index = 0, None
+
+    stock_names = {}
+    for row in rows:
+        raw_symbol = row[symbol_index].strip().upper()
+        if not raw_symbol or raw_symbol in ('NAN', 'NONE'):
+            continue
+        symbol = raw_symbol if raw_symbol.endswith(('.NS', '.BO')) else f'{raw_symbol}{suffix}'
+        name = row[name_index].strip() if name_index is not None and len(row) > name_index else ''
+        stock_names[symbol] = name or raw_symbol.rsplit('.', 1)[0]
+
+    return stock_names, name_index is not None
+
+
+def load_stock_universe(path, exchange='NSE', seed_prices=True):
+    """
+    Load a full exchange listing into the Stock table
+
+    One bulk upsert for all symbols, then prices for stocks that have none are
+    seeded through the chunked update_stock_prices_bulk fetcher.
+
+    Args:
+        path: Listing file (see read_stock_listing)
+        exchange: 'NSE' or 'BSE'
+        seed_prices: Fetch prices for stocks without one
+
+    Returns:
+        Dictionary with total, created and priced counts
+    """
+    stock_names, has_names = read_stock_listing(path, exchange)
+
+    # Bare symbol lists carry no names, so never overwrite existing ones with tickers
+    created = upsert_stocks(stock_names, update_names=has_names)
+
+    priced_count = 0
+    if seed_prices:
+        unpriced = list(
+            Stock.objects.filter(symbol__in=stock_names.keys(), current_price__isnull=True)
+            .values_list('symbol', flat=True)
+        )
+        priced_count = update_stock_prices_bulk(unpriced)
+
+    return {
+        'total': len(stock_names),
+        'created': len(created),
+        'priced': priced_count,
+    }
+
+
 def populate_indian_stocks():
     """Populate database with Indian stocks"""
-    created_count = 0
-    for symbol, name in INDIAN_STOCKS.items():
-        stock, created = Stock.objects.get_or_create(
-            symbol=symbol,
-            defaults={'name': name}
-        )
-        if created:
-            created_count += 1
-            # Fetch initial price
-            price = fetch_stock_price(symbol)
-            if price:
-                stock.current_price = Decimal(str(price))
-                stock.save()
-    return created_count
+    created = upsert_stocks(INDIAN_STOCKS, update_names=False)
+    # Fetch initial prices for the new stocks in one batch
+    update_stock_prices_bulk(created)
+    return len(created)
+
+
+def fetch_symbol_metadata(symbol):
+    """
+    Fetch slow-changing metadata for one symbol from yfinance
+
+    This is the only place that calls the (slow) Ticker.info endpoint; everything
+    else reads the StockMetadata table populated by refresh_stock_metadata.
+
+    Returns:
+        Dictionary with long_name, sector, industry, market_cap, isin and currency, or None
+    """
+    try:
+        ticker = yf.Ticker(symbol)
+        info = ticker.info or {}
+        if not info:
+            return None
+
+        isin = ''
+        try:
+            isin = ticker.isin or ''
+        except Exception:
+            pass
+        if isin == '-':
+            isin = ''
+
+        market_cap = info.get('marketCap')
+        return {
+            'long_name': (info.get('longName') or info.get('shortName') or '')[:200],
+            'sector': (info.get('sector') or '')[:100],
+            'industry': (info.get('industry') or '')[:150],
+            'market_cap': int(market_cap) if market_cap else None,
+            'isin': isin[:12],
+            'currency': (info.get('currency') or '')[:10],
+        }
+    except Exception as e:
+        print(f"Error fetching metadata for {symbol}: {e}")
+        return None
+
+
+def refresh_stock_metadata(symbols=None, max_age_days=METADATA_MAX_AGE_DAYS,
+                           workers=METADATA_FETCH_WORKERS, batch_size=50, force=False):
+    """
+    OPTIMIZATION: Populate the StockMetadata table in parallel batches
 
+    Only stocks with no metadata row (or one older than max_age_days) are fetched.
+    Each batch is fetched with a thread pool and written back with one bulk upsert,
+    so a full refresh is a handful of queries regardless of universe size. Stock
+    names that are still just the ticker (bare symbol lists) are replaced with the
+    company name at the same time.
 
-def calculate_equal_weight_basket(stock_symbols, investment_amount):
+    Args:
+        symbols: Symbols to refresh (None = all stocks)
+        max_age_days: Refetch rows older than this
+        workers: Parallel yfinance requests
+        batch_size: Symbols fetched and written per batch
+        force: Refetch even fresh rows
+
+    Returns:
+        Number of metadata rows written
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from datetime import timedelta
+    from django.db.models import Q
+    from django.utils import timezone
+    from .models import StockMetadata
+
+    stocks = Stock.objects.all()
+    if symbols is not None:
+        stocks = stocks.filter(symbol__in=symbols)
+    if not force:
+        cutoff = timezone.now() - timedelta(days=max_age_days)
+        stocks = stocks.filter(Q(metadata__isnull=True) | Q(metadata__fetched_at__lt=cutoff))
+    stocks = list(stocks.only('id', 'symbol', 'name'))
+
+    if not stocks:
+        return 0
+
+    written = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(stocks), batch_size):
+            batch = stocks[start:start + batch_size]
+            results = executor.map(fetch_symbol_metadata, [stock.symbol for stock in batch])
+
+            now = timezone.now()
+            rows = []
+            renamed = []
+            for stock, data in zip(batch, results):
+                if not data:
+                    continue
+                rows.append(StockMetadata(stock=stock, fetched_at=now, **data))
+                if data['long_name'] and stock.name == stock.symbol.rsplit('.', 1)[0]:
+                    stock.name = data['long_name']
+                    renamed.append(stock)
+
+            if rows:
+                _upsert_metadata_rows(rows)
+                written += len(rows)
+            if renamed:
+                Stock.objects.bulk_update(renamed, ['name'])
+                from .search import invalidate_search_index
+                invalidate_search_index()
+
+    print(f"Refreshed metadata for {written} stocks")
+    return written
+
+
+def _upsert_metadata_rows(rows):
+    """Insert or update StockMetadata rows with one bulk upsert"""
+    from .models import StockMetadata
+
+    StockMetadata.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['stock'],
+        update_fields=['long_name', 'sector', 'industry', 'market_cap',
+                       'isin', 'currency', 'fetched_at'],
+    )
+
+
+def fetch_metadata_parallel(symbols, workers=METADATA_FETCH_WORKERS):
+    """
+    Fetch metadata for symbols that may not be stocks yet (e.g. during an import)
+
+    Returns:
+        Dictionary of symbol -> metadata dictionary (failed symbols are omitted)
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(workers, len(symbols))) as executor:
+        results = executor.map(fetch_symbol_metadata, symbols)
+        return {symbol: data for symbol, data in zip(symbols, results) if data}
+
+
+def store_stock_metadata(metadata):
+    """
+    Save metadata fetched by fetch_metadata_parallel for the stocks that now exist
+
+    Returns:
+        Number of metadata rows written
+    """
+    from django.utils import timezone
+    from .models import StockMetadata
+
+    if not metadata:
+        return 0
+    now = timezone.now()
+    rows = [
+        StockMetadata(stock=stock, fetched_at=now, **metadata[stock.symbol])
+        for stock in Stock.objects.filter(symbol__in=metadata.keys()).only('id', 'symbol')
+    ]
+    if rows:
+        _upsert_metadata_rows(rows)
+    return len(rows)
+
+
+def get_stock_metadata(symbols):
+    """
+    Read cached metadata for many symbols with one query
+
+    Returns:
+        Dictionary of symbol -> metadata dictionary (symbols without a row are omitted)
+    """
+    from .models import StockMetadata
+
+    rows = StockMetadata.objects.filter(stock__symbol__in=symbols).values(
+        'stock__symbol', 'long_name', 'sector', 'industry', 'market_cap', 'isin', 'currency'
+    )
+    return {row.pop('stock__symbol'): row for row in rows}
+
+
+# Columns the stock universe API can sort by
+STOCK_SORT_COLUMNS = ('symbol', 'name', 'current_price', 'last_updated')
+STOCK_PAGE_SIZE = 50
+MAX_STOCK_PAGE_SIZE = 500
+
+
+def _encode_stock_cursor(order_by, descending, value, pk):
+    """Opaque keyset cursor: sort column, direction and the last row's (value, id)"""
+    import base64
+    import json
+
+    payload = json.dumps([order_by, descending, None if value is None else str(value), pk])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def _decode_stock_cursor(cursor, order_by, descending):
+    """Decode a cursor, returning (value, id) or None if invalid or for another ordering"""
+    import base64
+    import json
+
+    try:
+        cursor_order, cursor_desc, value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        return None
+    if cursor_order != order_by or cursor_desc != descending or not isinstance(pk, int):
+        return None
+    return value, pk
+
+
+def page_stocks(queryset=None, search='', order_by='symbol', descending=False,
+                cursor=None, offset=0, limit=STOCK_PAGE_SIZE, with_count=False):
+    """
+    OPTIMIZATION: Fetch one page of the stock universe with keyset pagination
+
+    Rows are ordered by (sort column, id). When a cursor from the previous page is
+    given, the page is fetched with a WHERE (value, id) > (last value, last id) seek
+    on the index instead of OFFSET, so deep pages cost the same as the first one.
+    Without a cursor the offset is used (DataTables jumps to arbitrary pages).
+
+    Args:
+        queryset: Stock queryset to page through (default: all stocks)
+        search: Case-insensitive match on symbol or name
+        order_by: One of STOCK_SORT_COLUMNS
+        descending: Sort direction
+        cursor: next_cursor returned for the previous page
+        offset: Rows to skip when no cursor is given
+        limit: Page size (capped at MAX_STOCK_PAGE_SIZE)
+        with_count: Also count rows matching the search
+
+    Returns:
+        Dictionary with stocks (list of dicts), next_cursor (None on the last page)
+        and records_filtered (None unless with_count)
+    """
+    from django.db.models import DecimalField, F, Q, Value
+    from django.db.models.functions import Coalesce
+
+    if queryset is None:
+        queryset = Stock.objects.all()
+    if order_by not in STOCK_SORT_COLUMNS:
+        order_by = 'symbol'
+    limit = max(1, min(int(limit), MAX_STOCK_PAGE_SIZE))
+
+    search = (search or '').strip()
+    if search:
+        queryset = queryset.filter(Q(symbol__icontains=search) | Q(name__icontains=search))
+
+    # Unpriced stocks sort below every real price
+    if order_by == 'current_price':
+        sort_value = Coalesce('current_price', Value(-1), output_field=DecimalField(max_digits=10, decimal_places=2))
+    else:
+        sort_value = F(order_by)
+    queryset = queryset.annotate(sort_value=sort_value)
+
+    records_filtered = queryset.count() if with_count else None
+
+    position = _decode_stock_cursor(cursor, order_by, descending) if cursor else None
+    if position is not None:
+        value, pk = position
+        if descending:
+            queryset = queryset.filter(Q(sort_value__lt=value) | Q(sort_value=value, id__lt=pk))
+        else:
+            queryset = queryset.filter(Q(sort_value__gt=value) | Q(sort_value=value, id__gt=pk))
+        offset = 0
+
+    if descending:
+        queryset = queryset.order_by('-sort_value', '-id')
+    else:
+        queryset = queryset.order_by('sort_value', 'id')
+
+    rows = list(
+        queryset.values('id', 'symbol', 'name', 'current_price', 'last_updated', 'sort_value')
+        [max(0, int(offset)):max(0, int(offset)) + limit + 1]
+    )
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = _encode_stock_cursor(order_by, descending, last['sort_value'], last['id'])
+
+    stocks = [
+        {
+            'id': row['id'],
+            'symbol': row['symbol'],
+            'name': row['name'],
+            'current_price': float(row['current_price']) if row['current_price'] is not None else None,
+            'last_updated': row['last_updated'].isoformat() if row['last_updated'] else None,
+        }
+        for row in rows
+    ]
+
+    return {
+        'stocks': stocks,
+        'next_cursor': next_cursor,
+        'records_filtered': records_filtered,
+    }
+
+
+# Whole-share allocation modes selectable when creating or resizing a basket
+ALLOCATION_MODES = {
+    'floor': 'Round each stock down independently',
+    'optimal': 'Minimize weight error and leftover cash',
+}
+
+
+def allocate_whole_shares(target_amounts, prices, budget, allocation_mode='floor'):
+    """
+    Convert target amounts per stock into whole-share quantities within a budget
+
+    'floor' rounds every stock down independently. 'optimal' starts from the floor and
+    then spends the leftover cash largest-remainder style: stocks are ranked by how
+    much one extra share reduces the squared error against their target amount
+    (p * (p - 2 * shortfall)) and each affordable improving share is bought in order.
+    A floored stock is always less than one share short, so every stock gains at most
+    one share and the whole pass is a single O(n log n) sort.
+
+    Args:
+        target_amounts: List of Decimal target amounts (one per stock)
+        prices: List of Decimal share prices (same order, all > 0)
+        budget: Decimal total that may be spent
+        allocation_mode: One of ALLOCATION_MODES
+
+    Returns:
+        List of integer quantities in the same order
+    """
+    if allocation_mode not in ALLOCATION_MODES:
+        raise ValueError(f'Unknown allocation mode: {allocation_mode}')
+
+    quantities = [int(target / price) for target, price in zip(target_amounts, prices)]
+
+    if allocation_mode == 'floor':
+        return quantities
+
+    leftover = Decimal(str(budget)) - sum(q * p for q, p in zip(quantities, prices))
+
+    # Change in squared error from buying one more share; negative means it helps
+    candidates = []
+    for index, (target, price) in enumerate(zip(target_amounts, prices)):
+        shortfall = target - quantities[index] * price
+        error_change = price * (price - 2 * shortfall)
+        if error_change < 0:
+            candidates.append((error_change, index))
+
+    for error_change, index in sorted(candidates):
+        if prices[index] <= leftover:
+            quantities[index] += 1
+            leftover -= prices[index]
+
+    return quantities
+
+
+def calculate_equal_weight_basket(stock_symbols, investment_amount, allocation_mode='floor'):
     """
     Calculate equal weight allocation for selected stocks
 
     Args:
         stock_symbols: List of stock symbols
         investment_amount: Total amount to invest
+        allocation_mode: How to round to whole shares (see ALLOCATION_MODES)
 
     Returns:
         List of dictionaries with stock allocation details
@@ -350,7 +860,7 @@ def calculate_equal_weight_basket(stock_symbols, investment_amount):
     weight_per_stock = Decimal('100.00') / num_stocks
     amount_per_stock = Decimal(str(investment_amount)) / num_stocks
 
-    allocations = []
+    priced_stocks = []
 
     for symbol in stock_symbols:
         try:
@@ -361,32 +871,116 @@ def calculate_equal_weight_basket(stock_symbols, investment_amount):
                 price = fetch_stock_price(symbol)
                 if price:
                     stock.current_price = Decimal(str(price))
-                    stock.save()
+                    # Price-only save: update_fields lets the search index skip invalidation
+                    stock.save(update_fields=['current_price', 'last_updated'])
 
             if stock.current_price and stock.current_price > 0:
-                # Calculate quantity as whole number
-                quantity = int(amount_per_stock / stock.current_price)
-                
-                # Recalculate actual allocated amount based on whole quantity
-                actual_allocated_amount = quantity * stock.current_price
-                
-                # Recalculate actual weight based on actual allocated amount
-                actual_weight = (actual_allocated_amount / Decimal(str(investment_amount))) * 100
-
-                allocations.append({
-                    'stock': stock,
-                    'weight_percentage': actual_weight,
-                    'allocated_amount': actual_allocated_amount,
-                    'quantity': quantity,
-                    'price': stock.current_price,
-                })
+                priced_stocks.append(stock)
         except Stock.DoesNotExist:
             continue
 
+    # Calculate quantities as whole numbers
+    quantities = allocate_whole_shares(
+        [amount_per_stock] * len(priced_stocks),
+        [stock.current_price for stock in priced_stocks],
+        investment_amount,
+        allocation_mode=allocation_mode,
+    )
+
+    allocations = []
+
+    for stock, quantity in zip(priced_stocks, quantities):
+        # Recalculate actual allocated amount based on whole quantity
+        actual_allocated_amount = quantity * stock.current_price
+
+        # Recalculate actual weight based on actual allocated amount
+        actual_weight = (actual_allocated_amount / Decimal(str(investment_amount))) * 100
+
+        allocations.append({
+            'stock': stock,
+            'weight_percentage': actual_weight,
+            'allocated_amount': actual_allocated_amount,
+            'quantity': quantity,
+            'price': stock.current_price,
+        })
+
     return allocations
 
 
-def create_basket_with_stocks(name, description, investment_amount, stock_symbols, user=None):
+def calculate_equal_weight_sweep(stock_symbols, investment_amounts):
+    """
+    Calculate equal weight allocations for many investment amounts at once (read-only)
+
+    OPTIMIZATION: Loads all prices in one query and computes every allocation in a
+    single vectorized pass. Prices are never fetched or saved here, so the sweep
+    performs no DB writes; symbols without a stored price are reported as missing.
+
+    As in calculate_equal_weight_basket, each stock's target is the amount divided by
+    the number of requested symbols, so missing ones leave their share as cash. The
+    results match it exactly when every symbol has a stored price (the basket
+    calculation would otherwise fetch the missing prices first).
+
+    Args:
+        stock_symbols: List of stock symbols
+        investment_amounts: List of total amounts to evaluate
+
+    Returns:
+        Dictionary with:
+            - stocks: List of {symbol, name, price} in column order
+            - missing_symbols: Symbols skipped because they have no price
+            - results: One entry per amount with quantities, allocated amount,
+              leftover cash and realized weights
+    """
+    import numpy as np
+
+    stocks = list(
+        Stock.objects.filter(symbol__in=stock_symbols, current_price__gt=0).order_by('symbol')
+    )
+    priced_symbols = {stock.symbol for stock in stocks}
+    missing_symbols = sorted(set(stock_symbols) - priced_symbols)
+
+    if not stocks or not investment_amounts:
+        return {'stocks': [], 'missing_symbols': missing_symbols, 'results': []}
+
+    # Work in paise so whole-share flooring matches Decimal arithmetic exactly
+    prices = np.array([int(stock.current_price * 100) for stock in stocks], dtype=np.int64)
+    amounts = np.array(
+        [int((Decimal(str(amount)) * 100).to_integral_value()) for amount in investment_amounts],
+        dtype=np.int64,
+    )
+
+    # floor((amount / n) / price) == amount // (n * price) for positive integers, with
+    # n counting every requested symbol like calculate_equal_weight_basket does
+    num_requested = len(stock_symbols)
+    quantities = amounts[:, None] // (num_requested * prices[None, :])
+    allocated = quantities * prices[None, :]
+    allocated_total = allocated.sum(axis=1)
+    leftover = amounts - allocated_total
+    weights = allocated * 100.0 / amounts[:, None]
+
+    results = []
+    for row in range(len(amounts)):
+        results.append({
+            'investment_amount': float(amounts[row]) / 100,
+            'allocated_amount': float(allocated_total[row]) / 100,
+            'leftover_cash': float(leftover[row]) / 100,
+            'leftover_percentage': round(float(leftover[row]) * 100 / float(amounts[row]), 4),
+            'quantities': quantities[row].tolist(),
+            'weights': np.round(weights[row], 4).tolist(),
+        })
+
+    return {
+        'stocks': [
+            {'symbol': stock.symbol, 'name': stock.name, 'price': float(stock.current_price)}
+            for stock in stocks
+        ],
+        'missing_symbols': missing_symbols,
+        'results': results,
+    }
+
+
+def create_basket_with_stocks(name, description, investment_amount, stock_symbols, user=None,
+                              allocation_mode='floor'):
     """
     Create a basket with equal-weighted stocks (quantities as whole numbers)
 
@@ -396,6 +990,7 @@ def create_basket_with_stocks(name, description, investment_amount, stock_symbol
         investment_amount: Total investment amount
         stock_symbols: List of stock symbols to include
         user: User who owns the basket (optional for backward compatibility)
+        allocation_mode: How to round to whole shares (see ALLOCATION_MODES)
 
     Returns:
         Basket object
@@ -403,7 +998,7 @@ def create_basket_with_stocks(name, description, investment_amount, stock_symbol
     from .models import Basket, BasketItem
 
     # Calculate allocations
-    allocations = calculate_equal_weight_basket(stock_symbols, investment_amount)
+    allocations = calculate_equal_weight_basket(stock_symbols, investment_amount, allocation_mode)
 
     if not allocations:
         return None
@@ -611,6 +1206,49 @@ def recalculate_basket_weights(basket_id):
         }
 
 
+def apply_basket_weights(basket, weights, allocation_mode='floor'):
+    """
+    Apply target weights to every item of a basket with a single bulk write
+
+    Quantities are whole shares at each item's purchase price (same convention as
+    basket_item_edit), sized against the basket's current investment amount.
+
+    Args:
+        basket: Basket model instance
+        weights: Dictionary of symbol -> weight fraction (should sum to 1)
+        allocation_mode: How to round to whole shares (see ALLOCATION_MODES)
+
+    Returns:
+        List of updated BasketItem objects
+    """
+    from .models import BasketItem
+
+    items = list(basket.items.select_related('stock'))
+    if not items:
+        return []
+
+    investment = basket.investment_amount
+    quantities = allocate_whole_shares(
+        [Decimal(str(weights.get(item.stock.symbol, 0))) * investment for item in items],
+        [item.purchase_price for item in items],
+        investment,
+        allocation_mode=allocation_mode,
+    )
+
+    for item, quantity in zip(items, quantities):
+        item.quantity = quantity
+        item.allocated_amount = quantity * item.purchase_price
+        item.weight_percentage = (item.allocated_amount / investment) * 100 if investment > 0 else Decimal('0')
+
+    # OPTIMIZATION: One UPDATE statement for all items instead of a save() per item
+    BasketItem.objects.bulk_update(items, ['quantity', 'allocated_amount', 'weight_percentage'])
+
+    # Bump updated_at so caches keyed on it are invalidated
+    basket.save(update_fields=['updated_at'])
+
+    return items
+
+
 def add_stock_to_basket(basket_id, stock_id, quantity=0):
     """
     Add a stock to an existing basket with initial quantity of 0
@@ -654,7 +1292,7 @@ def add_stock_to_basket(basket_id, stock_id, quantity=0):
             price = fetch_stock_price(stock.symbol)
             if price:
                 stock.current_price = Decimal(str(price))
-                stock.save()
+                stock.save(update_fields=['current_price', 'last_updated'])
         
         # If still no price, return error
         if not stock.current_price or stock.current_price <= 0:
@@ -12,8 +12,10 @@ from .utils import (
     populate_indian_stocks,
     update_stock_prices,
     calculate_equal_weight_basket,
-    create_basket_with_stocks
+    create_basket_with_stocks,
+    ALLOCATION_MODES
 )
+from .market_calendar import USER_DATA_MAX_TTL, market_cache_ttl
 from django.middleware.csrf import get_token
 from django.http import JsonResponse
 from functools import wraps
@@ -44,13 +46,15 @@ def home(request):
     # OPTIMIZATION: Remove automatic price updates on page load
     # Users can manually trigger updates with the "Update Prices" button
     
-    # OPTIMIZATION: Use select_related and prefetch_related to reduce queries
-    stocks = Stock.objects.all().order_by('symbol')
+    # OPTIMIZATION: The stock table is paged server-side by stock_list_api,
+    # so only the count is needed here
+    stock_count = Stock.objects.count()
     
     baskets = []
     total_invested = 0
     total_current_value = 0
     total_profit_loss = 0
+    sector_exposure = []
     
     if request.user.is_authenticated:
         # Filter baskets to show only user's baskets
@@ -67,17 +71,22 @@ def home(request):
             basket_value = cache.get(cache_key)
             if basket_value is None:
                 basket_value = basket.get_total_value()
-                cache.set(cache_key, basket_value, 300)  # Cache for 5 minutes
+                cache.set(cache_key, basket_value, market_cache_ttl(300, max_ttl=USER_DATA_MAX_TTL))  # 5 minutes in session, 1 hour otherwise
             total_current_value += basket_value
         
         total_profit_loss = total_current_value - float(total_invested)
 
+        # OPTIMIZATION: Sector concentration in one grouped query
+        from .analytics import portfolio_exposure as compute_portfolio_exposure
+        sector_exposure = compute_portfolio_exposure(request.user)['groups']
+
     context = {
-        'stocks': stocks,
+        'stock_count': stock_count,
         'baskets': baskets,
         'total_invested': total_invested,
         'total_current_value': total_current_value,
         'total_profit_loss': total_profit_loss,
+        'sector_exposure': sector_exposure,
     }
     return render(request, 'stocks/home.j2', context)
 
@@ -100,14 +109,98 @@ def update_prices(request):
     return redirect('home')
 
 
+def stock_list_api(request):
+    """
+    Server-side DataTables endpoint for the stock universe
+
+    Accepts the standard DataTables parameters (draw, start, length, search[value],
+    order[0][column], order[0][dir], columns[i][data]) plus an optional keyset
+    cursor from the previous response, so only the visible page is sent.
+    """
+    from .utils import page_stocks, STOCK_SORT_COLUMNS, STOCK_PAGE_SIZE
+
+    params = request.GET
+
+    try:
+        draw = int(params.get('draw', 0))
+        start = max(0, int(params.get('start', 0)))
+        length = int(params.get('length', STOCK_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid paging parameters'}, status=400)
+    if length < 0:
+        # DataTables sends -1 for "All"; still cap it
+        length = STOCK_PAGE_SIZE
+
+    order_column = params.get('order[0][column]')
+    order_by = params.get(f'columns[{order_column}][data]', 'symbol') if order_column else params.get('order_by', 'symbol')
+    if order_by not in STOCK_SORT_COLUMNS:
+        order_by = 'symbol'
+    descending = params.get('order[0][dir]', params.get('dir', 'asc')) == 'desc'
+
+    search = params.get('search[value]', params.get('search', ''))
+
+    page = page_stocks(
+        search=search,
+        order_by=order_by,
+        descending=descending,
+        cursor=params.get('cursor'),
+        offset=start,
+        limit=length,
+        with_count=True,
+    )
+
+    # OPTIMIZATION: Universe size only changes on imports
+    records_total = cache.get('stock_count')
+    if records_total is None:
+        records_total = Stock.objects.count()
+        cache.set('stock_count', records_total, 300)
+
+    return JsonResponse({
+        'draw': draw,
+        'recordsTotal': records_total,
+        'recordsFiltered': page['records_filtered'],
+        'data': page['stocks'],
+        'next_cursor': page['next_cursor'],
+    })
+
+
+def stock_autocomplete(request):
+    """
+    Typeahead API: ranked prefix/fuzzy matches on symbol and company name
+
+    Query params: q (text), limit (default 10), basket_id (exclude stocks already held)
+    """
+    from .search import search_stocks, attach_current_prices, AUTOCOMPLETE_LIMIT, MAX_AUTOCOMPLETE_LIMIT
+
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'success': True, 'results': []})
+
+    try:
+        limit = min(max(1, int(request.GET.get('limit', AUTOCOMPLETE_LIMIT))), MAX_AUTOCOMPLETE_LIMIT)
+    except ValueError:
+        limit = AUTOCOMPLETE_LIMIT
+
+    exclude_ids = None
+    basket_id = request.GET.get('basket_id')
+    if basket_id and request.user.is_authenticated:
+        exclude_ids = set(
+            BasketItem.objects.filter(basket_id=basket_id, basket__user=request.user)
+            .values_list('stock_id', flat=True)
+        )
+
+    results = attach_current_prices(search_stocks(query, limit=limit, exclude_ids=exclude_ids))
+
+    return JsonResponse({'success': True, 'results': results})
+
+
 
 
 @login_required
 def basket_create(request):
     """Create a new basket"""
     # OPTIMIZATION: Don't auto-update prices, let users trigger manually
-    
-    stocks = Stock.objects.all().order_by('symbol')
+    from .utils import page_stocks
 
     if request.method == 'POST':
         print('',request.POST)
@@ -115,11 +208,16 @@ def basket_create(request):
         description = request.POST.get('description', '')
         investment_amount = request.POST.get('investment_amount')
         selected_stocks = request.POST.getlist('stocks')
+        allocation_mode = request.POST.get('allocation_mode', 'floor')
 
         # Validation
         if not name or not investment_amount or not selected_stocks:
             messages.error(request, 'Please fill all required fields')
             return redirect('basket_create')
+
+        if allocation_mode not in ALLOCATION_MODES:
+            messages.error(request, 'Invalid allocation mode')
+            return redirect('basket_create')
         
         # Validate minimum 2 stocks
         if len(selected_stocks) < 2:
@@ -141,7 +239,8 @@ def basket_create(request):
             description=description,
             investment_amount=investment_amount,
             stock_symbols=selected_stocks,
-            user=request.user
+            user=request.user,
+            allocation_mode=allocation_mode
         )
 
         if basket:
@@ -157,13 +256,21 @@ def basket_create(request):
     prefill_investment = request.GET.get('investment_amount', '50000')
     prefill_stocks = request.GET.get('stocks', '').split(',') if request.GET.get('stocks') else []
     
+    # OPTIMIZATION: Render only the pre-selected stocks and the first page;
+    # search and "load more" fetch further pages from stock_list_api
+    selected_stocks = Stock.objects.filter(symbol__in=prefill_stocks).order_by('symbol')
+    first_page = page_stocks(queryset=Stock.objects.exclude(symbol__in=prefill_stocks))
+    
     context = {
-        'stocks': stocks,
+        'selected_stocks': selected_stocks,
+        'stocks': first_page['stocks'],
+        'next_cursor': first_page['next_cursor'],
         'csrf_token': get_token(request),
         'prefill_name': prefill_name,
         'prefill_description': prefill_description,
         'prefill_investment': prefill_investment,
         'prefill_stocks': prefill_stocks,
+        'allocation_modes': ALLOCATION_MODES,
     }
     return render(request, 'stocks/basket_create.j2', context)
 
@@ -177,15 +284,15 @@ def basket_detail(request, basket_id):
     # OPTIMIZATION: Use select_related to avoid N+1 queries
     items = basket.items.select_related('stock').all()
 
-    # OPTIMIZATION: Update prices in bulk only if they're stale (>5 mins old)
-    from datetime import timedelta
-    from django.utils import timezone
+    # OPTIMIZATION: Update prices in bulk only if they're stale
+    # (>5 mins old during the session; closing prices stay valid until the next open)
+    from .market_calendar import is_price_stale
     from .utils import update_stock_prices_bulk
     
     stale_stocks = [
         item.stock for item in items
         if not item.stock.current_price or 
-        item.stock.last_updated < timezone.now() - timedelta(minutes=5)
+        is_price_stale(item.stock.last_updated)
     ]
     
     if stale_stocks:
@@ -207,7 +314,7 @@ def basket_detail(request, basket_id):
             'total_profit_loss': total_profit_loss,
             'profit_loss_percentage': profit_loss_percentage,
         }
-        cache.set(cache_key, metrics, 300)  # Cache for 5 minutes
+        cache.set(cache_key, metrics, market_cache_ttl(300, max_ttl=USER_DATA_MAX_TTL))  # 5 minutes in session, 1 hour otherwise
     
     # Load the stock holdings table template partial
     stock_holdings_template = get_template("stocks/_stock_holdings_table.j2")
@@ -227,6 +334,7 @@ def basket_detail(request, basket_id):
         'basket': basket,
         'items': items,
         'stock_holdings_html': stock_holdings_html,  # Pass rendered HTML to main template
+        'allocation_modes': ALLOCATION_MODES,
         **metrics
     }
     return render(request, 'stocks/basket_detail.j2', context)
@@ -248,8 +356,8 @@ def basket_chart_data(request, basket_id):
     if period not in valid_periods:
         period = '1m'
     
-    # OPTIMIZATION: Cache chart data for 1 hour
-    cache_key = f'chart_data_{basket.id}_{period}'
+    # OPTIMIZATION: Cache chart data per basket state (holdings edits bump updated_at)
+    cache_key = f'chart_data_{basket.id}_{basket.updated_at.timestamp()}_{period}'
     cached_data = cache.get(cache_key)
     if cached_data:
         return JsonResponse(cached_data)
@@ -340,8 +448,8 @@ def basket_chart_data(request, basket_id):
         }
     }
     
-    # Cache for 1 hour
-    cache.set(cache_key, response_data, 3600)
+    # Cache for 1 hour in session (5 minutes for intraday bars), until the next open otherwise
+    cache.set(cache_key, response_data, market_cache_ttl(300 if period == '1d' else 3600, max_ttl=USER_DATA_MAX_TTL))
     
     return JsonResponse(response_data)
 
@@ -354,8 +462,8 @@ def basket_performance(request, basket_id):
     
     basket = get_object_or_404(Basket, id=basket_id, user=request.user)
     
-    # OPTIMIZATION: Cache performance data for 1 hour
-    cache_key = f'performance_{basket.id}'
+    # OPTIMIZATION: Cache performance data per basket state (holdings edits bump updated_at)
+    cache_key = f'performance_{basket.id}_{basket.updated_at.timestamp()}'
     performance_data = cache.get(cache_key)
     
     if performance_data is None:
@@ -419,8 +527,8 @@ def basket_performance(request, basket_id):
                         'basket_wins': basket_value > nifty_value
                     })
         
-        # Cache for 1 hour
-        cache.set(cache_key, performance_data, 3600)
+        # Cache for 1 hour in session, until the next open otherwise
+        cache.set(cache_key, performance_data, market_cache_ttl(3600, max_ttl=USER_DATA_MAX_TTL))
     
     context = {
         'basket': basket,
@@ -430,6 +538,132 @@ def basket_performance(request, basket_id):
     return render(request, 'stocks/basket_performance.j2', context)
 
 
+@login_required
+def basket_projection(request, basket_id):
+    """API endpoint for the Monte Carlo projected value range of a basket"""
+    from .analytics import project_basket_value, SIMULATION_METHODS, MAX_SIMULATION_STEPS
+
+    basket = get_object_or_404(Basket, id=basket_id, user=request.user)
+
+    method = request.GET.get('method', 'bootstrap')
+    if method not in SIMULATION_METHODS:
+        method = 'bootstrap'
+
+    try:
+        horizon = min(max(int(request.GET.get('horizon', 252)), 5), 1260)  # 1 week to 5 years
+        num_paths = min(max(int(request.GET.get('paths', 5000)), 100), 100000)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid horizon or path count'})
+
+    # Fewer paths for long horizons so the simulation stays short (100k paths over one
+    # year, 20k over five); the response reports the count actually used
+    num_paths = min(num_paths, MAX_SIMULATION_STEPS // horizon)
+
+    # OPTIMIZATION: Cache per basket state so the simulation runs once per change
+    cache_key = f'projection_{basket.id}_{basket.updated_at.timestamp()}_{method}_{horizon}_{num_paths}'
+    result = cache.get(cache_key)
+    if result is not None:
+        return JsonResponse(result)
+
+    try:
+        result = project_basket_value(basket, horizon=horizon, num_paths=num_paths, method=method)
+    except Exception as e:
+        print(f"Error projecting basket {basket.id}: {e}")
+        return JsonResponse({'success': False, 'error': 'Projection is unavailable right now'})
+
+    if result['success']:
+        cache.set(cache_key, result, market_cache_ttl(3600, max_ttl=USER_DATA_MAX_TTL))  # 1 hour
+
+    return JsonResponse(result)
+
+
+@login_required
+def basket_backtest(request, basket_id):
+    """API endpoint to backtest a basket with periodic rebalancing"""
+    from .analytics import backtest_basket, REBALANCE_FREQUENCIES
+
+    basket = get_object_or_404(Basket, id=basket_id, user=request.user)
+    items = basket.items.select_related('stock').all()
+
+    if not items:
+        return JsonResponse({'success': False, 'error': 'Basket is empty'})
+
+    period = request.GET.get('period', '5y')
+    if period not in ['1m', '3m', '6m', '1y', '3y', '5y']:
+        period = '5y'
+
+    rebalance = request.GET.get('rebalance', 'monthly')
+    if rebalance not in REBALANCE_FREQUENCIES:
+        rebalance = 'monthly'
+
+    # 'equal' re-weights equally, 'current' keeps the basket's own weights
+    weighting = request.GET.get('weighting', 'equal')
+
+    try:
+        transaction_cost_pct = float(request.GET.get('cost', '0.1'))
+        if transaction_cost_pct < 0 or transaction_cost_pct > 10:
+            return JsonResponse({'success': False, 'error': 'Transaction cost must be between 0 and 10%'})
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid transaction cost'})
+
+    # OPTIMIZATION: Cache per basket state and parameters
+    cache_key = (
+        f'backtest_{basket.id}_{basket.updated_at.timestamp()}_'
+        f'{period}_{rebalance}_{weighting}_{transaction_cost_pct}'
+    )
+    result = cache.get(cache_key)
+    if result is not None:
+        return JsonResponse(result)
+
+    weights = None
+    if weighting == 'current':
+        weights = {item.stock.symbol: float(item.weight_percentage) for item in items}
+
+    result = backtest_basket(
+        symbols=[item.stock.symbol for item in items],
+        investment_amount=basket.investment_amount,
+        period=period,
+        rebalance=rebalance,
+        weights=weights,
+        transaction_cost_pct=transaction_cost_pct,
+    )
+
+    if result['success']:
+        result['basket_id'] = basket.id
+        result['weighting'] = weighting
+        cache.set(cache_key, result, market_cache_ttl(3600, max_ttl=USER_DATA_MAX_TTL))  # 1 hour
+
+    return JsonResponse(result)
+
+
+@login_required
+def basket_exposure(request, basket_id):
+    """API endpoint for a basket's sector/industry exposure"""
+    from .analytics import basket_exposure as compute_basket_exposure, EXPOSURE_DIMENSIONS
+
+    basket = get_object_or_404(Basket, id=basket_id, user=request.user)
+
+    group_by = request.GET.get('group_by', 'sector')
+    if group_by not in EXPOSURE_DIMENSIONS:
+        group_by = 'sector'
+
+    result = compute_basket_exposure(basket, group_by)
+    return JsonResponse({'success': True, 'basket_id': basket.id, **result})
+
+
+@login_required
+def portfolio_exposure(request):
+    """API endpoint for sector/industry exposure across all of the user's baskets"""
+    from .analytics import portfolio_exposure as compute_portfolio_exposure, EXPOSURE_DIMENSIONS
+
+    group_by = request.GET.get('group_by', 'sector')
+    if group_by not in EXPOSURE_DIMENSIONS:
+        group_by = 'sector'
+
+    result = compute_portfolio_exposure(request.user, group_by)
+    return JsonResponse({'success': True, **result})
+
+
 @login_required
 def basket_delete(request, basket_id):
     """Delete a basket"""
@@ -455,15 +689,20 @@ def preview_basket(request):
     if request.method == 'POST':
         investment_amount = request.POST.get('investment_amount')
         selected_stocks = request.POST.getlist('stocks')
+        allocation_mode = request.POST.get('allocation_mode', 'floor')
+        if allocation_mode not in ALLOCATION_MODES:
+            allocation_mode = 'floor'
 
         try:
             investment_amount = float(investment_amount)
-            allocations = calculate_equal_weight_basket(selected_stocks, investment_amount)
+            # Same rounding mode as basket_create will use, so the preview matches
+            allocations = calculate_equal_weight_basket(selected_stocks, investment_amount, allocation_mode)
 
             context = {
                 'allocations': allocations,
                 'investment_amount': investment_amount,
                 'num_stocks': len(allocations),
+                'allocation_mode': allocation_mode,
             }
             return render(request, 'stocks/preview_basket.html', context)
         except Exception as e:
@@ -473,6 +712,73 @@ def preview_basket(request):
     return redirect('basket_create')
 
 
+# Upper bound on amounts evaluated by a single sweep request
+MAX_SWEEP_AMOUNTS = 1000
+
+
+@login_required
+def preview_basket_sweep(request):
+    """API to preview equal weight allocations for many investment amounts (no DB writes)"""
+    import json
+    from .utils import calculate_equal_weight_sweep
+
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'POST required'})
+
+    try:
+        if request.content_type == 'application/json':
+            data = json.loads(request.body) if request.body else {}
+            selected_stocks = data.get('stocks', [])
+        else:
+            data = request.POST
+            selected_stocks = request.POST.getlist('stocks')
+
+        if not selected_stocks:
+            return JsonResponse({'success': False, 'error': 'Please select at least one stock'})
+
+        # Either an explicit list of amounts or a min/max/step range
+        if data.get('amounts'):
+            amounts = data['amounts']
+            if isinstance(amounts, str):
+                amounts = amounts.split(',')
+            amounts = [Decimal(str(amount).strip()) for amount in amounts]
+        else:
+            if not data.get('amount_min') or not data.get('amount_max'):
+                return JsonResponse({'success': False, 'error': 'Provide amounts or an amount_min/amount_max range'})
+            amount_min = Decimal(str(data.get('amount_min')))
+            amount_max = Decimal(str(data.get('amount_max')))
+            amount_step = Decimal(str(data.get('amount_step', '1000')))
+            if amount_step <= 0 or amount_max < amount_min:
+                return JsonResponse({'success': False, 'error': 'Invalid amount range'})
+            if (amount_max - amount_min) / amount_step >= MAX_SWEEP_AMOUNTS:
+                return JsonResponse({'success': False, 'error': f'A sweep can evaluate at most {MAX_SWEEP_AMOUNTS} amounts'})
+            count = int((amount_max - amount_min) / amount_step) + 1
+            amounts = [amount_min + amount_step * i for i in range(count)]
+
+        if len(amounts) > MAX_SWEEP_AMOUNTS:
+            return JsonResponse({'success': False, 'error': f'A sweep can evaluate at most {MAX_SWEEP_AMOUNTS} amounts'})
+        if any(amount <= 0 for amount in amounts):
+            return JsonResponse({'success': False, 'error': 'Investment amounts must be positive'})
+
+        sweep = calculate_equal_weight_sweep(selected_stocks, amounts)
+
+        # Highlight the amount that leaves the smallest share of cash unallocated
+        best = min(sweep['results'], key=lambda r: r['leftover_percentage']) if sweep['results'] else None
+
+        return JsonResponse({
+            'success': True,
+            'stocks': sweep['stocks'],
+            'missing_symbols': sweep['missing_symbols'],
+            'results': sweep['results'],
+            'best': best,
+        })
+
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'error': 'Invalid JSON data'})
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)})
+
+
 @login_required
 def basket_item_edit(request, item_id):
     """Edit basket item - update weight or quantity, rebalancing other stocks to maintain 100% total"""
@@ -547,7 +853,6 @@ def basket_item_edit(request, item_id):
                             other_item.allocated_amount = other_item.quantity * other_item.purchase_price
                             # Recalculate actual weight based on whole quantity
                             other_item.weight_percentage = (other_item.allocated_amount / basket.investment_amount) * 100
-                            other_item.save()
                     else:
                         # If other items had 0 weight, distribute equally
                         equal_weight = remaining_weight / len(other_items)
@@ -560,7 +865,14 @@ def basket_item_edit(request, item_id):
                             other_item.allocated_amount = other_item.quantity * other_item.purchase_price
                             # Recalculate actual weight based on whole quantity
                             other_item.weight_percentage = (other_item.allocated_amount / basket.investment_amount) * 100
-                            other_item.save()
+                    
+                    # OPTIMIZATION: Save all rebalanced items in one UPDATE
+                    BasketItem.objects.bulk_update(
+                        list(other_items), ['weight_percentage', 'allocated_amount', 'quantity']
+                    )
+                
+                # Bump updated_at so every cache keyed on the basket state misses
+                basket.save(update_fields=['updated_at'])
                 
             elif update_type == 'quantity':
                 # Update quantity, recalculate all weights (quantity must be whole number)
@@ -588,7 +900,7 @@ def basket_item_edit(request, item_id):
                 for basket_item in all_items:
                     # Keep quantity as is, just recalculate weight
                     basket_item.weight_percentage = (basket_item.allocated_amount / total_allocated) * 100 if total_allocated > 0 else 0
-                    basket_item.save()
+                BasketItem.objects.bulk_update(list(all_items), ['weight_percentage'])
             
             else:
                 return JsonResponse({'success': False, 'error': 'Invalid update type'})
@@ -633,6 +945,118 @@ def basket_item_edit(request, item_id):
     return JsonResponse({'success': False, 'error': 'Invalid request method'})
 
 
+@login_required
+def basket_reweight(request, basket_id):
+    """Re-weight a whole basket using a weighting scheme (equal, market cap, inverse volatility, min variance)"""
+    from .analytics import compute_scheme_weights, WEIGHTING_SCHEMES
+    from .utils import apply_basket_weights
+
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'})
+
+    basket = get_object_or_404(Basket, id=basket_id, user=request.user)
+
+    scheme = request.POST.get('scheme', 'equal')
+    allocation_mode = request.POST.get('allocation_mode', 'floor')
+
+    if scheme not in WEIGHTING_SCHEMES:
+        return JsonResponse({'success': False, 'error': 'Invalid weighting scheme'})
+    if allocation_mode not in ALLOCATION_MODES:
+        return JsonResponse({'success': False, 'error': 'Invalid allocation mode'})
+
+    try:
+        symbols = list(basket.items.values_list('stock__symbol', flat=True))
+        weights = compute_scheme_weights(symbols, scheme)
+        items = apply_basket_weights(basket, weights, allocation_mode)
+
+        items_data = [{
+            'id': item.id,
+            'symbol': item.stock.symbol,
+            'target_weight': round(weights.get(item.stock.symbol, 0) * 100, 2),
+            'weight_percentage': float(item.weight_percentage),
+            'quantity': int(item.quantity),
+            'allocated_amount': float(item.allocated_amount),
+            'current_value': item.get_current_value(),
+            'profit_loss': item.get_profit_loss(),
+        } for item in items]
+
+        return JsonResponse({
+            'success': True,
+            'scheme': scheme,
+            'items': items_data,
+            'investment_amount': float(basket.investment_amount),
+            'total_current_value': basket.get_total_value(),
+            'total_profit_loss': basket.get_profit_loss(),
+            'profit_loss_percentage': basket.get_profit_loss_percentage(),
+        })
+
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)})
+
+
+@login_required
+def basket_optimize(request, basket_id):
+    """Optimize basket weights (max Sharpe or min variance) and round to whole shares"""
+    from .analytics import optimize_weights, OPTIMIZATION_OBJECTIVES
+    from .utils import apply_basket_weights
+
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'})
+
+    basket = get_object_or_404(Basket, id=basket_id, user=request.user)
+
+    objective = request.POST.get('objective', 'max_sharpe')
+    allocation_mode = request.POST.get('allocation_mode', 'floor')
+    preview = request.POST.get('preview') == 'true'
+
+    if objective not in OPTIMIZATION_OBJECTIVES:
+        return JsonResponse({'success': False, 'error': 'Invalid optimization objective'})
+    if allocation_mode not in ALLOCATION_MODES:
+        return JsonResponse({'success': False, 'error': 'Invalid allocation mode'})
+
+    try:
+        # Per-stock cap given as a percentage (100 = unconstrained)
+        max_weight = Decimal(request.POST.get('max_weight', '100'))
+        if max_weight <= 0 or max_weight > 100:
+            return JsonResponse({'success': False, 'error': 'Max weight must be between 0 and 100'})
+
+        symbols = list(basket.items.values_list('stock__symbol', flat=True))
+        result = optimize_weights(symbols, objective, max_weight=float(max_weight) / 100)
+
+        response = {
+            'success': True,
+            'objective': objective,
+            'target_weights': {symbol: round(w * 100, 2) for symbol, w in result['weights'].items()},
+            'expected_return_pct': result['expected_return_pct'],
+            'volatility_pct': result['volatility_pct'],
+            'sharpe_ratio': result['sharpe_ratio'],
+            'applied': not preview,
+        }
+
+        if not preview:
+            items = apply_basket_weights(basket, result['weights'], allocation_mode)
+            response.update({
+                'items': [{
+                    'id': item.id,
+                    'symbol': item.stock.symbol,
+                    'weight_percentage': float(item.weight_percentage),
+                    'quantity': int(item.quantity),
+                    'allocated_amount': float(item.allocated_amount),
+                    'current_value': item.get_current_value(),
+                    'profit_loss': item.get_profit_loss(),
+                } for item in items],
+                'investment_amount': float(basket.investment_amount),
+                'total_current_value': basket.get_total_value(),
+                'total_profit_loss': basket.get_profit_loss(),
+                'profit_loss_percentage': basket.get_profit_loss_percentage(),
+            })
+
+        return JsonResponse(response)
+
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)})
+
+
 from django.views.decorators.csrf import csrf_exempt
 # @login_required
 @csrf_exempt
@@ -782,45 +1206,48 @@ def basket_stock_add(request, basket_id):
 
 @csrf_exempt
 def basket_get_available_stocks(request, basket_id):
-    """Get stocks that are not in the current basket"""
+    """Get one page of stocks that are not in the current basket"""
+    from django.http import HttpResponse
+    from django.template.loader import get_template
+    from django.urls import reverse
+    from .utils import page_stocks, STOCK_PAGE_SIZE
+    
     basket = get_object_or_404(Basket, id=basket_id, user=request.user)
     
     # Get stock IDs already in basket
     basket_stock_ids = basket.items.values_list('stock_id', flat=True)
     
-    # Get all available stocks not in basket
-    available_stocks = Stock.objects.exclude(id__in=basket_stock_ids).order_by('symbol')
+    # OPTIMIZATION: Keyset-page in the database instead of sending the whole
+    # universe; searches go through the in-memory typeahead index
+    search = request.GET.get('q', '').strip()
+    cursor = request.GET.get('cursor')
+    if search:
+        from .search import search_stocks, attach_current_prices
+        
+        results = search_stocks(search, limit=STOCK_PAGE_SIZE, exclude_ids=set(basket_stock_ids))
+        page = {'stocks': attach_current_prices(results), 'next_cursor': None}
+    else:
+        page = page_stocks(
+            queryset=Stock.objects.exclude(id__in=basket_stock_ids),
+            cursor=cursor,
+        )
     
-    stocks_data = [{
-        'id': stock.id,
-        'symbol': stock.symbol,
-        'name': stock.name,
-        'current_price': float(stock.current_price) if stock.current_price else None
-    } for stock in available_stocks]
+    # HTMX swaps the rendered list straight into the modal
+    if request.headers.get('HX-Request'):
+        template = get_template('stocks/_available_stocks_list.j2')
+        return HttpResponse(template.render({
+            'stocks': page['stocks'],
+            'basket_id': basket.id,
+            'search': search,
+            'next_cursor': page['next_cursor'],
+            'is_next_page': bool(cursor),
+        }))
     
-
-
-    # Return JSON response with new HTML and metrics
-    print('---------------------')
-
-    from django.urls import reverse
-    print(reverse('basket_stock_add', args=[basket.id]))
-    print('---------------------')
-    # URL for basket_stock_add view
-    add_stock_url = reverse('basket_stock_add', args=[basket.id])
-    print('---------------------')
-    # URL for basket_stock_add view
-    return JsonResponse({
-        'success': True,
-        'stocks': stocks_data,
-        'add_stock_url': add_stock_url
-    })
-
-
     return JsonResponse({
         'success': True,
-        'stocks': stocks_data,
-        'add_stock_url': reversed('basket_stock_add', args=[basket.id])
+        'stocks': page['stocks'],
+        'next_cursor': page['next_cursor'],
+        'add_stock_url': reverse('basket_stock_add', args=[basket.id])
     })
 
 
@@ -852,29 +1279,39 @@ def basket_duplicate(request, basket_id):
 def basket_edit_investment(request, basket_id):
     """Edit basket investment amount - recalculates all allocations"""
     from django.http import JsonResponse
+    from .utils import allocate_whole_shares
     
     if request.method == 'POST':
         basket = get_object_or_404(Basket, id=basket_id, user=request.user)
         
         try:
             new_investment = Decimal(request.POST.get('investment_amount'))
+            allocation_mode = request.POST.get('allocation_mode', 'floor')
             
             if new_investment <= 0:
                 return JsonResponse({'success': False, 'error': 'Investment amount must be positive'})
             
+            if allocation_mode not in ALLOCATION_MODES:
+                return JsonResponse({'success': False, 'error': 'Invalid allocation mode'})
+            
             old_investment = basket.investment_amount
             basket.investment_amount = new_investment
             basket.save()
             
             # Recalculate all items based on new investment amount
-            items = basket.items.all()
+            items = list(basket.items.all())
             items_data = []
             
-            for item in items:
-                # Keep the same weight percentage, recalculate allocated amount
-                item.allocated_amount = (item.weight_percentage / 100) * new_investment
-                # Recalculate quantity based on new allocated amount (round to whole number)
-                item.quantity = int(item.allocated_amount / item.purchase_price)
+            # Keep the same weight percentages and recalculate whole-share quantities
+            quantities = allocate_whole_shares(
+                [(item.weight_percentage / 100) * new_investment for item in items],
+                [item.purchase_price for item in items],
+                new_investment,
+                allocation_mode=allocation_mode,
+            )
+            
+            for item, quantity in zip(items, quantities):
+                item.quantity = quantity
                 
                 # Adjust allocated amount to reflect whole quantity
                 item.allocated_amount = item.quantity * item.purchase_price
@@ -950,6 +1387,10 @@ from django.views.decorators.csrf import csrf_exempt
 import json
 from .models import ChatGroup, ChatGroupMember, ChatMessage
 
+# Messages per history page (before_id/after_id keyset pages)
+CHAT_PAGE_SIZE = 50
+MAX_CHAT_PAGE_SIZE = 200
+
 
 def get_or_create_support_chat(user, is_ai_only=False):
     """Get or create a support chat for the user"""
@@ -1039,9 +1480,8 @@ def chat_send_message(request):
             content=content,
             message_type='text'
         )
-        
-        # Update group's updated_at timestamp
-        group.save()
+        # No group.save() here: the post_save receiver already bumped last_message and
+        # updated_at, and a full save of this earlier-loaded group would undo it
         
         return JsonResponse({
             'success': True,
@@ -1063,9 +1503,22 @@ def chat_send_message(request):
 
 @ajax_login_required
 def chat_get_messages(request):
-    """API to get chat messages for a group"""
+    """
+    API to get chat messages for a group
+    
+    OPTIMIZATION: Keyset pagination on the (group, is_deleted, id) index. Without a
+    cursor the newest page is returned; before_id pages back through older history
+    and after_id (or the legacy last_message_id) fetches newer messages, so every
+    page costs the same however long the group's history is. Messages within a page
+    are in chronological order for rendering.
+    """
     group_id = request.GET.get('group_id')
-    last_message_id = request.GET.get('last_message_id')
+    before_id = request.GET.get('before_id')
+    after_id = request.GET.get('after_id') or request.GET.get('last_message_id')
+    try:
+        limit = min(max(int(request.GET.get('limit', CHAT_PAGE_SIZE)), 1), MAX_CHAT_PAGE_SIZE)
+    except ValueError:
+        limit = CHAT_PAGE_SIZE
     
     try:
         # Get or create support chat if no group specified
@@ -1073,15 +1526,15 @@ def chat_get_messages(request):
             group = get_object_or_404(ChatGroup, id=group_id, is_active=True)
             
             # Check if user is a member
-            is_member = ChatGroupMember.objects.filter(
+            membership = ChatGroupMember.objects.filter(
                 group=group, user=request.user, is_active=True
-            ).exists()
+            ).first()
             
-            if not is_member:
+            if membership is None:
                 # Allow admin/staff to join support chats automatically (including AI-only chats for VIEWING)
                 if (request.user.is_staff or request.user.is_superuser) and group.group_type == 'support':
                     # Auto-add admin as support member (even for AI-only chats - they can view but not send)
-                    ChatGroupMember.objects.create(
+                    membership = ChatGroupMember.objects.create(
                         group=group,
                         user=request.user,
                         role='admin'
@@ -1100,28 +1553,30 @@ def chat_get_messages(request):
             support_type = request.GET.get('support_type', 'admin')  # 'ai' or 'admin'
             is_ai_only = (support_type == 'ai')
             group = get_or_create_support_chat(request.user, is_ai_only=is_ai_only)
+            membership = ChatGroupMember.objects.filter(group=group, user=request.user, is_active=True).first()
         
-        # Get messages
+        # Get messages (one page past the limit tells whether more exist)
         messages_qs = ChatMessage.objects.filter(
             group=group,
             is_deleted=False
-        ).select_related('sender').order_by('created_at')
+        ).select_related('sender')
         
-        # If last_message_id provided, only get new messages
-        if last_message_id:
-            messages_qs = messages_qs.filter(id__gt=last_message_id)
+        if after_id:
+            # Newer messages than the client has, oldest first
+            page = list(messages_qs.filter(id__gt=after_id).order_by('id')[:limit + 1])
+            has_more = len(page) > limit
+            page = page[:limit]
         else:
-            # Limit to last 50 messages for initial load
-            messages_qs = messages_qs[:50]
-        
-        # Mark messages as read
-        ChatMessage.objects.filter(
-            group=group,
-            is_read=False
-        ).exclude(sender=request.user).update(is_read=True)
+            # Newest page, or the page just before before_id when scrolling back
+            if before_id:
+                messages_qs = messages_qs.filter(id__lt=before_id)
+            page = list(messages_qs.order_by('-id')[:limit + 1])
+            has_more = len(page) > limit
+            page = page[:limit][::-1]
         
         messages_data = []
-        for msg in messages_qs:
+        newest_id = page[-1].id if page else 0
+        for msg in page:
             messages_data.append({
                 'id': msg.id,
                 'content': msg.content,
@@ -1132,9 +1587,16 @@ def chat_get_messages(request):
                 'is_own': msg.sender == request.user if msg.sender else False
             })
         
+        # Mark what was returned as read: one row, only written when the cursor advances
+        if membership is not None:
+            membership.mark_read(newest_id)
+        
         return JsonResponse({
             'success': True,
             'messages': messages_data,
+            'has_more': has_more,  # older messages before oldest_id (newer after newest_id with after_id)
+            'oldest_id': page[0].id if page else None,
+            'newest_id': page[-1].id if page else None,
             'group_id': group.id,
             'group_name': group.name,
             'group_avatar': group.avatar,
@@ -1145,38 +1607,62 @@ def chat_get_messages(request):
         return JsonResponse({'success': False, 'error': str(e)})
 
 
+def _serialize_group_summary(group, unread_count, role, is_member):
+    """Groups list entry built from the denormalized ChatGroup columns"""
+    last_message = group.last_message
+    return {
+        'id': group.id,
+        'name': group.name,
+        'avatar': group.avatar,
+        'group_type': group.group_type,
+        'members_count': group.member_count,
+        'last_message': last_message.content[:50] if last_message else None,
+        'last_message_time': last_message.created_at.strftime('%H:%M') if last_message else None,
+        'last_message_timestamp': last_message.created_at.timestamp() if last_message else 0,  # For sorting
+        'unread_count': unread_count,
+        'role': role,
+        'is_member': is_member
+    }
+
+
 @ajax_login_required
 def chat_get_groups(request):
-    """API to get user's chat groups"""
+    """
+    API to get user's chat groups
+    
+    OPTIMIZATION: The chat widget polls this endpoint. Last message and member count
+    come from denormalized ChatGroup columns and unread counts from a correlated
+    subquery, so the list costs one query (two for staff) instead of three per group.
+    """
+    from django.db.models import Count, OuterRef, Q, Subquery
+    from django.db.models.functions import Coalesce
+    
+    def count_per_group(messages):
+        return Coalesce(Subquery(
+            messages.order_by().values('group_id').annotate(total=Count('id')).values('total')
+        ), 0)
+    
     try:
         groups_data = []
-        already_added_ids = set()
         
-        # Get groups where user is a member
+        # Get groups where user is a member; unread = messages from others past the member's read cursor
         memberships = ChatGroupMember.objects.filter(
             user=request.user,
             is_active=True
-        ).select_related('group').order_by('-group__updated_at')
+        ).select_related('group', 'group__last_message').annotate(
+            unread_count=count_per_group(
+                ChatMessage.objects.filter(
+                    group_id=OuterRef('group_id'),
+                    id__gt=OuterRef('last_read_message_id'),
+                    is_deleted=False,
+                ).exclude(sender=request.user)
+            )
+        ).order_by('-group__updated_at')
         
         for membership in memberships:
-            group = membership.group
-            already_added_ids.add(group.id)
-            last_message = group.get_last_message()
-            unread_count = group.get_unread_count(request.user)
-            
-            groups_data.append({
-                'id': group.id,
-                'name': group.name,
-                'avatar': group.avatar,
-                'group_type': group.group_type,
-                'members_count': group.get_members_count(),
-                'last_message': last_message.content[:50] if last_message else None,
-                'last_message_time': last_message.created_at.strftime('%H:%M') if last_message else None,
-                'last_message_timestamp': last_message.created_at.timestamp() if last_message else 0,  # For sorting
-                'unread_count': unread_count,
-                'role': membership.role,
-                'is_member': True
-            })
+            groups_data.append(
+                _serialize_group_summary(membership.group, membership.unread_count, membership.role, True)
+            )
         
         # For admin/staff users: also show ALL support chats they can respond to (including AI-only for viewing)
         if request.user.is_staff or request.user.is_superuser:
@@ -1184,26 +1670,24 @@ def chat_get_groups(request):
                 group_type='support',
                 is_active=True
                 # Note: Removed is_ai_only=False filter so admins can see ALL support chats
-            ).exclude(id__in=already_added_ids).order_by('-updated_at')
+            ).exclude(
+                id__in=ChatGroupMember.objects.filter(user=request.user, is_active=True).values('group_id')
+            ).annotate(
+                # Furthest any staff member has read; everything after it is "unread" for support
+                staff_read_id=Coalesce(Subquery(
+                    ChatGroupMember.objects.filter(
+                        Q(user__is_staff=True) | Q(user__is_superuser=True), group_id=OuterRef('pk')
+                    ).order_by('-last_read_message_id').values('last_read_message_id')[:1]
+                ), 0)
+            ).select_related('last_message').annotate(
+                unread_count=count_per_group(ChatMessage.objects.filter(
+                    group_id=OuterRef('pk'), id__gt=OuterRef('staff_read_id'), is_deleted=False
+                ))
+            ).order_by('-updated_at')
             
             for group in support_chats:
-                last_message = group.get_last_message()
-                # Count messages not from staff as "unread" for support
-                unread_count = group.messages.filter(is_read=False).count()
-                
-                groups_data.append({
-                    'id': group.id,
-                    'name': group.name,
-                    'avatar': group.avatar,
-                    'group_type': group.group_type,
-                    'members_count': group.get_members_count(),
-                    'last_message': last_message.content[:50] if last_message else None,
-                    'last_message_time': last_message.created_at.strftime('%H:%M') if last_message else None,
-                    'last_message_timestamp': last_message.created_at.timestamp() if last_message else 0,  # For sorting
-                    'unread_count': unread_count,
-                    'role': 'support',  # Special role for support staff
-                    'is_member': False  # Not yet a member, but can join
-                })
+                # Special role for support staff; not yet a member, but can join
+                groups_data.append(_serialize_group_summary(group, group.unread_count, 'support', False))
         
         # Sort all groups by last message timestamp (most recent first)
         groups_data.sort(key=lambda g: g.get('last_message_timestamp', 0), reverse=True)
@@ -1269,6 +1753,9 @@ def chat_create_group(request):
             message_type='system'
         )
         
+        # Pick up the member count maintained by the membership signal receivers
+        group.refresh_from_db(fields=['member_count'])
+        
         return JsonResponse({
             'success': True,
             'group': {
@@ -1345,6 +1832,8 @@ def chat_add_member(request):
 @ajax_login_required
 def chat_get_members(request):
     """API to get members of a group"""
+    from .chat_presence import online_users
+    
     group_id = request.GET.get('group_id')
     
     if not group_id:
@@ -1362,6 +1851,9 @@ def chat_get_members(request):
             is_active=True
         ).select_related('user').order_by('role', 'joined_at')
         
+        # Presence comes from the cache (kept by the chat WebSocket consumer)
+        online = online_users(group.id)
+        
         members_data = []
         for member in members:
             members_data.append({
@@ -1370,7 +1862,8 @@ def chat_get_members(request):
                 'username': member.user.username or member.user.email.split('@')[0],
                 'role': member.role,
                 'joined_at': member.joined_at.strftime('%Y-%m-%d'),
-                'is_current_user': member.user == request.user
+                'is_current_user': member.user == request.user,
+                'is_online': member.user_id in online
             })
         
         return JsonResponse({
@@ -1618,3 +2111,89 @@ def tiny_url_stats(request, short_code):
         'is_active': tiny_url.is_active,
         'is_expired': tiny_url.is_expired()
     })
+
+
+# ==========================================
+# Price Alerts
+# ==========================================
+
+from .models import PriceAlert
+
+MAX_ACTIVE_ALERTS_PER_USER = 100
+
+
+@ajax_login_required
+def price_alerts(request):
+    """
+    List the user's alerts (GET) or create one (POST)
+
+    POST fields: alert_type ('stock' or 'basket'), symbol or basket_id,
+    direction ('above' or 'below'), threshold (price in ₹ or P/L %)
+    """
+    from .alerts import serialize_alert
+
+    if request.method == 'GET':
+        alerts = PriceAlert.objects.filter(user=request.user).select_related('stock', 'basket')[:200]
+        return JsonResponse({
+            'success': True,
+            'alerts': [serialize_alert(alert) for alert in alerts]
+        })
+
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'})
+
+    try:
+        data = json.loads(request.body) if request.content_type == 'application/json' else request.POST
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'error': 'Invalid JSON data'})
+
+    alert_type = data.get('alert_type', 'stock')
+    direction = data.get('direction')
+
+    if alert_type not in dict(PriceAlert.ALERT_TYPE_CHOICES):
+        return JsonResponse({'success': False, 'error': 'Invalid alert type'})
+    if direction not in dict(PriceAlert.DIRECTION_CHOICES):
+        return JsonResponse({'success': False, 'error': 'Direction must be "above" or "below"'})
+
+    try:
+        threshold = Decimal(str(data.get('threshold'))).quantize(Decimal('0.01'))
+        # NaN survives quantize and would only fail at the comparison or in the database;
+        # the bound matches the field's max_digits=12, decimal_places=2
+        if not threshold.is_finite() or abs(threshold) >= Decimal('1e10'):
+            return JsonResponse({'success': False, 'error': 'Invalid threshold'})
+    except Exception:
+        return JsonResponse({'success': False, 'error': 'Invalid threshold'})
+
+    if PriceAlert.objects.filter(user=request.user, is_active=True).count() >= MAX_ACTIVE_ALERTS_PER_USER:
+        return JsonResponse({'success': False, 'error': f'You can have at most {MAX_ACTIVE_ALERTS_PER_USER} active alerts'})
+
+    alert = PriceAlert(user=request.user, alert_type=alert_type, direction=direction, threshold=threshold)
+    if alert_type == 'stock':
+        if threshold <= 0:
+            return JsonResponse({'success': False, 'error': 'Price threshold must be positive'})
+        stock = Stock.objects.filter(symbol=str(data.get('symbol', '')).strip().upper()).first()
+        if not stock:
+            return JsonResponse({'success': False, 'error': 'Stock not found'})
+        alert.stock = stock
+    else:
+        basket = Basket.objects.filter(id=data.get('basket_id'), user=request.user).first()
+        if not basket:
+            return JsonResponse({'success': False, 'error': 'Basket not found'})
+        alert.basket = basket
+
+    alert.save()
+
+    return JsonResponse({'success': True, 'alert': serialize_alert(alert)})
+
+
+@ajax_login_required
+def price_alert_delete(request, alert_id):
+    """Delete one of the user's alerts"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'})
+
+    deleted, _ = PriceAlert.objects.filter(id=alert_id, user=request.user).delete()
+    if not deleted:
+        return JsonResponse({'success': False, 'error': 'Alert not found'})
+
+    return JsonResponse({'success': True})